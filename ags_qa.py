@@ -1,10 +1,17 @@
 import obspython as obs
+import time
 from enum import Enum
 import psutil
-import win32gui, win32process
+import window_backend
 from obsutil import obsutil
+from obs_refs import ObsRef, SourceRef, SceneItemRef, SourceList
 from gameutil import gameutil
 from gamedata import AGSGameData
+from telemetry import ResourceSampler
+from launch_pipeline import LaunchTracker
+from process_state_machine import PollSchedule
+from event_queue import EventQueue
+from monitor_daemon import MonitorDaemon
 
 class obs_frontend_event(Enum):
     OBS_FRONTEND_EVENT_STREAMING_STARTING = 0
@@ -54,6 +61,24 @@ ags_data = AGSGameData()
 proc = None
 proc_result = None
 last_app_status = None
+#samples the game's resource use while we record
+sampler = None
+#the launch in flight, from the Start QA button to game capture hooking the game
+launch = None
+#how long we look for the game's process and window before giving up on the launch, in seconds
+discovery_timeout = 120
+#discovery checks fast right after the launch and whenever it makes progress, backing off to these slowest intervals while nothing happens
+DISCOVERY_INTERVALS = {
+    LaunchTracker.PROCESS_SEEN: (0.1, 1.0),
+    LaunchTracker.MAIN_WINDOW_SEEN: (0.05, 0.5),
+}
+discovery_schedule = None
+#callbacks from monitoring threads, run on OBS's main thread by script_tick (hand it to MonitoringThread as `events`)
+events = EventQueue()
+#the out-of-process monitor, when the "monitor out of process" setting is on
+monitor = None
+#older daemon status than this is ignored, in seconds
+MONITOR_STATUS_MAX_AGE = 1.0
 
 # Description displayed in the Scripts dialog window
 def script_description():
@@ -79,6 +104,9 @@ def script_defaults(settings):
     obs.obs_data_set_default_string(settings, "win_class", "SDL_app")
     obs.obs_data_set_default_string(settings, "crash_win_name", "Adventure Game Studio")
     obs.obs_data_set_default_string(settings, "crash_win_class", "#32770")
+    obs.obs_data_set_default_int(settings, "discovery_timeout", 120)
+    obs.obs_data_set_default_bool(settings, "monitor_out_of_process", False)
+    obs.obs_data_set_default_bool(settings, "debug_checks", False)
 
 def script_load(settings):
     obs.script_log(obs.LOG_DEBUG, "script_load")
@@ -88,6 +116,10 @@ def script_load(settings):
     ags_data.source_name = obs.obs_data_get_string(settings, "source_name")
     setup_signals()
     obs.obs_frontend_add_event_callback(on_frontend_finished_loading)
+    set_monitor_enabled(obs.obs_data_get_bool(settings, "monitor_out_of_process"))
+
+def script_tick(seconds):
+    events.drain()
 
 def script_properties():
     obs.script_log(obs.LOG_DEBUG, "script_properties")
@@ -101,6 +133,9 @@ def script_properties():
     obs.obs_properties_add_text(props, "win_class", "Window Class", obs.OBS_TEXT_DEFAULT)
     obs.obs_properties_add_text(props, "crash_win_name", "Crash Window Name", obs.OBS_TEXT_DEFAULT)
     obs.obs_properties_add_text(props, "crash_win_class", "Crash Window Class", obs.OBS_TEXT_DEFAULT)
+    obs.obs_properties_add_int(props, "discovery_timeout", "Game Discovery Timeout (s)", 5, 3600, 5)
+    obs.obs_properties_add_bool(props, "monitor_out_of_process", "Monitor the game out of process")
+    obs.obs_properties_add_bool(props, "debug_checks", "Debug consistency checks (slow)")
 
     obs.obs_properties_add_button(props, "button0", "Start QA",start_qa)
 
@@ -116,32 +151,53 @@ def script_update(settings):
     ags_data.window_class = obs.obs_data_get_string(settings, "win_class")
     ags_data.crash_window_name = obs.obs_data_get_string(settings, "crash_win_name")
     ags_data.crash_window_class = obs.obs_data_get_string(settings, "crash_win_class")
+    global discovery_timeout
+    discovery_timeout = obs.obs_data_get_int(settings, "discovery_timeout")
+    set_monitor_enabled(obs.obs_data_get_bool(settings, "monitor_out_of_process"))
+    configure_monitor()
+    obsutil.get_scene_index().debug = obs.obs_data_get_bool(settings, "debug_checks")
+    ObsRef.tracker.enabled = obs.obs_data_get_bool(settings, "debug_checks")
+
+def set_monitor_enabled(enabled: bool):
+    '''
+    Starts or stops the monitor daemon, which then does the process and window polling outside OBS's interpreter.
+    '''
+    global monitor
+    if enabled and monitor is None:
+        monitor = MonitorDaemon()
+        try:
+            monitor.start()
+        except OSError as e:
+            obs.script_log(obs.LOG_WARNING, "Couldn't start the monitor daemon, monitoring in process: "+str(e))
+            monitor = None
+            return
+        configure_monitor()
+    elif not enabled and monitor is not None:
+        monitor.stop()
+        monitor = None
+
+def configure_monitor():
+    if monitor is not None:
+        monitor.configure(ags_data.exe_name, ags_data.window_name, ags_data.window_class, ags_data.crash_window_name, ags_data.crash_window_class)
 
 def create_game_capture_source(props, property):
     obs.script_log(obs.LOG_DEBUG, "create_game_capture_source")
     scene_ref = obsutil.find_scene(ags_data.scene_name)
     if not obsutil.game_capture_source_exists(scene_ref, ags_data.source_name):
-        source_ref = obsutil.create_game_capture_source(scene_ref, ags_data.source_name, ags_data.game_capture_window_string)
-        obs.obs_source_release(source_ref)
+        SourceRef(obsutil.create_game_capture_source(scene_ref, ags_data.source_name, ags_data.game_capture_window_string)).release()
 
 def setup_needs():
     obs.script_log(obs.LOG_DEBUG, "setup_needs")
-    scene_ref = obsutil.find_scene(ags_data.scene_name)
-    if scene_ref is None:
-        obs.script_log(obs.LOG_INFO, "Scene does not exist. Will create.")
-        scene_ref = obs.obs_scene_create(ags_data.scene_name)
+    scene_ref = obsutil.find_or_create_scene(ags_data.scene_name)
 
-    source_ref = None
     if not obsutil.game_capture_source_exists(scene_ref, ags_data.source_name):
         obs.script_log(obs.LOG_INFO, "Source does not exist. Will create.")
-        source_ref = obsutil.create_game_capture_source(scene_ref, ags_data.source_name, ags_data.game_capture_window_string)
-        obs.obs_frontend_set_current_scene(source_ref)
+        with SourceRef(obsutil.create_game_capture_source(scene_ref, ags_data.source_name, ags_data.game_capture_window_string)) as source_ref:
+            obs.obs_frontend_set_current_scene(source_ref)
 
-        scene_item_ref = obs.obs_scene_sceneitem_from_source(scene_ref, source_ref)
-        if scene_item_ref:
-            obsutil.reset_transform_and_crop(scene_item_ref)
-            obs.obs_sceneitem_release(scene_item_ref)
-        obs.obs_source_release(source_ref)
+            with SceneItemRef(obs.obs_scene_sceneitem_from_source(scene_ref, source_ref)) as scene_item_ref:
+                if scene_item_ref:
+                    obsutil.reset_transform_and_crop(scene_item_ref)
 
 def on_scene_item_created(calldata):
     scene_item_ref = obs.calldata_sceneitem(calldata, "item")
@@ -247,14 +303,34 @@ def game_hooked_callback(calldata):
     obs.obs_output_set_preferred_size(output, source_width, source_height)
     obs.obs_output_release(output)
     
-    scene_ref = obsutil.find_scene(ags_data.scene_name)
-    scene_item_ref = obsutil.find_scene_item(scene_ref, ags_data.source_name)
+    #re-fit the capture wherever it's shown, not just in the QA scene
     base_resolution = obsutil.config_get_base_resolution()
-    obsutil.reset_transform_and_crop(scene_item_ref, base_resolution.x, base_resolution.y)
+    changed = obsutil.reset_transforms_and_crops(obsutil.find_scene_items_by_source(ags_data.source_name), base_resolution.x, base_resolution.y)
+    obs.script_log(obs.LOG_DEBUG, "re-fit {changed} scene items of {source_name}".format(changed=changed, source_name=ags_data.source_name))
 
     global proc
     if proc is None:
-        proc = gameutil.find_processid_by_name(ags_data.exe_name)
+        proc = find_game_process(ags_data.exe_name)
+    start_telemetry()
+
+    if launch is not None and launch.mark(LaunchTracker.CAPTURE_HOOKED):
+        msg = "launch to capture hooked: {seconds:.2f}s (process {process}, window {window})".format(seconds=launch.elapsed(LaunchTracker.CAPTURE_HOOKED),
+            process=format_elapsed(launch.elapsed(LaunchTracker.PROCESS_SEEN)), window=format_elapsed(launch.elapsed(LaunchTracker.MAIN_WINDOW_SEEN)))
+        obs.script_log(obs.LOG_INFO, msg)
+        #marking the hook wrote the timings
+        finish_launch()
+
+def finish_launch():
+    '''
+    Writes the launch's timings unless they already are. Not being able to write them is logged, it shouldn't stop a launch or an unload.
+    '''
+    launch.finish()
+    if launch.write_error is not None:
+        obs.script_log(obs.LOG_WARNING, "Couldn't write launch timings to "+launch.log_path+": "+str(launch.write_error))
+        launch.write_error = None
+
+def format_elapsed(seconds: float) -> str:
+    return "not seen" if seconds is None else "{:.2f}s".format(seconds)
 
 def game_unhooked_callback(calldata):
     source = obs.calldata_source(calldata,"source")
@@ -278,27 +354,26 @@ def setup_signals():
     # obs.signal_handler_connect(gsh, "source_remove", on_source_removed)
     obs.signal_handler_connect(gsh, "source_rename", on_source_renamed)
 
-    for scene_a_s in obs.obs_frontend_get_scenes():
-        scene_name = obs.obs_source_get_name(scene_a_s)
-        print("setup signals, scene name:" +scene_name)
-        print("ags_data.scene_name:"+ags_data.scene_name)
-        if(scene_name == ags_data.scene_name):
-            obs.script_log(obs.LOG_DEBUG, "Hooking Signals for {source_name}".format(source_name = scene_name))
-            sh = obs.obs_source_get_signal_handler(scene_a_s)
-            obs.signal_handler_connect(sh, "item_add", on_scene_item_created)
-            obs.signal_handler_connect(sh, "item_remove", on_scene_item_removed)
-            obs.signal_handler_connect(sh, "item_visible", on_scene_item_visible)
+    with SourceList(obs.obs_frontend_get_scenes()) as scenes:
+        for scene_a_s in scenes:
+            scene_name = obs.obs_source_get_name(scene_a_s)
+            print("setup signals, scene name:" +scene_name)
+            print("ags_data.scene_name:"+ags_data.scene_name)
+            if(scene_name == ags_data.scene_name):
+                obs.script_log(obs.LOG_DEBUG, "Hooking Signals for {source_name}".format(source_name = scene_name))
+                sh = obs.obs_source_get_signal_handler(scene_a_s)
+                obs.signal_handler_connect(sh, "item_add", on_scene_item_created)
+                obs.signal_handler_connect(sh, "item_remove", on_scene_item_removed)
+                obs.signal_handler_connect(sh, "item_visible", on_scene_item_visible)
             
-            scene_item_ref = obsutil.find_scene_item(obs.obs_scene_from_source(scene_a_s), ags_data.source_name)
-            source_ref = obs.obs_sceneitem_get_source(scene_item_ref)
-            source_name = obs.obs_source_get_name(source_ref)
-            print("source_name: "+source_name+" ags_data.source_name:"+ags_data.source_name)
-            if(source_name == ags_data.source_name):
-                ssh = obs.obs_source_get_signal_handler(source_ref)
-                obs.signal_handler_connect(ssh, "hooked", game_hooked_callback)
-                obs.signal_handler_connect(ssh, "unhooked", game_unhooked_callback)
-
-        obs.obs_source_release(scene_a_s)
+                scene_item_ref = obsutil.find_scene_item(obs.obs_scene_from_source(scene_a_s), ags_data.source_name)
+                source_ref = obs.obs_sceneitem_get_source(scene_item_ref)
+                source_name = obs.obs_source_get_name(source_ref)
+                print("source_name: "+source_name+" ags_data.source_name:"+ags_data.source_name)
+                if(source_name == ags_data.source_name):
+                    ssh = obs.obs_source_get_signal_handler(source_ref)
+                    obs.signal_handler_connect(ssh, "hooked", game_hooked_callback)
+                    obs.signal_handler_connect(ssh, "unhooked", game_unhooked_callback)
 
 def unset_signals():
     obs.script_log(obs.LOG_DEBUG, "unset_signals")
@@ -309,28 +384,81 @@ def unset_signals():
     # obs.signal_handler_disconnect(gsh, "source_remove", on_source_removed)
     obs.signal_handler_disconnect(gsh, "source_rename", on_source_renamed)
 
-    for scene_a_s in obs.obs_frontend_get_scenes():
-        scene_name = obs.obs_source_get_name(scene_a_s)
-        if(scene_name == ags_data.scene_name):
-            obs.script_log(obs.LOG_DEBUG, "Unhooking Signals for {source_name}".format(source_name = scene_name))
-            sh = obs.obs_source_get_signal_handler(scene_a_s)
-            obs.signal_handler_disconnect(sh, "item_add", on_scene_item_created)
-            obs.signal_handler_disconnect(sh, "item_remove", on_scene_item_removed)
-            obs.signal_handler_disconnect(sh, "item_visible", on_scene_item_visible)
+    with SourceList(obs.obs_frontend_get_scenes()) as scenes:
+        for scene_a_s in scenes:
+            scene_name = obs.obs_source_get_name(scene_a_s)
+            if(scene_name == ags_data.scene_name):
+                obs.script_log(obs.LOG_DEBUG, "Unhooking Signals for {source_name}".format(source_name = scene_name))
+                sh = obs.obs_source_get_signal_handler(scene_a_s)
+                obs.signal_handler_disconnect(sh, "item_add", on_scene_item_created)
+                obs.signal_handler_disconnect(sh, "item_remove", on_scene_item_removed)
+                obs.signal_handler_disconnect(sh, "item_visible", on_scene_item_visible)
             
-            scene_item_ref = obsutil.find_scene_item(obs.obs_scene_from_source(scene_a_s), ags_data.source_name)
-            source_ref = obs.obs_sceneitem_get_source(scene_item_ref)
-            source_name = obs.obs_source_get_name(source_ref)
-            print("source_name: "+source_name+" ags_data.source_name:"+ags_data.source_name)
-            if(source_name == ags_data.source_name):
-                ssh = obs.obs_source_get_signal_handler(source_ref)
-                obs.signal_handler_disconnect(ssh, "hooked", game_hooked_callback)
-                obs.signal_handler_disconnect(ssh, "unhooked", game_unhooked_callback)
-
-        obs.obs_source_release(scene_a_s)
+                scene_item_ref = obsutil.find_scene_item(obs.obs_scene_from_source(scene_a_s), ags_data.source_name)
+                source_ref = obs.obs_sceneitem_get_source(scene_item_ref)
+                source_name = obs.obs_source_get_name(source_ref)
+                print("source_name: "+source_name+" ags_data.source_name:"+ags_data.source_name)
+                if(source_name == ags_data.source_name):
+                    ssh = obs.obs_source_get_signal_handler(source_ref)
+                    obs.signal_handler_disconnect(ssh, "hooked", game_hooked_callback)
+                    obs.signal_handler_disconnect(ssh, "unhooked", game_unhooked_callback)
+
+def monitor_active() -> bool:
+    return monitor is not None and monitor.running()
+
+def monitor_status():
+    '''
+    Returns: the daemon's latest scan if it's recent, otherwise None (it hasn't scanned yet, or it's stuck)
+    '''
+    if monitor is None:
+        return None
+    status = monitor.read()
+    if status is None or time.time() - status.updated_at > MONITOR_STATUS_MAX_AGE:
+        return None
+    return status
+
+def find_game_process(exe_name: str) -> psutil.Process:
+    '''
+    Finds the game's process: from the daemon's game_pid while it's running, so OBS's interpreter doesn't refresh the process index,
+    and through gameutil's process index otherwise.
+
+    Returns: Process | None
+    '''
+    if not monitor_active():
+        return gameutil.find_processid_by_name(exe_name)
+    status = monitor_status()
+    if status is None or not status.running or not status.game_pid:
+        return None
+    try:
+        game_proc = psutil.Process(status.game_pid)
+        #the pid was reused since the daemon's scan
+        if abs(game_proc.create_time() - status.game_create_time) > 0.01:
+            return None
+    except psutil.Error:
+        return None
+    return game_proc
+
+def find_game_window(game_proc: psutil.Process) -> window_backend.WindowInfo:
+    '''
+    Finds the game's main window: the daemon's main_hwnd while it's running, described without walking the window list,
+    and the process' top window from a window snapshot otherwise.
+
+    Returns: WindowInfo | None
+    '''
+    if not monitor_active():
+        return LaunchTracker.top_window(game_proc)
+    status = monitor_status()
+    if status is None or status.game_pid != game_proc.pid or not status.main_hwnd:
+        return None
+    return window_backend.get_default_backend().describe(status.main_hwnd)
 
 def did_qa_crash(proc: psutil.Process) -> bool:
     app_status = None
+    if proc is not None:
+        #the daemon's latest scan, if it's recent and about this process
+        status = monitor_status()
+        if status is not None and status.game_pid == proc.pid:
+            return status.running and status.crash_dialog and not status.main_window
     if proc is not None:
         # while(True):
         app_status = gameutil.get_process_status(proc, ags_data.window_name, ags_data.window_class, ags_data.crash_window_name, ags_data.crash_window_class)
@@ -344,40 +472,78 @@ def did_qa_crash(proc: psutil.Process) -> bool:
             return False
     return False
 
-def findWindow(pid):
-    found_hwnd = None
-    def enumHandler(hwnd, lParam):
-        if win32gui.IsWindowVisible(hwnd):
-            thread_id, process_id = win32process.GetWindowThreadProcessId(hwnd)
-            if(process_id == pid):
-                nonlocal found_hwnd
-                found_hwnd = hwnd
+def findWindow(pid) -> window_backend.WindowInfo:
+    #the last visible top-level window of the process in Z order, from the tick's shared snapshot
+    windows = window_backend.get_default_backend().snapshot().windows_of(pid)
+    return windows[-1] if windows else None
 
-    win32gui.EnumWindows(enumHandler, None)
-    return found_hwnd
+def point_capture_at(game_proc: psutil.Process, game_window: window_backend.WindowInfo):
+    '''
+    Points the game capture source's `window` setting at the game's main window.
+    '''
+    ags_data.window_name = game_window.title
+    ags_data.window_class = game_window.class_name
+    window_string = ags_data.get_game_capture_window_string(game_proc)
+    configure_monitor()
 
-def find_proc():
-    global proc
-    global ags_data
-    proc = gameutil.find_processid_by_name(ags_data.exe_name)
-    if proc is not None:
-        #print("process found: "+ str(proc.pid))
-        game_hwnd = findWindow(proc.pid)
-
-        ags_data.window_name = win32gui.GetWindowText(game_hwnd)
-        ags_data.window_class = win32gui.GetClassName(game_hwnd)
-        window_string = ags_data.get_game_capture_window_string(proc)
-        #print("Discovered window name: "+ags_data.window_name)
-
-        scene_ref = obsutil.find_scene(ags_data.scene_name)
-        scene_item_ref = obsutil.find_scene_item(scene_ref, ags_data.source_name)
-        source_ref = obs.obs_sceneitem_get_source(scene_item_ref)
-        settings = obs.obs_source_get_settings(source_ref)
-
-        obs.obs_data_set_string(settings, "window", window_string)
-        obs.obs_source_update(source_ref, settings)
-        obs.obs_data_release(settings)
+    scene_ref = obsutil.find_scene(ags_data.scene_name)
+    scene_item_ref = obsutil.find_scene_item(scene_ref, ags_data.source_name)
+    source_ref = obs.obs_sceneitem_get_source(scene_item_ref)
+    #only when it's a different window, an update makes game capture rehook
+    obsutil.apply_source_settings(source_ref, {"window": window_string})
+
+def schedule_discovery():
+    obs.timer_add(discover_game, max(1, int(discovery_schedule.interval(launch.waiting_for()) * 1000)))
+
+def discover_game():
+    '''
+    One-shot timer callback that looks for the launched game's process, then for its main window (in what the monitor daemon
+    last published while it runs, polling from here otherwise), and points the capture at it the moment both exist. It reschedules itself on the discovery schedule until then,
+    or until discovery_timeout runs out.
+    '''
     obs.remove_current_callback()
+    if launch is None or launch.written:
+        return
+    waiting_for = launch.waiting_for()
+    found = launch.poll(find_game_process, find_game_window)
+    global proc
+    if launch.process is not None and proc is None:
+        proc = launch.process
+    if found:
+        point_capture_at(launch.process, launch.window)
+        start_telemetry()
+        return
+    if launch.age() > discovery_timeout:
+        if launch.process is None:
+            obs.script_log(obs.LOG_WARNING, "Gave up waiting for "+ags_data.exe_name+" to start")
+        else:
+            obs.script_log(obs.LOG_WARNING, "No visible window for "+ags_data.exe_name)
+        finish_launch()
+        return
+    discovery_schedule.record(waiting_for)
+    schedule_discovery()
+
+def start_telemetry():
+    '''
+    Starts sampling the game once we both know its process and are recording, whichever happens last calls this.
+    '''
+    global sampler
+    if sampler is not None or proc is None or not obs.obs_frontend_recording_active():
+        return
+    sampler = ResourceSampler(proc)
+    sampler.start()
+
+def stop_telemetry(write_sidecar: bool = True):
+    global sampler
+    if sampler is None:
+        return
+    sampler.stop()
+    recording_path = obs.obs_frontend_get_last_recording() if write_sidecar else None
+    if recording_path:
+        path = sampler.write_sidecar(recording_path)
+        msg = "telemetry: {count} samples written to {path}, sampler used {overhead:.2%} of a core".format(count=sampler.count, path=path, overhead=sampler.overhead())
+        obs.script_log(obs.LOG_INFO, msg)
+    sampler = None
 
 def start_qa(props, property):
     obs.script_log(obs.LOG_DEBUG, "start_qa")
@@ -387,28 +553,63 @@ def start_qa(props, property):
     scene_item_ref = obsutil.find_scene_item(scene_ref, ags_data.source_name)
     obs.obs_sceneitem_select(scene_item_ref, True)
    
+    global launch, discovery_schedule, proc
+    if launch is not None:
+        #a previous launch that never hooked, log how far it got
+        finish_launch()
+        obs.timer_remove(discover_game)
+    proc = None
+    launch = LaunchTracker(ags_data.window_name, ags_data.exe_name)
+    discovery_schedule = PollSchedule(DISCOVERY_INTERVALS, quiet_checks=3)
+    launch.mark(LaunchTracker.COMMAND_ISSUED)
     gameutil.run_steam_game(ags_data.window_name, ags_data.steam_gameid)
-
-    obs.timer_add(find_proc, 4000)
+    schedule_discovery()
     
 def on_frontend_finished_loading(event):
     msg = "on_frontend_finished_loading: "+ obs_frontend_event(event).name
     obs.script_log(obs.LOG_DEBUG, msg)
     if event == obs.OBS_FRONTEND_EVENT_FINISHED_LOADING:
+        #the collection was loaded without item signals, index it as it is now
+        obsutil.get_scene_index().invalidate()
         setup_needs()
+    elif event == obs.OBS_FRONTEND_EVENT_SCENE_COLLECTION_CHANGING or event == obs.OBS_FRONTEND_EVENT_EXIT:
+        #pending changes belong to the collection that's going away
+        obsutil.flush_sources()
+    elif event == obs.OBS_FRONTEND_EVENT_SCENE_COLLECTION_CLEANUP or event == obs.OBS_FRONTEND_EVENT_SCENE_COLLECTION_CHANGED:
+        obsutil.get_scene_index().invalidate()
     elif event == obs.OBS_FRONTEND_EVENT_RECORDING_STARTING:
         obs.script_log(obs.LOG_DEBUG, "Recording Starting")
     elif event == obs.OBS_FRONTEND_EVENT_RECORDING_STARTED:
         obs.script_log(obs.LOG_DEBUG, "Recording Started")
+        start_telemetry()
     elif event == obs.OBS_FRONTEND_EVENT_RECORDING_STOPPING:
         obs.script_log(obs.LOG_DEBUG, "Recording Stopping")
     elif event == obs.OBS_FRONTEND_EVENT_RECORDING_STOPPED:
         obs.script_log(obs.LOG_DEBUG, "Recording Stopped")
+        stop_telemetry()
     elif event == obs.OBS_FRONTEND_EVENT_RECORDING_PAUSED:
         obs.script_log(obs.LOG_DEBUG, "Recording Paused")
     elif event == obs.OBS_FRONTEND_EVENT_RECORDING_UNPAUSED:
         obs.script_log(obs.LOG_DEBUG, "Recording Unpaused")
 
+def close_scene_index():
+    scene_index = obsutil.get_scene_index()
+    if scene_index.debug and scene_index.built:
+        for problem in scene_index.verify():
+            obs.script_log(obs.LOG_WARNING, "scene index: "+problem)
+    metrics = scene_index.metrics()
+    msg = "scene index: {scenes} scenes, {items} items, {builds} builds, {hits} hits, {misses} misses, {mismatches} mismatches".format(**metrics)
+    obs.script_log(obs.LOG_DEBUG, msg)
+    scene_index.detach()
+
+def report_references():
+    tracker = ObsRef.tracker
+    if tracker.enabled:
+        for leak in tracker.report():
+            obs.script_log(obs.LOG_WARNING, "unreleased reference: "+leak)
+    msg = "obs references: {acquired} acquired, {released} released, {outstanding} outstanding".format(**tracker.metrics())
+    obs.script_log(obs.LOG_DEBUG, msg)
+
 def print_video_settings(props, property):
     print("print_video_settings")
     vid_settings = obs.obs_video_info()
@@ -430,6 +631,25 @@ def script_unload():
     obs.script_log(obs.LOG_DEBUG, "script_unload")
     unset_signals()
     obs.obs_frontend_remove_event_callback(on_frontend_finished_loading)
+    obsutil.flush_sources()
+    obs.script_log(obs.LOG_DEBUG, "scene collection: {saves} saves for {requested} changes, {avoided} avoided".format(**obsutil.save_metrics()))
+    close_scene_index()
+    metrics = obsutil.get_source_settings().metrics()
+    obs.script_log(obs.LOG_DEBUG, "source settings: {applied} updates applied, {skipped} skipped, {keys_written} values written, {reads} reads".format(**metrics))
+    obsutil.get_source_settings().detach()
+    report_references()
+    #the last recording isn't this session's if we're unloaded mid-recording
+    stop_telemetry(write_sidecar=False)
+    events.drain()
+    metrics = events.metrics()
+    if metrics["published"]:
+        msg = "monitoring events: {published} published, {coalesced} coalesced, max depth {max_depth}, drain latency mean {mean:.1f} ms max {max:.1f} ms".format(
+            mean=metrics["mean_drain_latency"] * 1000, max=metrics["max_drain_latency"] * 1000, **metrics)
+        obs.script_log(obs.LOG_INFO, msg)
+    set_monitor_enabled(False)
+    if launch is not None:
+        obs.timer_remove(discover_game)
+        finish_launch()
     global proc
     if proc is not None and proc.is_running():
         proc.kill()
\ No newline at end of file
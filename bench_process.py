@@ -0,0 +1,420 @@
+'''
+Benchmarks for the process tracking helpers, run against fake process sources so they work off Windows.
+
+    python bench_process.py
+'''
+import os, random, subprocess, sys, threading, time
+from process_index import ProcessIndex, ProcessTree, FakeProcessSource
+from process_state_machine import ProcessStateMachine, PollSchedule
+from process_supervisor import ProcessSupervisor
+from telemetry import ResourceSampler
+from event_queue import EventQueue
+from monitor_daemon import MonitorDaemon
+import psutil, tempfile
+from window_backend import FakeWindowBackend
+
+def full_scan_find(source: FakeProcessSource, process_name: str):
+    '''
+    What gameutil.find_processid_by_name did before the ProcessIndex: name() on every process, every call.
+    '''
+    for proc in source.process_iter():
+        if proc.name().lower() == process_name.lower():
+            return proc
+    return None
+
+def bench_process_index(sizes = (300, 1000, 5000), lookups: int = 50, churn: int = 3, query_cost: float = 0.00002):
+    print("--- process lookups, {} lookups, {} processes start/exit between lookups, {:.0f} us per query ---".format(lookups, churn, query_cost * 1e6))
+    for size in sizes:
+        rng = random.Random(size)
+        source = FakeProcessSource(query_cost)
+        for i in range(size):
+            source.spawn("proc{}.exe".format(i))
+
+        def churn_processes():
+            for pid in rng.sample(source.pids(), churn):
+                source.kill(pid)
+            for _ in range(churn):
+                source.spawn("proc{}.exe".format(rng.randrange(size)))
+        game = source.spawn("OldSkies.exe")
+
+        rng.seed(size)
+        source.queries = 0
+        start = time.perf_counter()
+        for _ in range(lookups):
+            churn_processes()
+            assert full_scan_find(source, "oldskies.exe") is game
+        scan_elapsed = time.perf_counter() - start
+        scan_queries = source.queries
+
+        source.kill(game.pid)
+        game = source.spawn("OldSkies.exe")
+        index = ProcessIndex(source)
+        start = time.perf_counter()
+        index.refresh()
+        cold = time.perf_counter() - start
+        rng.seed(size)
+        source.queries = 0
+        start = time.perf_counter()
+        for _ in range(lookups):
+            churn_processes()
+            index.refresh()
+            assert index.process(index.find_exact("oldskies.exe")[0]) is game
+        index_elapsed = time.perf_counter() - start
+        print("{:>5} processes   full scan {:>8.2f} ms/lookup ({:>6} queries)   index {:>6.3f} ms/lookup ({:>4} queries, cold refresh {:.1f} ms)".format(
+            size, scan_elapsed * 1000 / lookups, scan_queries, index_elapsed * 1000 / lookups, source.queries, cold * 1000))
+
+def bench_process_tree(size: int = 5000, lookups: int = 50, query_cost: float = 0.00002):
+    print("--- launcher -> game descendants, {} processes, {} lookups, {:.0f} us per query ---".format(size, lookups, query_cost * 1e6))
+    rng = random.Random(15)
+    source = FakeProcessSource(query_cost)
+    for i in range(size):
+        source.spawn("proc{}.exe".format(i), ppid=rng.choice([0, 4, 8]))
+    steam = source.spawn("steam.exe")
+    source.spawn("steamwebhelper.exe", ppid=steam.pid)
+    launcher = source.spawn("launcher.exe", ppid=steam.pid)
+    game = source.spawn("OldSkies.exe", ppid=launcher.pid)
+    #somebody else's copy of the game, not launched by us
+    source.spawn("OldSkies.exe")
+
+    source.queries = 0
+    start = time.perf_counter()
+    for _ in range(lookups):
+        assert game in steam.children(recursive=True)
+    scan_elapsed = time.perf_counter() - start
+    scan_queries = source.queries
+
+    index = ProcessIndex(source)
+    index.refresh()
+    tree = ProcessTree(index, [steam.pid])
+    source.queries = 0
+    start = time.perf_counter()
+    for _ in range(lookups):
+        index.refresh()
+        assert tree.newest_descendant("oldskies.exe") == game.pid
+    tree_elapsed = time.perf_counter() - start
+    print("children(recursive=True) {:>8.2f} ms/lookup ({:>6} queries)   tree {:>6.3f} ms/lookup ({:>3} queries)".format(
+        scan_elapsed * 1000 / lookups, scan_queries, tree_elapsed * 1000 / lookups, source.queries))
+
+    #the launcher quits and the game relaunches itself: the orphaned, newer copy is the one we follow
+    source.kill(launcher.pid)
+    relaunched = source.spawn("OldSkies.exe", ppid=game.pid)
+    source.kill(game.pid)
+    index.refresh()
+    assert tree.newest_descendant("OldSkies.exe") == relaunched.pid
+    #the launcher's pid gets reused by an unrelated process, whose children aren't ours
+    reused = source.spawn("unrelated.exe", pid=launcher.pid)
+    source.spawn("OldSkies.exe", ppid=reused.pid)
+    index.refresh()
+    assert tree.newest_descendant("OldSkies.exe") == relaunched.pid
+
+class FakeChild:
+    '''
+    Popen-like child that exits `lifetime` seconds after it's created. Uses our own pid so psutil lookups succeed.
+    '''
+    def __init__(self, lifetime: float):
+        self.pid = os.getpid()
+        self.exit_at = time.monotonic() + lifetime
+        self.done = threading.Event()
+        self.exit_pipes = []
+        self.lock = threading.Lock()
+        self.timer = threading.Timer(lifetime, self.exit)
+        self.timer.start()
+
+    def exit(self):
+        with self.lock:
+            self.done.set()
+            for fd in self.exit_pipes:
+                os.write(fd, b"x")
+                os.close(fd)
+            self.exit_pipes = []
+
+    def exit_fd(self) -> int:
+        '''
+        Returns: the read end of a pipe that turns readable when the child exits, standing in for a pidfd.
+        '''
+        r, w = os.pipe()
+        with self.lock:
+            if self.done.is_set():
+                os.write(w, b"x")
+                os.close(w)
+            else:
+                self.exit_pipes.append(w)
+        return r
+
+    def poll(self):
+        return 0 if self.done.is_set() else None
+
+    def wait(self, timeout=None):
+        self.done.wait(timeout)
+        return self.poll()
+
+
+class FakeChildStateMachine(ProcessStateMachine):
+    '''
+    ProcessStateMachine over a FakeChild that never shows a window, so it sits in STARTING until the child exits.
+    '''
+    def __init__(self, lifetime: float):
+        super().__init__("fake_game", self.on_done)
+        self.lifetime = lifetime
+        self.finished_at = None
+
+    def launch(self):
+        return FakeChild(self.lifetime)
+
+    def starting(self):
+        pass
+
+    def on_done(self, state):
+        self.finished_at = time.monotonic()
+
+
+class PollingStateMachine(FakeChildStateMachine):
+    '''
+    The previous run loop: poll() and sleep(0.2), kept as the baseline.
+    '''
+    def run(self):
+        while True:
+            if self.process and self.process.poll() is not None:
+                self.state = 'TERMINATED'
+            if self.state in ('TERMINATED', 'ABORTED', 'CRASHED'):
+                break
+            self.state_machine()
+            time.sleep(0.2)
+        if self.callback:
+            self.callback(self.state)
+
+def bench_exit_latency(runs: int = 20):
+    print("--- process exit detection latency, {} runs ---".format(runs))
+    rng = random.Random(9)
+    for label, machine_type in [("poll + sleep(0.2)", PollingStateMachine), ("exit event", FakeChildStateMachine)]:
+        latencies = []
+        for _ in range(runs):
+            fsm = machine_type(rng.uniform(0.05, 0.3))
+            fsm.run()
+            assert fsm.state == 'TERMINATED'
+            latencies.append(fsm.finished_at - fsm.process.exit_at)
+        latencies.sort()
+        print("{:<20} p50 {:>7.2f} ms   p95 {:>7.2f} ms   max {:>7.2f} ms".format(
+            label, latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.95)] * 1000, latencies[-1] * 1000))
+    assert latencies[-1] < 0.05
+
+class WindowCheckingStateMachine(FakeChildStateMachine):
+    '''
+    FakeChildStateMachine that really looks for its main window every step (and never finds one), counting its steps.
+    '''
+    def __init__(self, lifetime: float):
+        super().__init__(lifetime)
+        self.steps = 0
+
+    def starting(self):
+        ProcessStateMachine.starting(self)
+
+    def step(self):
+        self.steps += 1
+        return super().step()
+
+
+class PollingSupervisor(ProcessSupervisor):
+    '''
+    The last resort: no exit fd and no waiter thread, a poll() per tick.
+    '''
+    def exit_fd(self, process):
+        return None
+
+    def wait_exit(self, monitored):
+        monitored.exit_fd = ProcessSupervisor.POLLED
+
+class FakeChildSupervisor(ProcessSupervisor):
+    '''
+    Waits on FakeChild's exit pipe the way ProcessSupervisor waits on a pidfd for a real child.
+    '''
+    def exit_fd(self, process):
+        return process.exit_fd()
+
+def bench_supervisor(instances: int = 8, windows: int = 400, enum_cost: float = 0.000002):
+    print("--- monitoring {} games at once, {} top-level windows, {:.0f} us per window enumerated ---".format(instances, windows, enum_cost * 1e6))
+    rng = random.Random(11)
+    backend = FakeWindowBackend(0.05, enum_cost)
+    for i in range(windows):
+        backend.add_window(rng.randrange(100, 5000), "Window {}".format(i), "Class{}".format(i % 17))
+    ProcessStateMachine.window_backend = backend
+    lifetimes = [rng.uniform(1.0, 2.0) for _ in range(instances)]
+    #games get launched one after another, not all in the same millisecond
+    launch_gaps = [rng.uniform(0.0, 0.1) for _ in range(instances)]
+
+    def report(label, machines, wakeups, elapsed_cpu):
+        latencies = sorted(fsm.finished_at - fsm.process.exit_at for fsm in machines)
+        assert all(fsm.state == 'TERMINATED' for fsm in machines)
+        print("{:<28} {:>4} wakeups   {:>4} enumerations   cpu {:>6.1f} ms   exit latency p50 {:>6.2f} ms  max {:>6.2f} ms".format(
+            label, wakeups, backend.enumerations, elapsed_cpu * 1000, latencies[len(latencies) // 2] * 1000, latencies[-1] * 1000))
+        return latencies
+
+    backend.enumerations = 0
+    machines = [WindowCheckingStateMachine(lifetime) for lifetime in lifetimes]
+    threads = [threading.Thread(target=fsm.run) for fsm in machines]
+    cpu = time.process_time()
+    for thread, gap in zip(threads, launch_gaps):
+        time.sleep(gap)
+        thread.start()
+    for thread in threads:
+        thread.join()
+    #every step is a wakeup of that machine's thread, plus one for its exit watcher
+    report("thread per process", machines, sum(fsm.steps for fsm in machines) + instances, time.process_time() - cpu)
+
+    for label, supervisor_type in [("supervisor, poll per tick", PollingSupervisor), ("supervisor, waiter threads", ProcessSupervisor),
+                                   ("supervisor, exit fds", FakeChildSupervisor)]:
+        backend.enumerations = 0
+        supervisor = supervisor_type()
+        supervisor.start()
+        machines = [WindowCheckingStateMachine(lifetime) for lifetime in lifetimes]
+        cpu = time.process_time()
+        futures = []
+        for fsm, gap in zip(machines, launch_gaps):
+            time.sleep(gap)
+            futures.append(supervisor.add(fsm))
+        for future in futures:
+            future.result()
+        elapsed_cpu = time.process_time() - cpu
+        supervisor.stop()
+        latencies = report(label, machines, supervisor.wakeups, elapsed_cpu)
+        if supervisor_type is not PollingSupervisor:
+            assert latencies[-1] < 0.05
+    ProcessStateMachine.window_backend = None
+
+def bench_poll_schedule(duration: float = 3600.0, anomalies: int = 20):
+    '''
+    Simulates an hour of a RUNNING game whose window count changes `anomalies` times, on a simulated clock.
+    '''
+    print("--- RUNNING for {:.0f} s with {} window count changes ---".format(duration, anomalies))
+    rng = random.Random(12)
+    events = sorted(rng.uniform(0, duration) for _ in range(anomalies))
+    for label, schedule in [("fixed 200 ms", PollSchedule({'RUNNING': (0.2, 0.2)})), ("adaptive 200 ms..2 s", PollSchedule())]:
+        now, checks, pending, delays = 0.0, 0, list(events), []
+        while now < duration:
+            anomaly = False
+            while pending and pending[0] <= now:
+                delays.append(now - pending.pop(0))
+                anomaly = True
+            schedule.record('RUNNING', anomaly)
+            checks += 1
+            now += schedule.interval('RUNNING')
+        delays.sort()
+        print("{:<22} {:>6} checks   change noticed after p50 {:>5.0f} ms  max {:>5.0f} ms".format(
+            label, checks, delays[len(delays) // 2] * 1000, delays[-1] * 1000))
+
+def bench_telemetry(rate: float = 10.0, duration: float = 5.0, budget: float = 0.005):
+    print("--- resource sampling at {:.0f} Hz for {:.0f} s, budget {:.1%} of a core ---".format(rate, duration, budget))
+    #sample a busy child so there's something to measure
+    child = subprocess.Popen([sys.executable, "-c", "while True: pass"])
+    try:
+        sampler = ResourceSampler(psutil.Process(child.pid), rate, capacity=int(rate * duration / 2))
+        sampler.start()
+        time.sleep(duration)
+        sampler.stop()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = sampler.write_sidecar(os.path.join(tmp, "session.mkv"))
+            size = os.path.getsize(path)
+    finally:
+        child.kill()
+        child.wait()
+    cpu = sampler.samples("cpu_percent")
+    print("{} samples ({} kept)   sampler cpu {:.2f} ms/sample   overhead {:.3%} of a core   child cpu {:.0f}%   sidecar {} bytes".format(
+        sampler.count, len(cpu), sampler.cpu_time * 1000 / sampler.count, sampler.overhead(), sum(cpu) / len(cpu), size))
+    assert sampler.overhead() < budget
+
+def bench_event_queue(workers: int = 8, transitions: int = 20000, drain_hz: float = 60.0):
+    print("--- {} workers x {} transitions into the OBS queue, drained at {:.0f} Hz ---".format(workers, transitions, drain_hz))
+    events = EventQueue()
+    handled = []
+    states = ['STARTING', 'RUNNING', 'RUNNING', 'RUNNING', 'CRASHED']
+    publish_times = []
+
+    def worker(n):
+        rng = random.Random(n)
+        slowest = 0.0
+        for i in range(transitions):
+            start = time.perf_counter()
+            events.publish(n, rng.choice(states), handled.append)
+            slowest = max(slowest, time.perf_counter() - start)
+            if i % 20 == 0:
+                time.sleep(0.001)
+        publish_times.append(slowest)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(workers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    drains, slowest_drain = 0, 0.0
+    while any(thread.is_alive() for thread in threads) or events.depth():
+        #stands in for script_tick
+        drain_start = time.perf_counter()
+        events.drain()
+        slowest_drain = max(slowest_drain, time.perf_counter() - drain_start)
+        drains += 1
+        time.sleep(1.0 / drain_hz)
+    elapsed = time.perf_counter() - start
+    metrics = events.metrics()
+    print("{published} published in {elapsed:.2f} s   {coalesced} coalesced   {drained} handled in {drains} drains   max depth {max_depth}".format(
+        elapsed=elapsed, drains=drains, **metrics))
+    print("slowest publish {:.0f} us   slowest drain {:.2f} ms   drain latency mean {:.1f} ms max {:.1f} ms".format(
+        max(publish_times) * 1e6, slowest_drain * 1000, metrics["mean_drain_latency"] * 1000, metrics["max_drain_latency"] * 1000))
+    assert metrics["published"] == metrics["coalesced"] + metrics["drained"] == len(handled) + metrics["coalesced"]
+    assert metrics["max_depth"] <= workers * events.max_per_slot
+
+def bench_monitor_daemon(reads: int = 20000):
+    print("--- out-of-process monitor, {} status reads from the script side ---".format(reads))
+    game = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    daemon = MonitorDaemon(0.05)
+    try:
+        daemon.start()
+        daemon.configure(psutil.Process(game.pid).name(), "Old Skies", "SDL_app", "Adventure Game Studio", "#32770")
+        deadline = time.monotonic() + 5.0
+        while (daemon.read() is None or daemon.read().game_pid == 0) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        start = time.perf_counter()
+        for _ in range(reads):
+            status = daemon.read()
+        elapsed = time.perf_counter() - start
+        print("{:.2f} us/read   daemon scan {:.2f} ms   {} scans so far   game pid seen: {}".format(
+            elapsed * 1e6 / reads, status.scan_seconds * 1000, status.scans, status.game_pid != 0))
+    finally:
+        started = time.perf_counter()
+        daemon.stop()
+        print("daemon stopped in {:.0f} ms".format((time.perf_counter() - started) * 1000))
+        game.kill()
+        game.wait()
+
+def bench_window_snapshot(windows: int = 400, ticks: int = 50, enum_cost: float = 0.000002):
+    print("--- window checks, {} top-level windows, {} ticks, {:.0f} us per window enumerated ---".format(windows, ticks, enum_cost * 1e6))
+    rng = random.Random(4)
+    game_pid = 4242
+    #max_age < 0 never reuses a snapshot, i.e. a full walk per check like the separate EnumWindows/FindWindow calls did
+    for label, max_age in [("walk per check", -1.0), ("snapshot per tick", 60.0)]:
+        backend = FakeWindowBackend(max_age, enum_cost)
+        for i in range(windows):
+            backend.add_window(rng.randrange(100, 5000), "Window {}".format(i), "Class{}".format(i % 17), visible=rng.random() < 0.3)
+        main_hwnd = backend.add_window(game_pid, "Old Skies", "SDL_app")
+        ProcessStateMachine.window_backend = backend
+        start = time.perf_counter()
+        for _ in range(ticks):
+            backend.invalidate()
+            #what a tick of ProcessStateMachine + gameutil.get_process_status + ags_qa.findWindow asks for
+            assert ProcessStateMachine.get_window_count(game_pid) == 1
+            assert backend.snapshot().exists(main_hwnd)
+            assert backend.snapshot().find("SDL_app", "Old Skies") == main_hwnd
+            assert backend.snapshot().find("#32770", "Adventure Game Studio") == 0
+            assert backend.snapshot().windows_of(game_pid)[-1].hwnd == main_hwnd
+        elapsed = time.perf_counter() - start
+        print("{:<20} {:>7.3f} ms/tick   {:>4} enumerations".format(label, elapsed * 1000 / ticks, backend.enumerations))
+    ProcessStateMachine.window_backend = None
+
+if __name__ == "__main__":
+    bench_process_index()
+    bench_process_tree()
+    bench_exit_latency()
+    bench_window_snapshot()
+    bench_supervisor()
+    bench_poll_schedule()
+    bench_telemetry()
+    bench_event_queue()
+    bench_monitor_daemon()
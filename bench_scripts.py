@@ -0,0 +1,205 @@
+'''
+Benchmarks for the OBS scripts themselves, driven headless through fake_obspython on a large fake scene collection.
+
+    python bench_scripts.py
+'''
+import contextlib, io, time
+import fake_obspython
+
+fake = fake_obspython.install()
+
+import psutil
+import ags_qa
+import full_pngtub_new
+from obsutil import obsutil
+
+obs = fake.module
+
+SCENE_NAME = "Old Skies Scene"
+SOURCE_NAME = "Old Skies"
+
+def build_collection(scenes: int, items: int):
+    '''
+    `scenes` scenes of `items` image sources each, with the QA scene and its game capture last, where a linear search finds them slowest.
+    '''
+    fake.reset()
+    for i in range(scenes):
+        fake.add_scene("Scene {}".format(i))
+        for j in range(items):
+            fake.add_source("Scene {}".format(i), "Image {}.{}".format(i, j), "image_source")
+    fake.add_scene(SCENE_NAME)
+    for j in range(items):
+        fake.add_source(SCENE_NAME, "Overlay {}".format(j), "image_source")
+    fake.add_source(SCENE_NAME, SOURCE_NAME, "game_capture").source.width = 1280
+
+def linear_find_scene(scene_name: str):
+    '''
+    What obsutil.find_scene did before the SceneIndex: a walk over the frontend's scenes, every call.
+    '''
+    scene = None
+    scenes = obs.obs_frontend_get_scenes()
+    for scene_source in scenes:
+        if obs.obs_source_get_name(scene_source) == scene_name:
+            scene = obs.obs_scene_from_source(scene_source)
+            break
+    obs.source_list_release(scenes)
+    return scene
+
+def linear_find_scene_item(scene, source_name: str):
+    found = None
+    scene_items = obs.obs_scene_enum_items(scene)
+    for scene_item in scene_items:
+        if obs.obs_source_get_name(obs.obs_sceneitem_get_source(scene_item)) == source_name:
+            found = scene_item
+            break
+    obs.sceneitem_list_release(scene_items)
+    return found
+
+def bench_scene_lookups(scenes: int = 40, items: int = 20, lookups: int = 2000):
+    print("--- find_scene + find_scene_item, {} scenes of {} items, {} lookups ---".format(scenes, items, lookups))
+    build_collection(scenes, items)
+    index = obsutil.get_scene_index()
+    index.invalidate()
+    for label, find_scene, find_scene_item in [("linear walk", linear_find_scene, linear_find_scene_item),
+                                               ("scene index", obsutil.find_scene, obsutil.find_scene_item)]:
+        fake.calls.clear()
+        start = time.perf_counter()
+        for _ in range(lookups):
+            item = find_scene_item(find_scene(SCENE_NAME), SOURCE_NAME)
+        elapsed = time.perf_counter() - start
+        assert obs.obs_source_get_name(obs.obs_sceneitem_get_source(item)) == SOURCE_NAME
+        print("{:<12} {:>8.2f} us/lookup {:>8.1f} API calls/lookup".format(label, elapsed * 1e6 / lookups, sum(fake.calls.values()) / lookups))
+    index.detach()
+
+def unbatched_reset(scene_item, width: int, height: int):
+    '''
+    What obsutil.reset_transform_and_crop did before the batching: a set_info and a set_crop per item, changed or not.
+    '''
+    transform_info = obs.obs_transform_info()
+    obs.obs_sceneitem_get_info(scene_item, transform_info)
+    obs.vec2_set(transform_info.pos, 0.0, 0.0)
+    transform_info.rot = 0.0
+    transform_info.alignment = 5
+    transform_info.scale.x = transform_info.scale.y = 1.0
+    transform_info.bounds_type = obs.OBS_BOUNDS_SCALE_INNER
+    transform_info.bounds_alignment = 0
+    transform_info.bounds.x, transform_info.bounds.y = width, height
+    obs.obs_sceneitem_set_info(scene_item, transform_info)
+    crop_info = obs.obs_sceneitem_crop()
+    obs.obs_sceneitem_get_crop(scene_item, crop_info)
+    crop_info.left = crop_info.right = crop_info.top = crop_info.bottom = 0
+    obs.obs_sceneitem_set_crop(scene_item, crop_info)
+
+def bench_transforms(scenes: int = 12, hooks: int = 100):
+    print("--- re-fitting the capture shown in {} scenes, {} hooks alternating between two resolutions ---".format(scenes, hooks))
+    for label in ("item by item", "batched"):
+        fake.reset()
+        fake.add_scene(SCENE_NAME)
+        for i in range(scenes):
+            fake.add_scene("Scene {}".format(i))
+            fake.add_source("Scene {}".format(i), SOURCE_NAME, "game_capture")
+        items = [item for scene in fake.scenes for item in scene.scene.items]
+        start = time.perf_counter()
+        changed = 0
+        for hook in range(hooks):
+            #a game hooks at the same resolution as the last time more often than not
+            width, height = (1280, 720) if hook % 4 else (1920, 1080)
+            if label == "item by item":
+                for item in items:
+                    unbatched_reset(item, width, height)
+                changed += len(items)
+            else:
+                changed += obsutil.reset_transforms_and_crops(items, width, height)
+        elapsed = time.perf_counter() - start
+        print("{:<13} {:>8.1f} us/hook {:>6} items set {:>6} transform updates".format(label, elapsed * 1e6 / hooks, changed, fake.transform_updates))
+
+def bench_source_settings(applies: int = 1000, changes: int = 20):
+    print("--- pointing the capture at a window {} times, {} of them a different window ---".format(applies, changes))
+    for label in ("always update", "dirty-checked"):
+        fake.reset()
+        fake.add_scene(SCENE_NAME)
+        source = fake.add_source(SCENE_NAME, SOURCE_NAME, "game_capture").source
+        obsutil.source_settings = None
+        start = time.perf_counter()
+        for i in range(applies):
+            window = "Old Skies:SDL_app:OldSkies{}.exe".format(i * changes // applies)
+            if label == "always update":
+                settings = obs.obs_source_get_settings(source)
+                obs.obs_data_set_string(settings, "window", window)
+                obs.obs_source_update(source, settings)
+                obs.obs_data_release(settings)
+            else:
+                obsutil.apply_source_settings(source, {"window": window})
+        elapsed = time.perf_counter() - start
+        print("{:<14} {:>6.2f} us/apply {:>6} source updates".format(label, elapsed * 1e6 / applies, source.updates))
+    obsutil.get_source_settings().detach()
+
+def bench_hook(scenes: int = 40, items: int = 20, hooks: int = 200):
+    print("--- ags_qa game_hooked_callback, {} scenes of {} items, {} hooks ---".format(scenes, items, hooks))
+    build_collection(scenes, items)
+    with contextlib.redirect_stdout(io.StringIO()):
+        fake.load_script(ags_qa, {"scene_name": SCENE_NAME, "source_name": SOURCE_NAME})
+        fake.finish_loading()
+        #already found, so the hook doesn't go looking for the game among the real processes
+        ags_qa.proc = psutil.Process()
+        source = fake.sources[SOURCE_NAME]
+        calldata = {"source": source, "title": SOURCE_NAME, "class": "SDL_app", "executable": "OldSkies.exe"}
+        fake.calls.clear()
+        start = time.perf_counter()
+        for _ in range(hooks):
+            source.handler.signal("hooked", calldata)
+        elapsed = time.perf_counter() - start
+        calls = sum(fake.calls.values())
+        ags_qa.proc = None
+        fake.unload_script(ags_qa)
+    print("{:>8.1f} us/hook {:>8.1f} API calls/hook, {} transform updates, {} errors, {} unreleased references".format(
+        elapsed * 1e6 / hooks, calls / hooks, fake.transform_updates, len(fake.errors), len(fake.unreleased())))
+
+def bench_pngtuber(seconds: float = 60.0, toggle: float = 0.5, avatars: int = 4):
+    print("--- pngtuber, {:.0f} s at 60 fps, the gate toggling every {} s, {} bouncing items ---".format(seconds, toggle, avatars))
+    fake.reset()
+    fake.add_scene("Avatar")
+    fake.add_source("Avatar", "Mic/Aux", "wasapi_input_capture")
+    for i in range(avatars):
+        fake.add_scene("Avatar {}".format(i))
+        obs.obs_sceneitem_set_locked(fake.add_source("Avatar {}".format(i), "Tuber", "image_source", {"file": "idle.png"}), True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        fake.load_script(full_pngtub_new, {"source": "Tuber", "img_idle": "idle.png", "img_active": "active.png"})
+        fake.patch_time(full_pngtub_new)
+        fake.calls.clear()
+        start = time.perf_counter()
+        elapsed_fake = 0.0
+        loud = False
+        while elapsed_fake < seconds:
+            loud = not loud
+            fake.set_audio_level("Mic/Aux", -10.0 if loud else -90.0)
+            fake.advance(toggle)
+            elapsed_fake += toggle
+        elapsed = time.perf_counter() - start
+        fake.unload_script(full_pngtub_new)
+    tuber = fake.sources["Tuber"]
+    print("{:>8.2f} ms of script per second {:>8.1f} API calls/frame, {} source updates, {} transform updates, {} errors".format(
+        elapsed * 1000 / seconds, sum(fake.calls.values()) / (seconds * 60), tuber.updates, fake.transform_updates, len(fake.errors)))
+
+def bench_saves(captures: int = 30, spacing: float = 0.1):
+    print("--- creating {} game captures {} s apart ---".format(captures, spacing))
+    fake.reset()
+    fake.add_scene(SCENE_NAME)
+    scene = obsutil.find_scene(SCENE_NAME)
+    obsutil.saves = obsutil.saves_requested = 0
+    for i in range(captures):
+        source = obsutil.create_game_capture_source(scene, "Capture {}".format(i), "OldSkies{}.exe".format(i))
+        obs.obs_source_release(source)
+        fake.advance(spacing)
+    fake.advance(obsutil.save_delay)
+    metrics = obsutil.save_metrics()
+    print("{} saves requested, {} collection saves, {} avoided".format(metrics["requested"], fake.calls["obs_frontend_save"], metrics["avoided"]))
+    obsutil.get_scene_index().detach()
+
+if __name__ == "__main__":
+    bench_scene_lookups()
+    bench_transforms()
+    bench_source_settings()
+    bench_hook()
+    bench_pngtuber()
+    bench_saves()
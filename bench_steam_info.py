@@ -0,0 +1,298 @@
+'''
+Benchmarks for the Steam library helpers in steam_info_lib, run against generated fixtures so they work off Windows and without Steam.
+
+    python bench_steam_info.py
+'''
+import os, re, time, random, struct, tempfile
+from steam_info_lib import vdf, steamutil, ManifestScanner, MemoryRegistryBackend, AppNameIndex, AppInfoReader
+
+MANIFEST_TEMPLATE = '''"AppState"
+{{
+	"appid"		"{app_id}"
+	"universe"		"1"
+	"LauncherPath"		"C:\\\\Program Files (x86)\\\\Steam\\\\steam.exe"
+	"name"		"{name}"
+	"StateFlags"		"4"
+	"installdir"		"{installdir}"
+	"LastUpdated"		"1700000000"
+	"SizeOnDisk"		"{size}"
+	"StagingSize"		"0"
+	"buildid"		"{buildid}"
+	"LastOwner"		"76561190000000000"
+	"UpdateResult"		"0"
+	"BytesToDownload"		"0"
+	"BytesDownloaded"		"0"
+	"AutoUpdateBehavior"		"0"
+	"AllowOtherDownloadsWhileRunning"		"0"
+	"ScheduledAutoUpdate"		"0"
+	"InstalledDepots"
+	{{
+{depots}	}}
+	"UserConfig"
+	{{
+		"language"		"english"
+	}}
+	"MountedConfig"
+	{{
+		"language"		"english"
+	}}
+}}
+'''
+
+DEPOT_TEMPLATE = '''		"{depot}"
+		{{
+			"manifest"		"{manifest}"
+			"size"		"{size}"
+		}}
+'''
+
+def generate_manifest(app_id: int, rng: random.Random) -> str:
+    depots = "".join(DEPOT_TEMPLATE.format(depot=app_id+i+1, manifest=rng.getrandbits(62), size=rng.getrandbits(30)) for i in range(rng.randint(1, 4)))
+    return MANIFEST_TEMPLATE.format(app_id=app_id, name="Game \\\"{}\\\" Edition".format(app_id), installdir="Game{}".format(app_id),
+                                    size=rng.getrandbits(34), buildid=rng.getrandbits(24), depots=depots)
+
+def generate_corpus(directory: str, count: int, seed: int = 1) -> list[str]:
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        app_id = 10000 + i * 10
+        path = os.path.join(directory, "appmanifest_{}.acf".format(app_id))
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(generate_manifest(app_id, rng))
+        paths.append(path)
+    return paths
+
+def regex_install_dir(potential_app_manifest):
+    '''
+    The per-line regex scan steamutil.get_install_dir used before the vdf parser, kept as the baseline.
+    '''
+    game_name = ""
+    with open(potential_app_manifest, 'r') as file:
+        for line in file:
+            if line.strip():
+                name_match = re.search(r'"name"\s*"(.*?)"', line)
+                if(name_match):
+                    game_name = name_match.group(1)
+                installdir_match = re.search(r'"installdir"\s*"(.*?)"', line)
+                if installdir_match:
+                    return [game_name, installdir_match.group(1)]
+        return ["", ""]
+
+def timed(label: str, func, paths: list[str]):
+    start = time.perf_counter()
+    results = [func(path) for path in paths]
+    elapsed = time.perf_counter() - start
+    print("{:<28} {:>9.1f} ms  {:>7.2f} us/manifest".format(label, elapsed * 1000, elapsed * 1e6 / len(paths)))
+    return results
+
+def bench_vdf(count: int = 5000):
+    print("--- manifest parsing, {} manifests ---".format(count))
+    with tempfile.TemporaryDirectory() as directory:
+        paths = generate_corpus(directory, count)
+        regex = timed("regex per line", regex_install_dir, paths)
+        full = timed("vdf.load (full tree)", vdf.load, paths)
+        lazy = timed("steamutil.get_install_dir", steamutil.get_install_dir, paths)
+
+    #the regex baseline stops at the escaped quote, the parser must not
+    for tree, (name, installdir) in zip(full, lazy):
+        assert tree["AppState"]["name"] == name and tree["AppState"]["installdir"] == installdir
+    assert regex[0][0] != lazy[0][0] and regex[0][1] == lazy[0][1]
+
+def generate_library_tree(directory: str, libraries: int, per_library: int) -> list[str]:
+    steamapps_dirs = []
+    for lib in range(libraries):
+        steamapps = os.path.join(directory, "lib{}".format(lib), "steamapps")
+        os.makedirs(steamapps)
+        rng = random.Random(lib)
+        for i in range(per_library):
+            app_id = (lib + 1) * 100000 + i * 10
+            with open(os.path.join(steamapps, "appmanifest_{}.acf".format(app_id)), 'w', encoding='utf-8') as file:
+                file.write(generate_manifest(app_id, rng))
+        steamapps_dirs.append(steamapps)
+    return steamapps_dirs
+
+def slow_reader(latency: float):
+    '''
+    Wraps steamutil.read_manifest with a fixed sleep per open, standing in for a spinning or network drive.
+    '''
+    def read(path):
+        time.sleep(latency)
+        return steamutil.read_manifest(path)
+    return read
+
+def serial_find_first(steamapps_dirs: list[str], reader, match):
+    for steamapps in steamapps_dirs:
+        for name in os.listdir(steamapps):
+            if name.startswith("appmanifest_") and name.endswith(".acf"):
+                path = os.path.join(steamapps, name)
+                manifest = reader(path)
+                if match(path, manifest):
+                    return path, manifest
+    return None
+
+def bench_parallel_scan(libraries: int = 4, per_library: int = 200, latency: float = 0.002):
+    print("--- manifest scanning, {} libraries x {} manifests, {:.1f} ms per open ---".format(libraries, per_library, latency * 1000))
+    reader = slow_reader(latency)
+    with tempfile.TemporaryDirectory() as directory:
+        steamapps_dirs = generate_library_tree(directory, libraries, per_library)
+        #a game at the end of the last library, the serial walk's worst case
+        target = "Game \"{}\" Edition".format(libraries * 100000 + (per_library - 1) * 10)
+        match = lambda path, manifest: manifest.get("name") == target
+        jobs = {steamapps: [os.path.join(steamapps, name) for name in os.listdir(steamapps)] for steamapps in steamapps_dirs}
+
+        start = time.perf_counter()
+        serial = serial_find_first(steamapps_dirs, reader, match)
+        print("{:<36} {:>9.1f} ms".format("serial find first", (time.perf_counter() - start) * 1000))
+
+        for max_workers, per_root in [(4, 1), (8, 2), (16, 4)]:
+            scanner = ManifestScanner(max_workers, per_root, reader)
+            start = time.perf_counter()
+            found = scanner.find_first(steamapps_dirs, match)
+            elapsed = time.perf_counter() - start
+            assert found is not None and found[0] == serial[0]
+            start = time.perf_counter()
+            results = scanner.map(jobs, reader)
+            elapsed_all = time.perf_counter() - start
+            assert len(results) == libraries * per_library
+            print("{:<36} {:>9.1f} ms   read all {:>9.1f} ms".format("parallel {} workers, {} per root".format(max_workers, per_root), elapsed * 1000, elapsed_all * 1000))
+
+class RoundTripRegistry(MemoryRegistryBackend):
+    '''
+    MemoryRegistryBackend that charges a fixed cost per subkey opened, roughly what each winreg round-trip costs.
+    '''
+    def __init__(self, apps: dict, latency: float):
+        super().__init__("C:/Program Files (x86)/Steam", apps)
+        self.latency = latency
+
+    def enum_apps(self):
+        for app_id, name in super().enum_apps():
+            deadline = time.perf_counter() + self.latency
+            while time.perf_counter() < deadline:
+                pass
+            yield app_id, name
+
+def linear_app_id_by_name(registry, game_name: str):
+    '''
+    The full enumeration get_app_id_by_name did on every call before the AppNameIndex.
+    '''
+    for app_id, name in registry.enum_apps():
+        if name.lower() == game_name.lower():
+            return app_id
+    return None
+
+def bench_app_name_index(apps: int = 3000, lookups: int = 50, latency: float = 0.00002):
+    print("--- app name resolution, {} registry apps, {} lookups, {:.0f} us per subkey ---".format(apps, lookups, latency * 1e6))
+    registry = RoundTripRegistry({str(10 + i * 10): "Game {}".format(i) for i in range(apps)}, latency)
+    rng = random.Random(3)
+    names = ["GAME {}".format(rng.randrange(apps)) for _ in range(lookups)]
+
+    start = time.perf_counter()
+    linear = [linear_app_id_by_name(registry, name) for name in names]
+    print("{:<36} {:>9.1f} ms".format("enumerate per lookup", (time.perf_counter() - start) * 1000))
+
+    index = AppNameIndex(registry)
+    registry.enumerations = 0
+    start = time.perf_counter()
+    indexed = [index.get(name) for name in names]
+    print("{:<36} {:>9.1f} ms   ({} enumeration)".format("AppNameIndex", (time.perf_counter() - start) * 1000, registry.enumerations))
+    assert linear == indexed
+
+    registry.set_app("999999", "New Game")
+    assert index.get("new game") == "999999" and registry.enumerations == 2
+
+class AppInfoWriter:
+    '''
+    Writes synthetic appinfo.vdf files (v27/v28 with inline keys, v29 with a string table) for AppInfoReader.
+    '''
+    def __init__(self, magic: int = AppInfoReader.MAGIC_V29):
+        self.magic = magic
+        self.strings = {}
+
+    def key(self, key: str) -> bytes:
+        if self.magic != AppInfoReader.MAGIC_V29:
+            return key.encode() + b"\0"
+        return struct.pack("<I", self.strings.setdefault(key, len(self.strings)))
+
+    def encode_map(self, tree: dict) -> bytes:
+        out = bytearray()
+        for key, value in tree.items():
+            if isinstance(value, dict):
+                out += bytes([AppInfoReader.TYPE_MAP]) + self.key(key) + self.encode_map(value)
+            elif isinstance(value, str):
+                out += bytes([AppInfoReader.TYPE_STRING]) + self.key(key) + value.encode() + b"\0"
+            elif isinstance(value, float):
+                out += bytes([AppInfoReader.TYPE_FLOAT32]) + self.key(key) + struct.pack("<f", value)
+            elif value >= 2**31:
+                out += bytes([AppInfoReader.TYPE_UINT64]) + self.key(key) + struct.pack("<Q", value)
+            else:
+                out += bytes([AppInfoReader.TYPE_INT32]) + self.key(key) + struct.pack("<i", value)
+        return bytes(out + bytes([AppInfoReader.TYPE_END]))
+
+    def write(self, path: str, apps: dict):
+        body = bytearray()
+        for app_id, tree in apps.items():
+            header = struct.pack("<IIQ20sI", 2, 1700000000, 0, bytes(20), 1)
+            if self.magic != AppInfoReader.MAGIC_V27:
+                header += bytes(20)
+            payload = header + self.encode_map(tree)
+            body += struct.pack("<II", app_id, len(payload)) + payload
+        body += struct.pack("<I", 0)
+        with open(path, 'wb') as file:
+            if self.magic == AppInfoReader.MAGIC_V29:
+                table = struct.pack("<I", len(self.strings)) + b"".join(key.encode() + b"\0" for key in self.strings)
+                file.write(struct.pack("<IIq", self.magic, 1, 16 + len(body)) + body + table)
+            else:
+                file.write(struct.pack("<II", self.magic, 1) + body)
+
+def generate_appinfo_tree(app_id: int, rng: random.Random) -> dict:
+    launch = {
+        "0": {"executable": "Game{}_linux.sh".format(app_id), "type": "default", "config": {"oslist": "linux"}},
+        "1": {"executable": "tools\\Editor{}.exe".format(app_id), "type": "option1", "config": {"oslist": "windows"}},
+        "2": {"executable": "Game{}.exe".format(app_id), "arguments": "-windowed", "type": "default", "config": {"oslist": "windows"}},
+    }
+    depots = {str(app_id + i + 1): {"manifests": {"public": {"gid": str(rng.getrandbits(63)), "size": rng.getrandbits(40)}}} for i in range(rng.randint(2, 12))}
+    return {"appinfo": {
+        "appid": app_id,
+        "common": {"name": "Game {}".format(app_id), "type": "Game", "oslist": "windows,linux", "review_percentage": rng.randint(0, 100)},
+        "config": {"installdir": "Game{}".format(app_id), "launch": launch},
+        "depots": depots,
+    }}
+
+def bench_appinfo(sizes = (1000, 10000, 40000), lookups: int = 2000):
+    print("--- appinfo.vdf launch executable lookups ---")
+    for magic in (AppInfoReader.MAGIC_V28, AppInfoReader.MAGIC_V29):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "appinfo.vdf")
+            AppInfoWriter(magic).write(path, {7: {"appinfo": {"appid": 7, "common": {"name": "Tiny \u00e9"}, "config": {"launch": {
+                "0": {"executable": "tiny.exe", "config": {"oslist": "windows"}}}}}}})
+            with AppInfoReader(path) as reader:
+                assert list(reader.app_ids()) == [7] and reader.get_name(7) == "Tiny \u00e9"
+                assert reader.get_launch_executable(7) == "tiny.exe" and reader.get_launch_executable(7, "linux") is None
+
+    for count in sizes:
+        rng = random.Random(count)
+        apps = {10 + i * 10: generate_appinfo_tree(10 + i * 10, rng) for i in range(count)}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "appinfo.vdf")
+            AppInfoWriter().write(path, apps)
+            size = os.path.getsize(path)
+            targets = [rng.choice(list(apps)) for _ in range(lookups)]
+            with AppInfoReader(path) as reader:
+                start = time.perf_counter()
+                reader.app_ids()
+                indexed = time.perf_counter() - start
+                #the first pass also pays for faulting the mmap'd pages in, the second one is the decode alone
+                per_lookup = []
+                for _ in range(2):
+                    start = time.perf_counter()
+                    for app_id in targets:
+                        reader.cache.clear()
+                        assert reader.get_launch_executable(app_id) == "Game{}.exe".format(app_id)
+                    per_lookup.append((time.perf_counter() - start) / lookups)
+            print("{:>6} apps {:>6.1f} MB   index {:>6.1f} ms   lookup {:>6.1f} us cold {:>6.1f} us warm".format(count, size / 2**20, indexed * 1000, per_lookup[0] * 1e6, per_lookup[1] * 1e6))
+
+if __name__ == "__main__":
+    bench_vdf()
+    bench_parallel_scan()
+    bench_app_name_index()
+    bench_appinfo()
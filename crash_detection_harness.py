@@ -0,0 +1,327 @@
+'''
+Crash detection harness: plays scripted game timelines (start, main window, crash dialog, exit) against a fake window system
+and a real, harmless child process, and measures how fast and how accurately each crash detector notices.
+
+    python crash_detection_harness.py [--runs N] [--seed S] [--json results.json]
+
+Detectors:
+    ProcessStateMachine.running     the state machine's own loop, as MonitoringThread runs it
+    gameutil.get_process_status     polled every 200 ms, reporting a crash on STATUS_STOPPED
+    ags_qa.did_qa_crash             called once when the game capture unhooks, like game_unhooked_callback does
+
+Runs headless on Linux: obspython is replaced with fake_obspython when it isn't importable.
+Exits with 1 when any run's outcome differs from what EXPECTED says for its detector and scenario (either way, a known miss
+that starts getting caught should be written down too), or a detector's p95 latency goes over its LATENCY_LIMITS plus --latency-slack,
+so it doubles as a regression suite.
+'''
+import argparse, contextlib, io, json, random, subprocess, sys, threading, time
+import fake_obspython
+
+try:
+    import obspython
+except ImportError:
+    #gameutil and ags_qa import obspython at module level
+    fake_obspython.install()
+
+import psutil
+import window_backend
+from window_backend import FakeWindowBackend
+from process_state_machine import ProcessStateMachine
+from gameutil import gameutil
+import ags_qa
+
+EXE_NAME = "OldSkies.exe"
+MAIN_TITLE, MAIN_CLASS = "Old Skies", "SDL_app"
+CRASH_TITLE, CRASH_CLASS = "Adventure Game Studio", "#32770"
+
+#per detector and scenario, the outcome every run has to have ("ok", "miss" or "false_positive"), known failures included
+EXPECTED = {
+    "ProcessStateMachine.running": {"crash_dialog": "ok", "window_vanish": "ok", "clean_exit": "ok", "slow_exit": "ok",
+                                    #a recreated main window looks like it vanished for longer than crash_grace
+                                    "window_recreate": "false_positive"},
+    "gameutil.get_process_status": {"crash_dialog": "ok", "window_vanish": "miss", "clean_exit": "ok", "slow_exit": "ok", "window_recreate": "ok"},
+    "ags_qa.did_qa_crash": {"crash_dialog": "ok", "window_vanish": "miss", "clean_exit": "ok", "slow_exit": "ok", "window_recreate": "ok"},
+}
+
+#per detector, the p95 latency (seconds) its design allows for: crash_grace plus a check, the latest crash dialog plus one poll interval,
+#the slowest unhook. Runs play out in wall-clock time, so --latency-slack gets added on top for scheduling noise on a busy machine
+LATENCY_LIMITS = {
+    "ProcessStateMachine.running": 0.7,
+    "gameutil.get_process_status": 0.4,
+    "ags_qa.did_qa_crash": 0.1,
+}
+LATENCY_SLACK = 0.3
+
+class Timeline:
+    '''
+    A scripted run of the simulated game: (seconds after start, action) pairs, and when the crash really happened (None if it didn't).
+    Actions are "main_window", "close_main_window", "crash_dialog", "close_crash_dialog", "extra_window" and "exit".
+    '''
+    def __init__(self, scenario: str, events: list, crash_at: float = None, unhook_delay: float = 0.05, dialog_after_unhook: bool = False):
+        self.scenario = scenario
+        self.events = sorted(events)
+        self.crash_at = crash_at
+        #how long game capture takes to notice the hooked window is gone
+        self.unhook_delay = unhook_delay
+        #the crash dialog only comes up after game capture unhooked
+        self.dialog_after_unhook = dialog_after_unhook
+
+
+def make_timeline(scenario: str, rng: random.Random) -> Timeline:
+    shown = 0.1
+    at = shown + rng.uniform(0.2, 0.4)
+    unhook_delay = rng.uniform(0.06, 0.1)
+    start = [(shown, "main_window")]
+    if scenario == "crash_dialog":
+        #AGS tears the game window down, then puts up its error box; the process lives until the tester dismisses it.
+        #The box comes up either clearly before or clearly after the unhook, never close enough for scheduling noise to swap them
+        dialog_after_unhook = rng.random() < 0.5
+        if dialog_after_unhook:
+            dialog_at = at + unhook_delay + rng.uniform(0.04, 0.08)
+        else:
+            dialog_at = at + rng.uniform(0.0, unhook_delay - 0.04)
+        return Timeline(scenario, start + [(at, "close_main_window"), (dialog_at, "crash_dialog"),
+                                           (dialog_at + 0.8, "close_crash_dialog"), (dialog_at + 0.8, "exit")], at, unhook_delay, dialog_after_unhook)
+    if scenario == "window_vanish":
+        #main window gone, process still up with a window that isn't the AGS dialog
+        return Timeline(scenario, start + [(at - 0.1, "extra_window"), (at, "close_main_window"), (at + 0.9, "exit")], at, unhook_delay)
+    if scenario == "clean_exit":
+        return Timeline(scenario, start + [(at, "close_main_window"), (at + 0.05, "exit")], None, unhook_delay)
+    if scenario == "slow_exit":
+        #saving on the way out with no window up
+        return Timeline(scenario, start + [(at, "close_main_window"), (at + 0.3, "exit")], None, unhook_delay)
+    if scenario == "window_recreate":
+        #switching to fullscreen recreates the main window
+        return Timeline(scenario, start + [(at, "close_main_window"), (at + 0.1, "main_window"), (at + 0.9, "close_main_window"),
+                                           (at + 0.95, "exit")], None, unhook_delay)
+    raise ValueError(scenario)
+
+SCENARIOS = ["crash_dialog", "window_vanish", "clean_exit", "slow_exit", "window_recreate"]
+
+
+class SimulatedGame:
+    '''
+    Plays a Timeline: windows go into the fake backend under the pid of a real child process that just sleeps, and "exit" kills it,
+    so psutil, Popen.wait and pid checks all see a real process come and go.
+    '''
+    def __init__(self, timeline: Timeline, backend: FakeWindowBackend):
+        self.timeline = timeline
+        self.backend = backend
+        self.process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+        self.started_at = time.monotonic()
+        self.main_hwnd = None
+        self.crash_hwnd = None
+        self.unhooks = []
+        self.done = threading.Event()
+
+    def at(self, offset: float) -> float:
+        return self.started_at + offset
+
+    def play(self):
+        for offset, action in self.timeline.events:
+            delay = self.at(offset) - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            pid = self.process.pid
+            if action == "main_window":
+                self.main_hwnd = self.backend.add_window(pid, MAIN_TITLE, MAIN_CLASS)
+            elif action == "close_main_window":
+                self.backend.remove_window(self.main_hwnd)
+                self.unhooks.append(time.monotonic() + self.timeline.unhook_delay)
+            elif action == "crash_dialog":
+                self.crash_hwnd = self.backend.add_window(pid, CRASH_TITLE, CRASH_CLASS)
+            elif action == "close_crash_dialog":
+                self.backend.remove_window(self.crash_hwnd)
+            elif action == "extra_window":
+                self.backend.add_window(pid, "Old Skies - Log", "ConsoleWindowClass")
+            elif action == "exit":
+                self.backend.remove_windows_of(pid)
+                self.process.kill()
+                self.process.wait()
+        self.done.set()
+
+
+class HarnessStateMachine(ProcessStateMachine):
+    '''
+    ProcessStateMachine that adopts the simulated game instead of launching one, and remembers when it decided.
+    '''
+    def __init__(self, game: SimulatedGame):
+        super().__init__(EXE_NAME, self.on_done)
+        self.game = game
+        self.verdict_at = None
+        self.cpu = 0.0
+
+    def launch(self):
+        return self.game.process
+
+    def initializing(self):
+        super().initializing()
+        #the child is a python interpreter, match windows against the game's exe name like the real thing would
+        self.process_name = EXE_NAME
+
+    def on_done(self, state):
+        self.verdict_at = time.monotonic()
+
+    def run(self):
+        start = time.thread_time()
+        super().run()
+        self.cpu = time.thread_time() - start
+
+
+def expected_outcome(detector: str, timeline: Timeline) -> str:
+    if detector == "ags_qa.did_qa_crash" and timeline.dialog_after_unhook:
+        #it only looks once, when capture unhooks, a dialog that isn't up yet is out of its reach
+        return "miss"
+    return EXPECTED[detector][timeline.scenario]
+
+
+class Result:
+    def __init__(self, timeline: Timeline, detector: str, crashed: bool, detected_at: float, truth_at: float, cpu: float, checks: int):
+        self.scenario = timeline.scenario
+        self.expected = expected_outcome(detector, timeline)
+        self.detector = detector
+        self.crashed = crashed
+        self.detected_at = detected_at
+        self.truth_at = truth_at
+        self.cpu = cpu
+        self.checks = checks
+
+    @property
+    def outcome(self) -> str:
+        if self.truth_at is None:
+            return "false_positive" if self.crashed else "ok"
+        if not self.crashed:
+            return "miss"
+        return "false_positive" if self.detected_at < self.truth_at else "ok"
+
+    @property
+    def latency(self) -> float:
+        if self.outcome != "ok" or self.truth_at is None:
+            return None
+        return self.detected_at - self.truth_at
+
+
+def run_once(timeline: Timeline, backend: FakeWindowBackend, poll_interval: float = 0.2) -> list:
+    game = SimulatedGame(timeline, backend)
+    truth_at = game.at(timeline.crash_at) if timeline.crash_at is not None else None
+    fsm = HarnessStateMachine(game)
+    fsm_thread = threading.Thread(target=fsm.run, name="HarnessStateMachine")
+    player = threading.Thread(target=game.play, name="SimulatedGame")
+    player.start()
+    fsm_thread.start()
+
+    proc = psutil.Process(game.process.pid)
+    status_verdict, status_cpu, status_checks = None, 0.0, 0
+    ags_verdict, ags_cpu, ags_checks = None, 0.0, 0
+    unhooks_seen = 0
+    next_poll = time.monotonic()
+    while not game.done.is_set() or unhooks_seen < len(game.unhooks):
+        now = time.monotonic()
+        if now >= next_poll:
+            start = time.thread_time()
+            status = gameutil.get_process_status(proc, MAIN_TITLE, MAIN_CLASS, CRASH_TITLE, CRASH_CLASS)
+            status_cpu += time.thread_time() - start
+            status_checks += 1
+            if status == psutil.STATUS_STOPPED and status_verdict is None:
+                status_verdict = now
+            next_poll += poll_interval
+        if unhooks_seen < len(game.unhooks) and now >= game.unhooks[unhooks_seen]:
+            unhooks_seen += 1
+            start = time.thread_time()
+            crashed = ags_qa.did_qa_crash(proc)
+            ags_cpu += time.thread_time() - start
+            ags_checks += 1
+            if crashed and ags_verdict is None:
+                ags_verdict = now
+        time.sleep(0.005)
+    player.join()
+    fsm_thread.join()
+
+    fsm_crashed = fsm.state == 'CRASHED'
+    return [
+        Result(timeline, "ProcessStateMachine.running", fsm_crashed, fsm.verdict_at, truth_at, fsm.cpu, fsm.checks_run),
+        Result(timeline, "gameutil.get_process_status", status_verdict is not None, status_verdict, truth_at, status_cpu, status_checks),
+        Result(timeline, "ags_qa.did_qa_crash", ags_verdict is not None, ags_verdict, truth_at, ags_cpu, ags_checks),
+    ]
+
+def percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def summarize(results: list) -> dict:
+    summary = {}
+    for detector in EXPECTED:
+        mine = [result for result in results if result.detector == detector]
+        crash_runs = [result for result in mine if result.truth_at is not None]
+        latencies = [result.latency for result in mine if result.latency is not None]
+        checks = sum(result.checks for result in mine)
+        summary[detector] = {
+            "runs": len(mine),
+            "miss_rate": sum(result.outcome == "miss" for result in crash_runs) / max(1, len(crash_runs)),
+            "false_positive_rate": sum(result.outcome == "false_positive" for result in mine) / max(1, len(mine)),
+            "p50_latency": percentile(latencies, 0.5) if latencies else None,
+            "p95_latency": percentile(latencies, 0.95) if latencies else None,
+            "cpu_ms_per_run": sum(result.cpu for result in mine) * 1000 / max(1, len(mine)),
+            "cpu_us_per_check": sum(result.cpu for result in mine) * 1e6 / max(1, checks),
+            "outcomes": {scenario: [result.outcome for result in mine if result.scenario == scenario] for scenario in SCENARIOS},
+        }
+    return summary
+
+def check_results(results: list, summary: dict, latency_slack: float = LATENCY_SLACK) -> list:
+    failures = []
+    for result in results:
+        if result.outcome != result.expected:
+            failures.append("{}: {} was {}, expected {}".format(result.detector, result.scenario, result.outcome, result.expected))
+    for detector, limit in LATENCY_LIMITS.items():
+        value = summary[detector]["p95_latency"]
+        if value is not None and value > limit + latency_slack:
+            failures.append("{}: p95 latency {:.3f} over the limit of {:.3f} + {:.3f} slack".format(detector, value, limit, latency_slack))
+    return failures
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure crash detection latency and accuracy against scripted game timelines.")
+    parser.add_argument("--runs", type=int, default=4, help="runs per scenario")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--windows", type=int, default=300, help="unrelated top-level windows on the fake desktop")
+    parser.add_argument("--json", help="also write the summary to this file")
+    parser.add_argument("--latency-slack", type=float, default=LATENCY_SLACK, help="seconds of scheduling noise allowed over LATENCY_LIMITS")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    backend = FakeWindowBackend(0.05, enum_cost=0.000002)
+    for i in range(args.windows):
+        backend.add_window(rng.randrange(100, 5000), "Window {}".format(i), "Class{}".format(i % 17), visible=rng.random() < 0.3)
+    window_backend.set_default_backend(backend)
+    ags_qa.ags_data.window_name, ags_qa.ags_data.window_class = MAIN_TITLE, MAIN_CLASS
+    ags_qa.ags_data.crash_window_name, ags_qa.ags_data.crash_window_class = CRASH_TITLE, CRASH_CLASS
+
+    results = []
+    #ProcessStateMachine prints every window title it looks at
+    with contextlib.redirect_stdout(io.StringIO()):
+        for scenario in SCENARIOS:
+            for _ in range(args.runs):
+                results.extend(run_once(make_timeline(scenario, rng), backend))
+
+    summary = summarize(results)
+    print("{:<30} {:>6} {:>8} {:>8} {:>10} {:>10} {:>10} {:>10}".format(
+        "detector", "runs", "miss", "false+", "p50 ms", "p95 ms", "cpu ms/run", "us/check"))
+    for detector, row in summary.items():
+        print("{:<30} {:>6} {:>7.0%} {:>7.0%} {:>10} {:>10} {:>10.2f} {:>10.1f}".format(
+            detector, row["runs"], row["miss_rate"], row["false_positive_rate"],
+            "-" if row["p50_latency"] is None else "{:.0f}".format(row["p50_latency"] * 1000),
+            "-" if row["p95_latency"] is None else "{:.0f}".format(row["p95_latency"] * 1000),
+            row["cpu_ms_per_run"], row["cpu_us_per_check"]))
+    for detector, row in summary.items():
+        print("{}: {}".format(detector, ", ".join("{} {}".format(scenario, "/".join(outcomes)) for scenario, outcomes in row["outcomes"].items())))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=4)
+
+    failures = check_results(results, summary, args.latency_slack)
+    for failure in failures:
+        print("FAIL " + failure)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import threading, time
+from collections import deque
+
+class EventQueue:
+    '''
+    EventQueue carries callbacks from worker threads (MonitoringThread, ProcessSupervisor) to OBS's main thread,
+    where it's safe to touch obspython objects. Workers `publish()` and return at once; the main thread `drain()`s in batches
+    from script_tick or an OBS timer. The lock is only held to push or to swap out the pending batch, never while a handler runs,
+    so neither side waits on the other.
+
+    Every distinct transition gets through, in order per key and handler. Only a value equal to the last one pending in its slot
+    is dropped (counted as coalesced), since handling it twice in a row changes nothing. A slot holds at most `max_per_slot` values:
+    if a drain falls that far behind, the oldest pending value is folded away to make room, so the newest (final) state
+    of every machine still always gets through.
+    '''
+    def __init__(self, max_per_slot: int = 32):
+        self.max_per_slot = max_per_slot
+        self.lock = threading.Lock()
+        #(key, handler) -> deque of (value, published_at), the slots in the order they were first published
+        self.pending = {}
+        #values pending over all slots
+        self.size = 0
+        self.published = 0
+        self.coalesced = 0
+        self.drained = 0
+        self.max_depth = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def publish(self, key, value, handler) -> bool:
+        """
+        Queues `handler(value)` to run on the draining thread. Never blocks.
+
+        Returns:
+            bool: False if `value` is what's already last in line for the same key and handler, so nothing was queued.
+        """
+        now = time.monotonic()
+        slot = (key, handler)
+        with self.lock:
+            self.published += 1
+            queue = self.pending.get(slot)
+            if queue is None:
+                queue = self.pending[slot] = deque()
+            elif queue[-1][0] == value:
+                self.coalesced += 1
+                return False
+            elif len(queue) >= self.max_per_slot:
+                queue.popleft()
+                self.size -= 1
+                self.coalesced += 1
+            queue.append((value, now))
+            self.size += 1
+            if self.size > self.max_depth:
+                self.max_depth = self.size
+        return True
+
+    def wrap(self, key, handler):
+        """
+        Returns: a callback that publishes its single argument to `handler` under `key`, for handing to code that calls back from a worker.
+        """
+        def publish(value):
+            self.publish(key, value, handler)
+        return publish
+
+    def depth(self) -> int:
+        return self.size
+
+    def drain(self, max_items: int = None) -> int:
+        """
+        Runs the pending handlers, oldest first, on the calling thread. `max_items` caps the batch, leaving the rest for the next drain.
+
+        Returns:
+            int: how many handlers ran.
+        """
+        if not self.pending:
+            return 0
+        with self.lock:
+            if max_items is None or max_items >= self.size:
+                slots, self.pending, self.size = self.pending, {}, 0
+                batch = None
+            else:
+                batch = []
+                while len(batch) < max_items:
+                    #a slot that isn't emptied keeps its place at the front
+                    slot, queue = next(iter(self.pending.items()))
+                    batch.append((slot, queue.popleft()))
+                    if not queue:
+                        del self.pending[slot]
+                self.size -= len(batch)
+        if batch is None:
+            batch = [(slot, item) for slot, queue in slots.items() for item in queue]
+        now = time.monotonic()
+        for (key, handler), (value, published_at) in batch:
+            latency = now - published_at
+            self.total_latency += latency
+            if latency > self.max_latency:
+                self.max_latency = latency
+            handler(value)
+        self.drained += len(batch)
+        return len(batch)
+
+    def metrics(self) -> dict:
+        return {
+            "depth": self.size,
+            "max_depth": self.max_depth,
+            "published": self.published,
+            "coalesced": self.coalesced,
+            "drained": self.drained,
+            "mean_drain_latency": self.total_latency / self.drained if self.drained else 0.0,
+            "max_drain_latency": self.max_latency,
+        }
@@ -0,0 +1,1201 @@
+'''
+In-memory stand-in for OBS's `obspython` module, so obsutil, ags_qa and the pngtuber script can be imported, driven and benchmarked headless.
+
+    import fake_obspython
+    fake = fake_obspython.install()      #before anything imports obspython
+    import ags_qa
+    fake.add_scene("Old Skies Scene")
+    fake.load_script(ags_qa)
+    fake.finish_loading()
+    fake.press_button(ags_qa, "button0")
+    fake.advance(2.0)                    #runs script_tick and the timers on the fake clock
+    print(fake.calls["obs_frontend_save"], fake.unreleased())
+
+It covers the part of the API these scripts use: sources, scenes and scene items, obs_data settings, signal handlers and calldata,
+timers, script_tick, frontend events and the profile config. Every handle is reference counted like libobs does it, and the
+references the scripts take are tracked with the line that took them, so `unreleased()` lists the leaks and `errors` the over-releases.
+Signal and timer callbacks that raise are logged and recorded in `errors` like OBS would, rather than raised (unless `strict`).
+Time only moves when `advance()` is called; `patch_time()` points a script's `time` module at the same clock.
+'''
+import ctypes, itertools, json, os, sys, traceback, types
+from collections import Counter
+
+LOG_ERROR, LOG_WARNING, LOG_INFO, LOG_DEBUG = 100, 200, 300, 400
+
+OBS_SOURCE_TYPE_INPUT, OBS_SOURCE_TYPE_FILTER, OBS_SOURCE_TYPE_TRANSITION, OBS_SOURCE_TYPE_SCENE = 0, 1, 2, 3
+
+FRONTEND_EVENTS = [
+    "STREAMING_STARTING", "STREAMING_STARTED", "STREAMING_STOPPING", "STREAMING_STOPPED",
+    "RECORDING_STARTING", "RECORDING_STARTED", "RECORDING_STOPPING", "RECORDING_STOPPED",
+    "SCENE_CHANGED", "SCENE_LIST_CHANGED", "TRANSITION_CHANGED", "TRANSITION_STOPPED", "TRANSITION_LIST_CHANGED",
+    "SCENE_COLLECTION_CHANGED", "SCENE_COLLECTION_LIST_CHANGED", "PROFILE_CHANGED", "PROFILE_LIST_CHANGED", "EXIT",
+    "REPLAY_BUFFER_STARTING", "REPLAY_BUFFER_STARTED", "REPLAY_BUFFER_STOPPING", "REPLAY_BUFFER_STOPPED",
+    "STUDIO_MODE_ENABLED", "STUDIO_MODE_DISABLED", "PREVIEW_SCENE_CHANGED", "SCENE_COLLECTION_CLEANUP", "FINISHED_LOADING",
+    "RECORDING_PAUSED", "RECORDING_UNPAUSED", "TRANSITION_DURATION_CHANGED", "REPLAY_BUFFER_SAVED",
+    "VIRTUALCAM_STARTED", "VIRTUALCAM_STOPPED", "TBAR_VALUE_CHANGED", "SCENE_COLLECTION_CHANGING", "PROFILE_CHANGING",
+    "SCRIPTING_SHUTDOWN", "PROFILE_RENAMED", "SCENE_COLLECTION_RENAMED", "THEME_CHANGED", "SCREENSHOT_TAKEN",
+]
+
+PROPERTY_TYPES = ["INVALID", "BOOL", "INT", "FLOAT", "TEXT", "PATH", "LIST", "COLOR", "BUTTON", "FONT", "EDITABLE_LIST", "FRAME_RATE", "GROUP"]
+
+CONSTANTS = {
+    "LOG_ERROR": LOG_ERROR, "LOG_WARNING": LOG_WARNING, "LOG_INFO": LOG_INFO, "LOG_DEBUG": LOG_DEBUG,
+    "OBS_SOURCE_TYPE_INPUT": OBS_SOURCE_TYPE_INPUT, "OBS_SOURCE_TYPE_FILTER": OBS_SOURCE_TYPE_FILTER,
+    "OBS_SOURCE_TYPE_TRANSITION": OBS_SOURCE_TYPE_TRANSITION, "OBS_SOURCE_TYPE_SCENE": OBS_SOURCE_TYPE_SCENE,
+    "OBS_ALIGN_CENTER": 0, "OBS_ALIGN_LEFT": 1, "OBS_ALIGN_RIGHT": 2, "OBS_ALIGN_TOP": 4, "OBS_ALIGN_BOTTOM": 8,
+    "OBS_BOUNDS_NONE": 0, "OBS_BOUNDS_STRETCH": 1, "OBS_BOUNDS_SCALE_INNER": 2, "OBS_BOUNDS_SCALE_OUTER": 3,
+    "OBS_BOUNDS_SCALE_TO_WIDTH": 4, "OBS_BOUNDS_SCALE_TO_HEIGHT": 5, "OBS_BOUNDS_MAX_ONLY": 6,
+    "OBS_TEXT_DEFAULT": 0, "OBS_TEXT_PASSWORD": 1, "OBS_TEXT_MULTILINE": 2,
+    "OBS_PATH_FILE": 0, "OBS_PATH_FILE_SAVE": 1, "OBS_PATH_DIRECTORY": 2,
+    "OBS_COMBO_TYPE_EDITABLE": 1, "OBS_COMBO_TYPE_LIST": 2,
+    "OBS_COMBO_FORMAT_INT": 1, "OBS_COMBO_FORMAT_FLOAT": 2, "OBS_COMBO_FORMAT_STRING": 3,
+}
+CONSTANTS.update(("OBS_FRONTEND_EVENT_" + name, value) for value, name in enumerate(FRONTEND_EVENTS))
+CONSTANTS.update(("OBS_PROPERTY_" + name, value) for value, name in enumerate(PROPERTY_TYPES))
+
+
+class vec2:
+    def __init__(self):
+        self.x = 0.0
+        self.y = 0.0
+
+
+class obs_transform_info:
+    FIELDS = ("rot", "alignment", "bounds_type", "bounds_alignment", "crop_to_bounds")
+    VECTORS = ("pos", "scale", "bounds")
+
+    def __init__(self):
+        self.pos = vec2()
+        self.rot = 0.0
+        self.scale = vec2()
+        self.scale.x = self.scale.y = 1.0
+        self.alignment = 5
+        self.bounds_type = 0
+        self.bounds_alignment = 0
+        self.bounds = vec2()
+        self.crop_to_bounds = False
+
+
+class obs_sceneitem_crop:
+    FIELDS = ("left", "top", "right", "bottom")
+
+    def __init__(self):
+        self.left = self.top = self.right = self.bottom = 0
+
+
+class obs_video_info:
+    def __init__(self):
+        self.graphics_module = "libobs-opengl"
+        self.fps_num, self.fps_den = 60, 1
+        self.base_width, self.base_height = 1920, 1080
+        self.output_width, self.output_height = 1920, 1080
+        self.output_format = 2
+        self.adapter = 0
+        self.gpu_conversion = True
+        self.colorspace = 1
+        self.range = 1
+        self.scale_type = 3
+
+def copy_struct(target, source):
+    for name in getattr(source, "FIELDS", ()):
+        setattr(target, name, getattr(source, name))
+    for name in getattr(source, "VECTORS", ()):
+        getattr(target, name).x = getattr(source, name).x
+        getattr(target, name).y = getattr(source, name).y
+
+
+class FakeClock:
+    '''
+    The fake's time. `time()`, `monotonic()` and `perf_counter()` all read it and `sleep()` moves it, so it can stand in for the `time` module.
+    '''
+    def __init__(self, start: float = 1700000000.0):
+        self.start = start
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def perf_counter(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.start + self.now
+
+    def sleep(self, seconds: float):
+        self.now += max(0.0, seconds)
+
+
+class Ref:
+    '''
+    A reference counted libobs handle. `refs` counts every holder, `script_refs` only the ones the scripts took through the API.
+    '''
+    kind = "object"
+
+    def __init__(self, fake: "FakeOBS"):
+        self.fake = fake
+        self.refs = 0
+        self.script_refs = 0
+        self.destroyed = False
+        #where each reference the scripts hold was taken
+        self.sites = []
+
+    def destroy(self):
+        pass
+
+    def describe(self) -> str:
+        return self.kind
+
+
+class SignalHandler:
+    def __init__(self, fake: "FakeOBS", owner=None):
+        self.fake = fake
+        self.owner = owner
+        #signal -> callbacks, in connection order
+        self.callbacks = {}
+        #callbacks that get every signal, as callback(signal, calldata)
+        self.global_callbacks = []
+
+    def signal(self, name: str, calldata: dict):
+        for callback in list(self.callbacks.get(name, ())):
+            self.fake.invoke(callback, ("signal", self, name, callback), calldata)
+        for callback in list(self.global_callbacks):
+            self.fake.invoke(callback, ("signal", self, None, callback), name, calldata)
+
+    def connected(self) -> int:
+        return sum(len(callbacks) for callbacks in self.callbacks.values()) + len(self.global_callbacks)
+
+
+class Data(Ref):
+    kind = "obs_data"
+
+    def __init__(self, fake: "FakeOBS", values: dict = None):
+        super().__init__(fake)
+        self.values = dict(values or {})
+        self.defaults = {}
+
+    def get(self, name: str, zero):
+        if name in self.values:
+            return self.values[name]
+        return self.defaults.get(name, zero)
+
+
+class DataArray(Ref):
+    kind = "obs_data_array"
+
+    def __init__(self, fake: "FakeOBS", items: list):
+        super().__init__(fake)
+        self.items = items
+
+
+class Source(Ref):
+    kind = "obs_source"
+
+    def __init__(self, fake: "FakeOBS", source_id: str, name: str, settings: Data, source_type: int):
+        super().__init__(fake)
+        self.id = source_id
+        self.name = name
+        self.type = source_type
+        self.settings = settings
+        self.private_settings = fake.new_data()
+        self.handler = SignalHandler(fake, self)
+        self.scene = Scene(self) if source_type == OBS_SOURCE_TYPE_SCENE else None
+        self.removed = False
+        self.width = 0
+        self.height = 0
+        self.updates = 0
+
+    def destroy(self):
+        if self.fake.sources.get(self.name) is self:
+            del self.fake.sources[self.name]
+        self.fake.global_handler.signal("source_destroy", {"source": self})
+        if self.scene is not None:
+            for item in list(self.scene.items):
+                self.scene.remove(item)
+        self.fake.drop(self.settings)
+        self.fake.drop(self.private_settings)
+
+    def describe(self) -> str:
+        return "{} {!r} ({})".format(self.kind, self.name, self.id)
+
+
+class Scene:
+    '''
+    obs_scene_t: shares its reference count with its source, like libobs.
+    '''
+    def __init__(self, source: Source):
+        self.source = source
+        self.items = []
+        self.ids = itertools.count(1)
+
+    def remove(self, item: "SceneItem"):
+        if item not in self.items:
+            return
+        self.source.handler.signal("item_remove", {"scene": self, "item": item})
+        self.items.remove(item)
+        item.removed = True
+        self.source.fake.drop(item)
+
+
+class SceneItem(Ref):
+    kind = "obs_sceneitem"
+
+    def __init__(self, fake: "FakeOBS", scene: Scene, source: Source):
+        super().__init__(fake)
+        self.scene = scene
+        self.source = source
+        self.id = next(scene.ids)
+        self.info = obs_transform_info()
+        self.crop = obs_sceneitem_crop()
+        self.locked = False
+        self.visible = True
+        self.selected = False
+        self.removed = False
+        self.defer_depth = 0
+        self.deferred = False
+
+    def destroy(self):
+        self.fake.drop(self.source)
+
+    def transformed(self):
+        #libobs queues one transform update per defer_update_begin/end pair
+        if self.defer_depth:
+            self.deferred = True
+            return
+        self.fake.transform_updates += 1
+        self.scene.source.handler.signal("item_transform", {"scene": self.scene, "item": self})
+
+    def describe(self) -> str:
+        return "{} {!r} in {!r}".format(self.kind, self.source.name, self.scene.source.name)
+
+
+class Output(Ref):
+    kind = "obs_output"
+
+    def __init__(self, fake: "FakeOBS", name: str):
+        super().__init__(fake)
+        self.name = name
+        self.preferred_size = (0, 0)
+
+
+class Properties:
+    def __init__(self):
+        self.properties = {}
+
+
+class Property:
+    def __init__(self, name: str, description: str, property_type: int, callback=None):
+        self.name = name
+        self.description = description
+        self.type = property_type
+        self.callback = callback
+        self.items = []
+
+
+class Volmeter:
+    def __init__(self):
+        self.source = None
+        self.callbacks = []
+
+
+class FakeOBS:
+    '''
+    The state behind the fake module: what OBS would hold, plus the methods a test or benchmark drives it with.
+    The module's functions are this object's methods whose names start with "api_", less the prefix.
+    '''
+    def __init__(self):
+        self.clock = FakeClock()
+        self.global_handler = SignalHandler(self)
+        #name -> source, for the ones obs_get_source_by_name can find
+        self.sources = {}
+        #the frontend's scene list, each holding a reference
+        self.scenes = []
+        self.current_scene = None
+        self.transition = None
+        self.frontend_callbacks = []
+        #[callback, interval in seconds, next due]
+        self.timers = []
+        self.scripts = []
+        self.config = {}
+        self.video = obs_video_info()
+        self.recording = False
+        self.last_recording = None
+        self.recording_output = Output(self, "adv_file_output")
+        self.recording_output.refs = 1
+        self.volmeters = []
+        self.logs = []
+        self.errors = []
+        self.strict = False
+        self.echo = False
+        self.calls = Counter()
+        self.saves = 0
+        #id -> every object the scripts hold a reference on
+        self.held = {}
+        self.transform_updates = 0
+        #("timer", callback) or ("signal", handler, name, callback) while a callback runs, for remove_current_callback
+        self.current = None
+        self.module = None
+
+    def reset(self):
+        '''
+        Starts over with an empty OBS, keeping the module the scripts already imported.
+        '''
+        module = self.module
+        self.__init__()
+        self.module = module
+
+    #references
+
+    def new_data(self, values: dict = None) -> Data:
+        data = Data(self, values)
+        data.refs = 1
+        return data
+
+    def acquire(self, obj):
+        """
+        Takes a reference on the script's behalf, remembering the line that took it.
+
+        Returns: obj
+        """
+        if obj is None:
+            return None
+        ref = obj.source if isinstance(obj, Scene) else obj
+        if ref.destroyed:
+            self.error("reference taken on destroyed " + ref.describe())
+            return obj
+        ref.refs += 1
+        ref.script_refs += 1
+        ref.sites.append(self.call_site())
+        self.held[id(ref)] = ref
+        return obj
+
+    def release(self, obj):
+        if obj is None:
+            return
+        ref = obj.source if isinstance(obj, Scene) else obj
+        if ref.destroyed:
+            self.error("release of destroyed " + ref.describe())
+            return
+        if ref.script_refs <= 0:
+            self.error("release of a reference the script doesn't hold on " + ref.describe())
+        else:
+            ref.script_refs -= 1
+            ref.sites.pop()
+            if ref.script_refs == 0:
+                del self.held[id(ref)]
+        self.drop(ref)
+
+    def drop(self, ref: Ref):
+        '''
+        Releases a reference OBS itself holds (or the last one, whoever held it), destroying the object at zero.
+        '''
+        if ref is None or ref.destroyed:
+            return
+        ref.refs -= 1
+        if ref.refs <= 0:
+            ref.destroyed = True
+            ref.destroy()
+
+    def unreleased(self) -> list:
+        """
+        Returns: (description, call site) for every reference the scripts took and still hold.
+        """
+        leaks = []
+        for ref in self.held.values():
+            leaks.extend((ref.describe(), site) for site in ref.sites)
+        return leaks
+
+    def call_site(self) -> str:
+        frame = sys._getframe(1)
+        while frame is not None and frame.f_code.co_filename == __file__:
+            frame = frame.f_back
+        if frame is None:
+            return "?"
+        return "{}:{} in {}".format(os.path.basename(frame.f_code.co_filename), frame.f_lineno, frame.f_code.co_name)
+
+    def error(self, msg: str):
+        self.errors.append(msg)
+        self.log(LOG_ERROR, msg)
+        if self.strict:
+            raise RuntimeError(msg)
+
+    def log(self, level: int, msg: str):
+        self.logs.append((self.clock.now, level, msg))
+        if self.echo:
+            print("[fake obs] " + msg)
+
+    def invoke(self, callback, current, *args):
+        '''
+        Calls a script callback the way OBS does: an exception is logged, not propagated.
+        '''
+        previous, self.current = self.current, current
+        try:
+            return callback(*args)
+        except Exception:
+            self.error("{} raised:\n{}".format(getattr(callback, "__qualname__", callback), traceback.format_exc()))
+        finally:
+            self.current = previous
+
+    #driving it
+
+    def create_source(self, source_id: str, name: str, settings: Data = None, private: bool = False) -> Source:
+        '''
+        Creates a source holding one reference, owned by whoever asked, and announces it like libobs.
+        '''
+        if settings is None:
+            settings = self.new_data()
+        else:
+            settings.refs += 1
+        if source_id == "scene":
+            source_type = OBS_SOURCE_TYPE_SCENE
+        elif source_id.endswith("_transition"):
+            source_type = OBS_SOURCE_TYPE_TRANSITION
+        elif source_id.endswith("_filter"):
+            source_type = OBS_SOURCE_TYPE_FILTER
+        else:
+            source_type = OBS_SOURCE_TYPE_INPUT
+        source = Source(self, source_id, name, settings, source_type)
+        source.refs = 1
+        if private:
+            return source
+        self.sources[name] = source
+        if source_type == OBS_SOURCE_TYPE_SCENE:
+            #the frontend adds every new scene to its list, and keeps a reference
+            source.refs += 1
+            self.scenes.append(source)
+            if self.current_scene is None:
+                self.current_scene = source
+        self.global_handler.signal("source_create", {"source": source})
+        return source
+
+    def add_scene(self, name: str) -> Scene:
+        '''
+        Adds a scene to the collection, as if it had been loaded with it.
+        '''
+        source = self.create_source("scene", name)
+        self.drop(source)
+        return source.scene
+
+    def add_source(self, scene_name: str, name: str, source_id: str = "game_capture", settings: dict = None, signal: bool = True) -> SceneItem:
+        '''
+        Adds a source to a scene, as if it had been loaded with the collection. With `signal` off the item is added without item_add,
+        like a collection load or scene duplication.
+        '''
+        scene = self.sources[scene_name].scene
+        source = self.sources.get(name)
+        if source is None:
+            source = self.create_source(source_id, name, self.new_data(settings))
+            source.settings.refs -= 1
+        else:
+            source.refs += 1
+        item = self.add_item(scene, source, signal)
+        self.drop(source)
+        return item
+
+    def add_item(self, scene: Scene, source: Source, signal: bool = True) -> SceneItem:
+        item = SceneItem(self, scene, source)
+        item.refs = 1
+        source.refs += 1
+        scene.items.append(item)
+        if signal:
+            scene.source.handler.signal("item_add", {"scene": scene, "item": item})
+        return item
+
+    def remove_source(self, name: str):
+        '''
+        Deletes a source like the user would: `source_remove`, then every scene drops its items, then `source_destroy` once the references are gone.
+        '''
+        source = self.sources[name]
+        source.removed = True
+        self.global_handler.signal("source_remove", {"source": source})
+        source.handler.signal("remove", {"source": source})
+        del self.sources[name]
+        for scene_source in list(self.scenes):
+            for item in list(scene_source.scene.items):
+                if item.source is source:
+                    scene_source.scene.remove(item)
+        if source in self.scenes:
+            self.scenes.remove(source)
+            if self.current_scene is source:
+                self.current_scene = self.scenes[0] if self.scenes else None
+            self.drop(source)
+
+    def rename_source(self, name: str, new_name: str):
+        source = self.sources.pop(name)
+        source.name = new_name
+        self.sources[new_name] = source
+        calldata = {"source": source, "new_name": new_name, "prev_name": name}
+        source.handler.signal("rename", calldata)
+        self.global_handler.signal("source_rename", calldata)
+
+    def frontend_event(self, event: int):
+        for callback in list(self.frontend_callbacks):
+            self.invoke(callback, ("frontend", callback), event)
+
+    def finish_loading(self):
+        self.frontend_event(CONSTANTS["OBS_FRONTEND_EVENT_FINISHED_LOADING"])
+
+    def start_recording(self, path: str = None):
+        self.frontend_event(CONSTANTS["OBS_FRONTEND_EVENT_RECORDING_STARTING"])
+        self.recording = True
+        self.last_recording = path
+        self.frontend_event(CONSTANTS["OBS_FRONTEND_EVENT_RECORDING_STARTED"])
+
+    def stop_recording(self):
+        self.frontend_event(CONSTANTS["OBS_FRONTEND_EVENT_RECORDING_STOPPING"])
+        self.recording = False
+        self.frontend_event(CONSTANTS["OBS_FRONTEND_EVENT_RECORDING_STOPPED"])
+
+    def exit(self):
+        '''
+        Shuts OBS down: the EXIT frontend event, then every script unloads.
+        '''
+        self.frontend_event(CONSTANTS["OBS_FRONTEND_EVENT_EXIT"])
+        for module, _ in list(self.scripts):
+            self.unload_script(module)
+
+    def load_script(self, module, settings: dict = None) -> Data:
+        '''
+        Loads a script module like OBS does: script_defaults, script_load, then script_update with the same settings.
+
+        Returns: the script's settings
+        '''
+        data = self.new_data(settings)
+        if hasattr(module, "script_defaults"):
+            module.script_defaults(data)
+        if hasattr(module, "script_load"):
+            module.script_load(data)
+        if hasattr(module, "script_update"):
+            module.script_update(data)
+        self.scripts.append((module, data))
+        return data
+
+    def update_script(self, module, values: dict):
+        for loaded, data in self.scripts:
+            if loaded is module:
+                data.values.update(values)
+                module.script_update(data)
+
+    def unload_script(self, module):
+        for loaded, data in list(self.scripts):
+            if loaded is module:
+                if hasattr(module, "script_unload"):
+                    module.script_unload()
+                self.scripts.remove((loaded, data))
+                self.drop(data)
+
+    def press_button(self, module, name: str):
+        '''
+        Presses a button from the script's properties, like clicking it in the Scripts dialog.
+        '''
+        props = module.script_properties()
+        prop = props.properties[name]
+        return prop.callback(props, prop)
+
+    def advance(self, seconds: float, fps: float = 60.0):
+        '''
+        Moves the clock forward a frame at a time, calling every script's script_tick and then the timers that are due, like OBS's render loop.
+        '''
+        frame = 1.0 / fps
+        end = self.clock.now + seconds
+        while self.clock.now + frame <= end + 1e-9:
+            self.clock.now += frame
+            for module, _ in list(self.scripts):
+                if hasattr(module, "script_tick"):
+                    module.script_tick(frame)
+            for timer in list(self.timers):
+                if timer not in self.timers or timer[2] > self.clock.now + 1e-9:
+                    continue
+                timer[2] += timer[1]
+                if timer[2] <= self.clock.now:
+                    timer[2] = self.clock.now + timer[1]
+                self.invoke(timer[0], ("timer", timer))
+        self.clock.now = max(self.clock.now, end)
+
+    def set_audio_level(self, source_name: str, peak: float, magnitude: float = None):
+        '''
+        Feeds a level (dB) to the volmeters attached to the source, through the same callback signature libobs uses.
+        '''
+        levels = (ctypes.c_float * 8)(*([peak] * 8))
+        magnitudes = (ctypes.c_float * 8)(*([peak if magnitude is None else magnitude] * 8))
+        for volmeter in self.volmeters:
+            if volmeter.source is not None and volmeter.source.name == source_name:
+                for callback, data in list(volmeter.callbacks):
+                    callback(data, magnitudes, levels, levels)
+
+    def patch_time(self, *modules):
+        '''
+        Points each module's `time` (under whatever name it imported it) at the fake clock.
+        '''
+        import time as real_time
+        for module in modules:
+            for name, value in list(vars(module).items()):
+                if value is real_time:
+                    setattr(module, name, self.clock)
+
+    #the module
+
+    def build_module(self) -> types.ModuleType:
+        module = types.ModuleType("obspython")
+        module.__doc__ = "fake obspython, see fake_obspython.py"
+        module.fake = self
+        for name, value in CONSTANTS.items():
+            setattr(module, name, value)
+        for cls in (vec2, obs_transform_info, obs_sceneitem_crop, obs_video_info):
+            setattr(module, cls.__name__, cls)
+        for attr in dir(self):
+            if attr.startswith("api_"):
+                setattr(module, attr[4:], self.counted(attr[4:], getattr(self, attr)))
+        self.module = module
+        return module
+
+    def counted(self, name: str, function):
+        def call(*args):
+            self.calls[name] += 1
+            return function(*args)
+        call.__name__ = name
+        return call
+
+    #scripting
+
+    def api_script_log(self, level: int, msg: str):
+        self.log(level, msg)
+
+    def api_script_path(self) -> str:
+        return os.path.dirname(os.path.abspath(__file__)) + os.sep
+
+    def api_timer_add(self, callback, milliseconds: int):
+        self.timers.append([callback, milliseconds / 1000.0, self.clock.now + milliseconds / 1000.0])
+
+    def api_timer_remove(self, callback):
+        for timer in self.timers:
+            if timer[0] is callback or timer[0] == callback:
+                self.timers.remove(timer)
+                return
+
+    def api_remove_current_callback(self):
+        if self.current is None:
+            return
+        if self.current[0] == "timer":
+            if self.current[1] in self.timers:
+                self.timers.remove(self.current[1])
+        elif self.current[0] == "signal":
+            _, handler, name, callback = self.current
+            if name is None:
+                if callback in handler.global_callbacks:
+                    handler.global_callbacks.remove(callback)
+            elif callback in handler.callbacks.get(name, ()):
+                handler.callbacks[name].remove(callback)
+
+    #signals
+
+    def api_obs_get_signal_handler(self) -> SignalHandler:
+        return self.global_handler
+
+    def api_signal_handler_connect(self, handler: SignalHandler, name: str, callback):
+        if handler is not None:
+            handler.callbacks.setdefault(name, []).append(callback)
+
+    def api_signal_handler_disconnect(self, handler: SignalHandler, name: str, callback):
+        #obspython finds the callback by identity
+        callbacks = handler.callbacks.get(name, []) if handler is not None else []
+        for i, connected in enumerate(callbacks):
+            if connected is callback:
+                del callbacks[i]
+                return
+
+    def api_signal_handler_connect_global(self, handler: SignalHandler, callback):
+        if handler is not None:
+            handler.global_callbacks.append(callback)
+
+    def api_signal_handler_disconnect_global(self, handler: SignalHandler, callback):
+        if handler is not None and callback in handler.global_callbacks:
+            handler.global_callbacks.remove(callback)
+
+    def api_calldata_source(self, calldata: dict, name: str):
+        value = calldata.get(name)
+        return value.source if isinstance(value, Scene) else value
+
+    def api_calldata_sceneitem(self, calldata: dict, name: str):
+        return calldata.get(name)
+
+    def api_calldata_string(self, calldata: dict, name: str):
+        return calldata.get(name)
+
+    def api_calldata_bool(self, calldata: dict, name: str) -> bool:
+        return bool(calldata.get(name, False))
+
+    def api_calldata_int(self, calldata: dict, name: str) -> int:
+        return int(calldata.get(name, 0))
+
+    def api_calldata_float(self, calldata: dict, name: str) -> float:
+        return float(calldata.get(name, 0.0))
+
+    def api_calldata_ptr(self, calldata: dict, name: str):
+        return calldata.get(name)
+
+    #sources
+
+    def api_obs_source_create(self, source_id: str, name: str, settings: Data, hotkey_data):
+        source = self.create_source(source_id, name, settings)
+        source.refs -= 1
+        return self.acquire(source)
+
+    def api_obs_source_create_private(self, source_id: str, name: str, settings: Data):
+        source = self.create_source(source_id, name, settings, private=True)
+        source.refs -= 1
+        return self.acquire(source)
+
+    def api_obs_get_source_by_name(self, name: str):
+        return self.acquire(self.sources.get(name))
+
+    def api_obs_source_get_ref(self, source: Source):
+        if source is None or source.destroyed:
+            return None
+        return self.acquire(source)
+
+    def api_obs_source_release(self, source: Source):
+        self.release(source)
+
+    def api_obs_source_remove(self, source: Source):
+        if source is not None and not source.removed and self.sources.get(source.name) is source:
+            self.remove_source(source.name)
+
+    def api_obs_source_removed(self, source: Source) -> bool:
+        return source.removed
+
+    def api_obs_source_get_name(self, source: Source):
+        return source.name if source is not None else None
+
+    def api_obs_source_set_name(self, source: Source, name: str):
+        if source.name != name:
+            self.rename_source(source.name, name)
+
+    def api_obs_source_get_id(self, source: Source):
+        return source.id if source is not None else None
+
+    def api_obs_source_get_type(self, source: Source):
+        return source.type if source is not None else OBS_SOURCE_TYPE_INPUT
+
+    def api_obs_source_get_signal_handler(self, source: Source):
+        return source.handler if source is not None else None
+
+    def api_obs_source_get_settings(self, source: Source):
+        return self.acquire(source.settings)
+
+    def api_obs_source_get_private_settings(self, source: Source):
+        return self.acquire(source.private_settings)
+
+    def api_obs_source_update(self, source: Source, settings: Data):
+        if source is None:
+            return
+        if settings is not None and settings is not source.settings:
+            source.settings.values.update(settings.values)
+        source.updates += 1
+        self.global_handler.signal("source_update", {"source": source})
+        source.handler.signal("update", {"source": source})
+
+    def api_obs_source_get_width(self, source: Source) -> int:
+        return source.width if source is not None else 0
+
+    def api_obs_source_get_height(self, source: Source) -> int:
+        return source.height if source is not None else 0
+
+    def api_obs_source_properties(self, source: Source):
+        return Properties()
+
+    def api_obs_save_sources(self):
+        #serializes every source into an array for the caller, it doesn't write anything
+        array = DataArray(self, [dict(source.settings.values, name=name, id=source.id) for name, source in self.sources.items()])
+        return self.acquire(array)
+
+    def api_obs_data_array_release(self, array):
+        self.release(array)
+
+    def api_obs_data_array_count(self, array) -> int:
+        return len(array.items)
+
+    #scenes
+
+    def api_obs_scene_create(self, name: str):
+        source = self.create_source("scene", name)
+        source.refs -= 1
+        return self.acquire(source.scene)
+
+    def api_obs_scene_from_source(self, source: Source):
+        return source.scene if source is not None else None
+
+    def api_obs_scene_get_source(self, scene: Scene):
+        return scene.source if scene is not None else None
+
+    def api_obs_scene_get_ref(self, scene: Scene):
+        if scene is None or scene.source.destroyed:
+            return None
+        return self.acquire(scene)
+
+    def api_obs_scene_release(self, scene: Scene):
+        self.release(scene)
+
+    def api_obs_scene_add(self, scene: Scene, source: Source):
+        if scene is None or source is None:
+            return None
+        return self.add_item(scene, source)
+
+    def api_obs_scene_enum_items(self, scene: Scene) -> list:
+        if scene is None:
+            return []
+        return [self.acquire(item) for item in scene.items]
+
+    def api_sceneitem_list_release(self, items: list):
+        for item in items:
+            self.release(item)
+
+    def api_obs_scene_find_source(self, scene: Scene, name: str):
+        if scene is None:
+            return None
+        for item in scene.items:
+            if item.source.name == name:
+                return item
+        return None
+
+    def api_obs_scene_sceneitem_from_source(self, scene: Scene, source: Source):
+        if scene is None:
+            return None
+        for item in scene.items:
+            if item.source is source:
+                return self.acquire(item)
+        return None
+
+    #scene items
+
+    def api_obs_sceneitem_addref(self, item: SceneItem):
+        self.acquire(item)
+
+    def api_obs_sceneitem_release(self, item: SceneItem):
+        self.release(item)
+
+    def api_obs_sceneitem_remove(self, item: SceneItem):
+        if item is not None and not item.removed:
+            item.scene.remove(item)
+
+    def api_obs_sceneitem_get_source(self, item: SceneItem):
+        return item.source if item is not None else None
+
+    def api_obs_sceneitem_get_scene(self, item: SceneItem):
+        return item.scene if item is not None else None
+
+    def api_obs_sceneitem_get_id(self, item: SceneItem) -> int:
+        return item.id
+
+    def api_obs_sceneitem_get_info(self, item: SceneItem, info: obs_transform_info):
+        copy_struct(info, item.info)
+
+    def api_obs_sceneitem_set_info(self, item: SceneItem, info: obs_transform_info):
+        copy_struct(item.info, info)
+        item.transformed()
+
+    def api_obs_sceneitem_get_pos(self, item: SceneItem, pos: vec2):
+        pos.x, pos.y = item.info.pos.x, item.info.pos.y
+
+    def api_obs_sceneitem_set_pos(self, item: SceneItem, pos: vec2):
+        item.info.pos.x, item.info.pos.y = pos.x, pos.y
+        item.transformed()
+
+    def api_obs_sceneitem_get_crop(self, item: SceneItem, crop: obs_sceneitem_crop):
+        copy_struct(crop, item.crop)
+
+    def api_obs_sceneitem_set_crop(self, item: SceneItem, crop: obs_sceneitem_crop):
+        copy_struct(item.crop, crop)
+        item.transformed()
+
+    def api_obs_sceneitem_defer_update_begin(self, item: SceneItem):
+        item.defer_depth += 1
+
+    def api_obs_sceneitem_defer_update_end(self, item: SceneItem):
+        item.defer_depth = max(0, item.defer_depth - 1)
+        if item.defer_depth == 0 and item.deferred:
+            item.deferred = False
+            item.transformed()
+
+    def api_obs_sceneitem_locked(self, item: SceneItem) -> bool:
+        return item.locked
+
+    def api_obs_sceneitem_set_locked(self, item: SceneItem, locked: bool):
+        if item.locked != locked:
+            item.locked = locked
+            item.scene.source.handler.signal("item_locked", {"scene": item.scene, "item": item, "locked": locked})
+
+    def api_obs_sceneitem_visible(self, item: SceneItem) -> bool:
+        return item.visible
+
+    def api_obs_sceneitem_set_visible(self, item: SceneItem, visible: bool):
+        if item.visible != visible:
+            item.visible = visible
+            item.scene.source.handler.signal("item_visible", {"scene": item.scene, "item": item, "visible": visible})
+
+    def api_obs_sceneitem_select(self, item: SceneItem, select: bool):
+        if item is not None and item.selected != select:
+            item.selected = select
+            item.scene.source.handler.signal("item_select" if select else "item_deselect", {"scene": item.scene, "item": item})
+
+    def api_obs_sceneitem_selected(self, item: SceneItem) -> bool:
+        return item.selected
+
+    def api_vec2_set(self, vec: vec2, x: float, y: float):
+        vec.x, vec.y = x, y
+
+    #obs_data
+
+    def api_obs_data_create(self):
+        data = Data(self)
+        return self.acquire(data)
+
+    def api_obs_data_create_from_json(self, text: str):
+        return self.acquire(Data(self, json.loads(text)))
+
+    def api_obs_data_addref(self, data: Data):
+        self.acquire(data)
+
+    def api_obs_data_release(self, data: Data):
+        self.release(data)
+
+    def api_obs_data_get_string(self, data: Data, name: str) -> str:
+        return data.get(name, "")
+
+    def api_obs_data_get_int(self, data: Data, name: str) -> int:
+        return int(data.get(name, 0))
+
+    def api_obs_data_get_double(self, data: Data, name: str) -> float:
+        return float(data.get(name, 0.0))
+
+    def api_obs_data_get_bool(self, data: Data, name: str) -> bool:
+        return bool(data.get(name, False))
+
+    def api_obs_data_set_string(self, data: Data, name: str, value: str):
+        data.values[name] = value
+
+    def api_obs_data_set_int(self, data: Data, name: str, value: int):
+        data.values[name] = int(value)
+
+    def api_obs_data_set_double(self, data: Data, name: str, value: float):
+        data.values[name] = float(value)
+
+    def api_obs_data_set_bool(self, data: Data, name: str, value: bool):
+        data.values[name] = bool(value)
+
+    def api_obs_data_set_default_string(self, data: Data, name: str, value: str):
+        data.defaults[name] = value
+
+    def api_obs_data_set_default_int(self, data: Data, name: str, value: int):
+        data.defaults[name] = int(value)
+
+    def api_obs_data_set_default_double(self, data: Data, name: str, value: float):
+        data.defaults[name] = float(value)
+
+    def api_obs_data_set_default_bool(self, data: Data, name: str, value: bool):
+        data.defaults[name] = bool(value)
+
+    def api_obs_data_has_user_value(self, data: Data, name: str) -> bool:
+        return name in data.values
+
+    def api_obs_data_erase(self, data: Data, name: str):
+        data.values.pop(name, None)
+
+    def api_obs_data_apply(self, target: Data, source: Data):
+        target.values.update(source.values)
+
+    def api_obs_data_get_defaults(self, data: Data):
+        return self.acquire(Data(self, data.defaults))
+
+    def api_obs_data_get_json(self, data: Data) -> str:
+        return json.dumps(data.values)
+
+    def api_obs_data_get_json_pretty_with_defaults(self, data: Data) -> str:
+        return json.dumps(dict(data.defaults, **data.values), indent=4)
+
+    #properties
+
+    def add_property(self, props: Properties, name: str, description: str, property_type: str, callback=None) -> Property:
+        prop = Property(name, description, PROPERTY_TYPES.index(property_type), callback)
+        props.properties[name] = prop
+        return prop
+
+    def api_obs_properties_create(self):
+        return Properties()
+
+    def api_obs_properties_destroy(self, props: Properties):
+        pass
+
+    def api_obs_properties_get(self, props: Properties, name: str):
+        return props.properties.get(name)
+
+    def api_obs_properties_first(self, props: Properties):
+        return next(iter(props.properties.values()), None)
+
+    def api_obs_properties_apply_settings(self, props: Properties, settings: Data):
+        pass
+
+    def api_obs_properties_add_text(self, props: Properties, name: str, description: str, text_type: int):
+        return self.add_property(props, name, description, "TEXT")
+
+    def api_obs_properties_add_path(self, props: Properties, name: str, description: str, path_type: int, path_filter: str, default_path: str):
+        return self.add_property(props, name, description, "PATH")
+
+    def api_obs_properties_add_bool(self, props: Properties, name: str, description: str):
+        return self.add_property(props, name, description, "BOOL")
+
+    def api_obs_properties_add_int(self, props: Properties, name: str, description: str, minimum: int, maximum: int, step: int):
+        return self.add_property(props, name, description, "INT")
+
+    def api_obs_properties_add_int_slider(self, props: Properties, name: str, description: str, minimum: int, maximum: int, step: int):
+        return self.add_property(props, name, description, "INT")
+
+    def api_obs_properties_add_float(self, props: Properties, name: str, description: str, minimum: float, maximum: float, step: float):
+        return self.add_property(props, name, description, "FLOAT")
+
+    def api_obs_properties_add_float_slider(self, props: Properties, name: str, description: str, minimum: float, maximum: float, step: float):
+        return self.add_property(props, name, description, "FLOAT")
+
+    def api_obs_properties_add_list(self, props: Properties, name: str, description: str, combo_type: int, combo_format: int):
+        return self.add_property(props, name, description, "LIST")
+
+    def api_obs_properties_add_button(self, props: Properties, name: str, text: str, callback):
+        return self.add_property(props, name, text, "BUTTON", callback)
+
+    def api_obs_property_name(self, prop: Property) -> str:
+        return prop.name
+
+    def api_obs_property_description(self, prop: Property) -> str:
+        return prop.description
+
+    def api_obs_property_get_type(self, prop: Property) -> int:
+        return prop.type
+
+    def api_obs_property_list_item_count(self, prop: Property) -> int:
+        return len(prop.items)
+
+    #frontend
+
+    def api_obs_frontend_add_event_callback(self, callback):
+        self.frontend_callbacks.append(callback)
+
+    def api_obs_frontend_remove_event_callback(self, callback):
+        if callback in self.frontend_callbacks:
+            self.frontend_callbacks.remove(callback)
+
+    def api_obs_frontend_get_scenes(self) -> list:
+        return [self.acquire(source) for source in self.scenes]
+
+    def api_source_list_release(self, sources: list):
+        for source in sources:
+            self.release(source)
+
+    def api_obs_frontend_get_current_scene(self):
+        return self.acquire(self.current_scene)
+
+    def api_obs_frontend_set_current_scene(self, source: Source):
+        if source is not None and source is not self.current_scene:
+            self.current_scene = source
+            self.frontend_event(CONSTANTS["OBS_FRONTEND_EVENT_SCENE_CHANGED"])
+
+    def api_obs_frontend_save(self):
+        self.saves += 1
+
+    def api_obs_frontend_get_current_transition(self):
+        if self.transition is None:
+            self.transition = self.create_source("fade_transition", "Fade", private=True)
+        return self.acquire(self.transition)
+
+    def api_obs_frontend_recording_active(self) -> bool:
+        return self.recording
+
+    def api_obs_frontend_recording_start(self):
+        if not self.recording:
+            self.start_recording()
+
+    def api_obs_frontend_recording_stop(self):
+        if self.recording:
+            self.stop_recording()
+
+    def api_obs_frontend_get_last_recording(self):
+        return self.last_recording
+
+    def api_obs_frontend_get_recording_output(self):
+        return self.acquire(self.recording_output)
+
+    def api_obs_output_release(self, output: Output):
+        self.release(output)
+
+    def api_obs_output_set_preferred_size(self, output: Output, width: int, height: int):
+        output.preferred_size = (width, height)
+
+    def api_obs_frontend_get_profile_config(self):
+        return self.config
+
+    def api_config_get_string(self, config: dict, section: str, name: str):
+        return config.get((section, name))
+
+    def api_config_set_string(self, config: dict, section: str, name: str, value: str):
+        config[(section, name)] = value
+
+    def api_config_get_int(self, config: dict, section: str, name: str) -> int:
+        return int(config.get((section, name), 0))
+
+    def api_config_set_int(self, config: dict, section: str, name: str, value: int):
+        config[(section, name)] = int(value)
+
+    def api_config_get_uint(self, config: dict, section: str, name: str) -> int:
+        return int(config.get((section, name), 0))
+
+    def api_config_set_uint(self, config: dict, section: str, name: str, value: int):
+        config[(section, name)] = int(value)
+
+    def api_config_get_bool(self, config: dict, section: str, name: str) -> bool:
+        return bool(config.get((section, name), False))
+
+    def api_config_set_bool(self, config: dict, section: str, name: str, value: bool):
+        config[(section, name)] = bool(value)
+
+    def api_obs_get_video_info(self, info: obs_video_info) -> bool:
+        info.__dict__.update(self.video.__dict__)
+        return True
+
+    #volmeters, which obspython leaves out and full_pngtub_new loads from libobs itself
+
+    def api_obs_volmeter_create(self, fader_type: int):
+        volmeter = Volmeter()
+        self.volmeters.append(volmeter)
+        return volmeter
+
+    def api_obs_volmeter_destroy(self, volmeter: Volmeter):
+        if volmeter in self.volmeters:
+            self.volmeters.remove(volmeter)
+
+    def api_obs_volmeter_add_callback(self, volmeter: Volmeter, callback, data):
+        volmeter.callbacks.append((callback, data))
+
+    def api_obs_volmeter_remove_callback(self, volmeter: Volmeter, callback, data):
+        if (callback, data) in volmeter.callbacks:
+            volmeter.callbacks.remove((callback, data))
+
+    def api_obs_volmeter_attach_source(self, volmeter: Volmeter, source: Source) -> bool:
+        if source is None:
+            return False
+        volmeter.source = source
+        return True
+
+def install() -> FakeOBS:
+    '''
+    Puts a fresh fake in sys.modules as `obspython`. Call it before the scripts are imported: they bind `obs` at import time.
+
+    Returns: the FakeOBS behind the module, to drive it with
+    '''
+    fake = FakeOBS()
+    sys.modules["obspython"] = fake.build_module()
+    return fake
+
+def installed() -> FakeOBS:
+    """
+    Returns: the FakeOBS behind the obspython module in sys.modules, None if there's none or it's the real one.
+    """
+    module = sys.modules.get("obspython")
+    return getattr(module, "fake", None)
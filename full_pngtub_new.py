@@ -17,6 +17,7 @@
     along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 import obspython as obs
+from source_settings import SourceSettings
 import math as mt
 import time as t
 
@@ -32,10 +33,13 @@ nan     = float("nan")
 
 
 
-if platform.system() == "Linux":
-    libobs = ct.CDLL(ct.util.find_library("obs"))
-else:
-    libobs = ct.CDLL("obs")
+#obspython leaves the volmeter API out, so it comes from libobs itself. Outside OBS, fake_obspython provides it
+libobs = None
+if not hasattr(obs, "obs_volmeter_create"):
+    if platform.system() == "Linux":
+        libobs = ct.CDLL(ct.util.find_library("obs"))
+    else:
+        libobs = ct.CDLL("obs")
 
 
 def wrap(lib, funcname, restype, argtypes):
@@ -64,35 +68,36 @@ volmeter_callback_t = ct.CFUNCTYPE(None, ct.c_void_p, ct.POINTER(ct.c_float),
 
 
 
-obs.obs_volmeter_create             = wrap(libobs,
-                                           "obs_volmeter_create",
-                                           restype=ct.POINTER(ctVolmeter),
-                                           argtypes=[ct.c_int])
+if libobs is not None:
+    obs.obs_volmeter_create             = wrap(libobs,
+                                               "obs_volmeter_create",
+                                               restype=ct.POINTER(ctVolmeter),
+                                               argtypes=[ct.c_int])
 
-obs.obs_volmeter_destroy            = wrap(libobs,
-                                           "obs_volmeter_destroy",
-                                           restype=None,
-                                           argtypes=[ct.POINTER(ctVolmeter)])
+    obs.obs_volmeter_destroy            = wrap(libobs,
+                                               "obs_volmeter_destroy",
+                                               restype=None,
+                                               argtypes=[ct.POINTER(ctVolmeter)])
 
-obs.obs_volmeter_add_callback       = wrap(libobs,
-                                           "obs_volmeter_add_callback",
-                                           restype=None,
-                                           argtypes=[ct.POINTER(ctVolmeter), volmeter_callback_t, ct.c_void_p])
+    obs.obs_volmeter_add_callback       = wrap(libobs,
+                                               "obs_volmeter_add_callback",
+                                               restype=None,
+                                               argtypes=[ct.POINTER(ctVolmeter), volmeter_callback_t, ct.c_void_p])
 
-obs.obs_volmeter_remove_callback    = wrap(libobs,
-                                           "obs_volmeter_remove_callback",
-                                           restype=None,
-                                           argtypes=[ct.POINTER(ctVolmeter), volmeter_callback_t, ct.c_void_p])
+    obs.obs_volmeter_remove_callback    = wrap(libobs,
+                                               "obs_volmeter_remove_callback",
+                                               restype=None,
+                                               argtypes=[ct.POINTER(ctVolmeter), volmeter_callback_t, ct.c_void_p])
 
 
 
-_obs_volmeter_attach_source         = wrap(libobs,
-                                           "obs_volmeter_attach_source",
-                                           restype=ct.c_bool,
-                                           argtypes=[ct.POINTER(ctVolmeter), ct.POINTER(ctSource)])
+    _obs_volmeter_attach_source         = wrap(libobs,
+                                               "obs_volmeter_attach_source",
+                                               restype=ct.c_bool,
+                                               argtypes=[ct.POINTER(ctVolmeter), ct.POINTER(ctSource)])
 
-obs.obs_volmeter_attach_source = lambda volmeter, source : _obs_volmeter_attach_source(volmeter,
-                                                                                       ct.cast(int(source), ct.POINTER(ctSource)))
+    obs.obs_volmeter_attach_source = lambda volmeter, source : _obs_volmeter_attach_source(volmeter,
+                                                                                           ct.cast(int(source), ct.POINTER(ctSource)))
 
 ##########################################################################################
 
@@ -129,6 +134,9 @@ class Parameters():
     audio_sources   = []
     volmeter        = {}
 
+    # skips image source updates that wouldn't change the file
+    img_settings        = SourceSettings()
+
 params = Parameters()
 
 ###########################################################################################
@@ -288,6 +296,15 @@ def script_tick(seconds):
 
 ######################################################################################################################################################
 
+def set_image(path):
+    """Points the image source at `path`, without reloading it when it already shows that file
+    """
+    img_source = obs.obs_get_source_by_name(params.img_source_name)
+    if img_source:
+        params.img_settings.apply(img_source, {"file": path})
+    obs.obs_source_release(img_source)
+
+
 def noise_check():
 
     try:
@@ -295,26 +312,14 @@ def noise_check():
             if (not params.gate_open) and (max(params.noise.values()) >= params.gate_open_threshold):
                 params.gate_open = True
 
-                img_source = obs.obs_get_source_by_name(params.img_source_name)
-                if img_source:
-                    img_settings = obs.obs_source_get_settings(img_source)
-                    obs.obs_data_set_string(img_settings, "file", params.img_active)
-                    obs.obs_source_update(img_source, img_settings)
-                    obs.obs_data_release(img_settings)
-                obs.obs_source_release(img_source)
+                set_image(params.img_active)
                 params.gate_opened_time = t.time()
 
 
             elif params.gate_open and (max(params.noise.values())  <= params.gate_close_threshold):
                 params.gate_open = False
 
-                img_source = obs.obs_get_source_by_name(params.img_source_name)
-                if img_source:
-                    img_settings = obs.obs_source_get_settings(img_source)
-                    obs.obs_data_set_string(img_settings, "file", params.img_idle)
-                    obs.obs_source_update(img_source, img_settings)
-                    obs.obs_data_release(img_settings)
-                obs.obs_source_release(img_source)
+                set_image(params.img_idle)
 
                 for item in params.item_list:
                     if item.movelock():
@@ -443,18 +448,14 @@ def script_unload():
     if params.gate_open:
         params.gate_open = False
 
-        img_source = obs.obs_get_source_by_name(params.img_source_name)
-        if img_source:
-            img_settings = obs.obs_source_get_settings(img_source)
-            obs.obs_data_set_string(img_settings, "file", params.img_idle)
-            obs.obs_source_update(img_source, img_settings)
-            obs.obs_data_release(img_settings)
-        obs.obs_source_release(img_source)
+        set_image(params.img_idle)
 
         for item in params.item_list:
             if item.movelock():
                 item.reset()
 
+    params.img_settings.detach()
+
 
 def script_description():
     return "Makes a given source bounce when a gate on a given audio source opens"
@@ -480,13 +481,7 @@ def script_update(settings):
     if params.gate_open:
         params.gate_open = False
 
-        img_source = obs.obs_get_source_by_name(params.img_source_name)
-        if img_source:
-            img_settings = obs.obs_source_get_settings(img_source)
-            obs.obs_data_set_string(img_settings, "file", params.img_idle)
-            obs.obs_source_update(img_source, img_settings)
-            obs.obs_data_release(img_settings)
-        obs.obs_source_release(img_source)
+        set_image(params.img_idle)
 
         for item in params.item_list:
             if item.movelock():
@@ -522,13 +517,7 @@ def script_save(settings):
     if params.gate_open:
         params.gate_open = False
 
-        img_source = obs.obs_get_source_by_name(params.img_source_name)
-        if img_source:
-            img_settings = obs.obs_source_get_settings(img_source)
-            obs.obs_data_set_string(img_settings, "file", params.img_idle)
-            obs.obs_source_update(img_source, img_settings)
-            obs.obs_data_release(img_settings)
-        obs.obs_source_release(img_source)
+        set_image(params.img_idle)
 
         for item in params.item_list:
             if item.movelock():
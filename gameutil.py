@@ -1,7 +1,8 @@
 import obspython as obs
 import psutil
-import win32gui
 import subprocess
+import window_backend
+from process_index import ProcessIndex, ProcessTree
 
 class gameutil:
     '''
@@ -9,19 +10,63 @@ class gameutil:
     '''
 
     @staticmethod
-    def run_steam_game(game_name: str, game_steam_gameid: str):
+    def run_steam_game(game_name: str, game_steam_gameid: str) -> subprocess.Popen:
         """
-        Runs a steam game, given its steam gameid.
+        Runs a steam game, given its steam gameid. Returns as soon as the command is started, without waiting on it.
         """
         obs.script_log(obs.LOG_INFO, "Running "+game_name)
         steamCommand = "steam"
         steamGameParameter = "steam://rungameid/"+game_steam_gameid
-        subprocess.call([steamCommand, steamGameParameter])
+        command = subprocess.Popen([steamCommand, steamGameParameter])
+        #the Steam client spawns the game, not the command we ran, so that's where we follow it from.
+        #if Steam wasn't running, the command itself becomes the client
+        gameutil.track_launch(command.pid)
+        index = gameutil.get_process_index()
+        for pid in index.find_exact("steam.exe") + index.find_exact("steam"):
+            gameutil.track_launch(pid)
+        return command
 
     @staticmethod
-    def run_game(game_executable: str):
-        obs.script_log(obs.LOG_INFO, "Running" + game_executable)
-        subprocess.call([game_executable])
+    def run_game(game_executable: str) -> subprocess.Popen:
+        """
+        Runs the executable, without waiting on it.
+        """
+        obs.script_log(obs.LOG_INFO, "Running " + game_executable)
+        game = subprocess.Popen([game_executable])
+        gameutil.track_launch(game.pid)
+        return game
+
+    process_index = None
+
+    @staticmethod
+    def get_process_index() -> ProcessIndex:
+        """
+        Returns the shared `ProcessIndex`, refreshed so it reflects the current process list.
+        A refresh only queries the processes that started since the previous one.
+        """
+        if gameutil.process_index is None:
+            gameutil.process_index = ProcessIndex()
+        gameutil.process_index.refresh()
+        return gameutil.process_index
+
+    launch_tree = None
+
+    @staticmethod
+    def get_process_tree() -> ProcessTree:
+        """
+        Returns the shared `ProcessTree` of everything we launched, over the shared process index (refreshed).
+        """
+        index = gameutil.get_process_index()
+        if gameutil.launch_tree is None:
+            gameutil.launch_tree = ProcessTree(index)
+        return gameutil.launch_tree
+
+    @staticmethod
+    def track_launch(pid: int):
+        """
+        Roots the launch tree at `pid` too, so find_processid_by_name prefers that process' descendants.
+        """
+        gameutil.get_process_tree().add_root(pid)
 
     @staticmethod
     def check_if_process_running(processName: str) -> bool:
@@ -30,38 +75,29 @@ class gameutil:
 
         Returns: bool
         '''
-        #Iterate over the all the running process
-        for proc in psutil.process_iter():
-            try:
-                # Check if process name contains the given name string.
-                if processName.lower() in proc.name().lower():
-                    return True
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                pass
-        return False
+        return len(gameutil.get_process_index().find_substring(processName)) > 0
     
     @staticmethod
     def find_processid_by_name(processName: str) -> psutil.Process | None:
         '''
-        Iterate through running processes and return the one with the given proces name, otherwise None
+        Looks up the running process with the given process name (case-insensitive), otherwise None.
+        The newest match among the descendants of what we launched wins, so a relaunched game or a second copy isn't confused with ours;
+        without a launch to go by it's any match from the process index.
 
         Returns: Process | None
         '''
-        listOfProcessObjects = []
-    
-        #Iterate over the all the running process
-        for proc in psutil.process_iter():
-            try:
-                # Check if process name contains the given name string.
-                if proc.name().lower() in processName.lower() :
-                    listOfProcessObjects.append(proc)
-            except (psutil.NoSuchProcess, psutil.AccessDenied , psutil.ZombieProcess) :
-                pass
-
-        if len(listOfProcessObjects) == 0:
-            return None
-        else:
-            return listOfProcessObjects[0]
+        tree = gameutil.get_process_tree()
+        index = tree.index
+        if tree.roots:
+            pid = tree.newest_descendant(processName)
+            proc = index.process(pid) if pid is not None else None
+            if proc is not None:
+                return proc
+        for pid in index.find_exact(processName):
+            proc = index.process(pid)
+            if proc is not None:
+                return proc
+        return None
 
     @staticmethod
     def print_parent_proc(process: psutil.Process):
@@ -83,24 +119,23 @@ class gameutil:
     def print_child_procs(process: psutil.Process):
         if process is None:
             return
-        for child in process.children(recursive=True):
-            if child.pid != process.pid:
-                msg = "        - Child {proc_name} [PID = {proc_id}]".format(proc_name=child.name(), proc_id=child.pid)
-                obs.script_log(obs.LOG_INFO, msg)
-            else:
-                msg = "        - Child {proc_name} [PID = {proc_id}]".format(proc_name=process.name(), proc_id=process.pid)
-                obs.script_log(obs.LOG_INFO, msg)
+        tree = gameutil.get_process_tree()
+        for pid in tree.descendants(process.pid):
+            msg = "        - Child {proc_name} [PID = {proc_id}]".format(proc_name=tree.index.name(pid), proc_id=pid)
+            obs.script_log(obs.LOG_INFO, msg)
 
     @staticmethod
     def get_process_status(process: psutil.Process, window_name: str, window_class: str, crash_window_name: str, crash_window_class: str) -> str:
         '''
         Finds the window handle for the application's main window, as well as, for the crash window. Returns the process' status based on combination of Process.status() and which window of the two is currently in use.
+        Both lookups share the current tick's window snapshot.
 
         Returns: string
         '''
         try:
-            main_hwnd = win32gui.FindWindow(window_class, window_name)
-            crash_hwnd = win32gui.FindWindow(crash_window_class, crash_window_name)
+            snapshot = window_backend.get_default_backend().snapshot()
+            main_hwnd = snapshot.find(window_class, window_name)
+            crash_hwnd = snapshot.find(crash_window_class, crash_window_name)
             app_status = process.status()
             #obs.script_log(obs.LOG_INFO, str(main_hwnd)+","+str(crash_hwnd))
             if main_hwnd == 0 and crash_hwnd != 0:
@@ -0,0 +1,132 @@
+import json, os, platform, time, datetime
+import window_backend
+
+class LaunchTracker:
+    '''
+    LaunchTracker follows one game launch through its stages, stamping each with time.monotonic() when it's first seen:
+    the launch command issued, the game process seen, its main window seen, and game capture hooking it.
+    Nothing here blocks: `poll()` is meant to run off an OBS timer, `mark(CAPTURE_HOOKED)` from the hooked signal.
+    Once the capture hooks (or the launch is abandoned) the timings get appended as one JSON line to `log_path`,
+    so time-to-first-captured-frame can be charted per game and per machine.
+    '''
+    COMMAND_ISSUED = "command_issued"
+    PROCESS_SEEN = "process_seen"
+    MAIN_WINDOW_SEEN = "main_window_seen"
+    CAPTURE_HOOKED = "capture_hooked"
+    STAGES = (COMMAND_ISSUED, PROCESS_SEEN, MAIN_WINDOW_SEEN, CAPTURE_HOOKED)
+
+    default_log_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "launch_timings.jsonl")
+
+    def __init__(self, game: str, exe_name: str, log_path: str = None):
+        self.game = game
+        self.exe_name = exe_name
+        self.log_path = log_path if log_path is not None else LaunchTracker.default_log_path
+        self.stamps = {}
+        self.started = None
+        self.process = None
+        #the WindowInfo of the main window, once seen
+        self.window = None
+        self.written = False
+        self.write_error = None
+
+    def mark(self, stage: str) -> bool:
+        """
+        Stamps `stage` unless it already is. Stamping CAPTURE_HOOKED finishes the launch and writes its timings.
+
+        Returns:
+            bool: True if the stage was newly stamped.
+        """
+        if stage in self.stamps or self.written:
+            return False
+        self.stamps[stage] = time.monotonic()
+        if stage == LaunchTracker.COMMAND_ISSUED:
+            self.started = datetime.datetime.now(datetime.timezone.utc)
+        elif stage == LaunchTracker.CAPTURE_HOOKED:
+            self.finish()
+        return True
+
+    def elapsed(self, stage: str) -> float:
+        """
+        Returns: seconds from the launch command to `stage`, None if either wasn't reached.
+        """
+        if stage not in self.stamps or LaunchTracker.COMMAND_ISSUED not in self.stamps:
+            return None
+        return self.stamps[stage] - self.stamps[LaunchTracker.COMMAND_ISSUED]
+
+    def age(self) -> float:
+        """
+        Returns: seconds since the launch command, 0 before it's issued.
+        """
+        if LaunchTracker.COMMAND_ISSUED not in self.stamps:
+            return 0.0
+        return time.monotonic() - self.stamps[LaunchTracker.COMMAND_ISSUED]
+
+    def waiting_for(self) -> str:
+        """
+        Returns: the stage poll() is looking for next, None once the main window's been seen.
+        """
+        if self.process is None:
+            return LaunchTracker.PROCESS_SEEN
+        if self.window is None:
+            return LaunchTracker.MAIN_WINDOW_SEEN
+        return None
+
+    @staticmethod
+    def top_window(process) -> window_backend.WindowInfo:
+        """
+        Returns: the last visible top-level window the process has in Z order, None if it has none yet.
+        """
+        windows = window_backend.get_default_backend().snapshot().windows_of(process.pid)
+        return windows[-1] if windows else None
+
+    def poll(self, find_process, find_window=None) -> bool:
+        """
+        Checks for the stages we have to go looking for: the process (through `find_process(exe_name)`) and then its main window
+        (through `find_window(process)`, `top_window` unless given).
+
+        Returns:
+            bool: True once there's nothing left to poll for.
+        """
+        if self.written:
+            return True
+        if self.process is None:
+            self.process = find_process(self.exe_name)
+            if self.process is None:
+                return False
+            self.mark(LaunchTracker.PROCESS_SEEN)
+        if self.window is None:
+            self.window = (find_window or LaunchTracker.top_window)(self.process)
+            if self.window is None:
+                return False
+            self.mark(LaunchTracker.MAIN_WINDOW_SEEN)
+        return True
+
+    def record(self) -> dict:
+        return {
+            "game": self.game,
+            "exe_name": self.exe_name,
+            "machine": platform.node(),
+            "started": self.started.isoformat() if self.started is not None else None,
+            "pid": self.process.pid if self.process is not None else None,
+            #milliseconds since the launch command, None for stages never reached
+            "stages": {stage: None if self.elapsed(stage) is None else round(self.elapsed(stage) * 1000, 1) for stage in LaunchTracker.STAGES},
+        }
+
+    def finish(self) -> bool:
+        """
+        Writes the timings reached so far, once. Called on hook, or when the launch is given up on.
+        Failing to write (a read-only script directory) only loses the timings, the error is kept in `write_error` for the caller to log.
+
+        Returns:
+            bool: False if the timings couldn't be written.
+        """
+        if self.written or LaunchTracker.COMMAND_ISSUED not in self.stamps:
+            return True
+        self.written = True
+        try:
+            with open(self.log_path, "a") as f:
+                f.write(json.dumps(self.record(), separators=(",", ":")) + "\n")
+        except OSError as e:
+            self.write_error = e
+            return False
+        return True
@@ -0,0 +1,252 @@
+'''
+Out-of-process game monitor. The OBS script starts it with `MonitorDaemon.start()`; it does the psutil and window polling
+in its own interpreter, so a slow scan never holds the GIL OBS's script callbacks need, and publishes what it sees into a small
+shared-memory block that the script reads with `MonitorDaemon.read()`, no IPC round-trip.
+
+    python monitor_daemon.py --shm NAME --parent PID [--interval SECONDS]
+
+Shared memory layout (little endian), every section guarded by its own seqlock counter (odd while being written):
+    header  magic, version, command (0 run, 1 stop)
+    config  seq, then the exe name, window title/class and crash window title/class, 128 bytes of UTF-8 each; written by the script
+    status  seq, then MonitorStatus; written by the daemon
+'''
+import argparse, os, struct, subprocess, sys, time
+from collections import namedtuple
+from multiprocessing import shared_memory
+import psutil
+from process_index import ProcessIndex, PROCESS_ERRORS
+from window_backend import get_default_backend
+
+MonitorStatus = namedtuple("MonitorStatus", ["daemon_pid", "game_pid", "game_create_time", "updated_at", "scans",
+                                             "running", "status", "crash_dialog", "main_window", "window_count", "main_hwnd", "scan_seconds"])
+
+#psutil status strings, stored as their index
+STATUSES = ("", "running", "sleeping", "disk-sleep", "stopped", "tracing-stop", "zombie", "dead", "wake-kill", "waking", "idle", "locked", "waiting", "parked")
+
+MAGIC = 0x4F515344
+VERSION = 1
+RUN, STOP = 0, 1
+
+HEADER = struct.Struct("<IHH")
+SEQ = struct.Struct("<I")
+TEXT_SIZE = 128
+CONFIG_FIELDS = ("exe_name", "window_name", "window_class", "crash_window_name", "crash_window_class")
+CONFIG = struct.Struct("<" + "{}s".format(TEXT_SIZE) * len(CONFIG_FIELDS))
+STATUS = struct.Struct("<IIddIBBBBHQd")
+
+CONFIG_SEQ_OFFSET = HEADER.size
+CONFIG_OFFSET = CONFIG_SEQ_OFFSET + SEQ.size
+STATUS_SEQ_OFFSET = CONFIG_OFFSET + CONFIG.size
+STATUS_OFFSET = STATUS_SEQ_OFFSET + SEQ.size
+SIZE = STATUS_OFFSET + STATUS.size
+
+def attach(name: str) -> shared_memory.SharedMemory:
+    '''
+    Opens an existing block without handing it to this process' resource tracker, which would otherwise unlink it when we exit.
+    '''
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    shm = shared_memory.SharedMemory(name)
+    if os.name != "nt":
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+def seqlock_write(buf, seq_offset: int, layout: struct.Struct, offset: int, values):
+    seq = SEQ.unpack_from(buf, seq_offset)[0]
+    SEQ.pack_into(buf, seq_offset, (seq + 1) & 0xFFFFFFFF)
+    layout.pack_into(buf, offset, *values)
+    SEQ.pack_into(buf, seq_offset, (seq + 2) & 0xFFFFFFFF)
+
+def seqlock_read(buf, seq_offset: int, layout: struct.Struct, offset: int, retries: int = 100):
+    """
+    Returns: the section's values as of one consistent write, or None if the writer kept getting in the way.
+    """
+    for _ in range(retries):
+        before = SEQ.unpack_from(buf, seq_offset)[0]
+        if before & 1:
+            continue
+        values = layout.unpack_from(buf, offset)
+        if SEQ.unpack_from(buf, seq_offset)[0] == before:
+            return values
+    return None
+
+def encode_text(text: str) -> bytes:
+    return (text or "").encode("utf-8")[:TEXT_SIZE]
+
+def decode_text(raw: bytes) -> str:
+    return raw.rstrip(b"\0").decode("utf-8", errors="replace")
+
+
+class MonitorDaemon:
+    '''
+    The OBS script's handle on the helper process: owns the shared memory, starts and stops the daemon, and reads its status.
+    '''
+    def __init__(self, interval: float = 0.2):
+        self.interval = interval
+        self.shm = None
+        self.process = None
+
+    @staticmethod
+    def python_executable() -> str:
+        """
+        Returns: a Python interpreter to run the daemon with. Inside OBS sys.executable is OBS itself, so we look next to the Python it loaded.
+        """
+        if os.path.basename(sys.executable).lower().startswith("python"):
+            return sys.executable
+        for prefix in (sys.exec_prefix, sys.prefix, getattr(sys, "base_exec_prefix", sys.prefix)):
+            for candidate in ("python.exe", "pythonw.exe", os.path.join("bin", "python3"), os.path.join("bin", "python")):
+                path = os.path.join(prefix, candidate)
+                if os.path.isfile(path):
+                    return path
+        raise FileNotFoundError("no Python interpreter found for the monitor daemon under " + sys.prefix)
+
+    def start(self):
+        if self.process is not None:
+            return
+        self.shm = shared_memory.SharedMemory(create=True, size=SIZE)
+        self.shm.buf[:SIZE] = bytes(SIZE)
+        HEADER.pack_into(self.shm.buf, 0, MAGIC, VERSION, RUN)
+        creationflags = 0x08000000 if os.name == "nt" else 0 #CREATE_NO_WINDOW
+        try:
+            self.process = subprocess.Popen([MonitorDaemon.python_executable(), os.path.abspath(__file__),
+                                             "--shm", self.shm.name, "--parent", str(os.getpid()), "--interval", str(self.interval)],
+                                            creationflags=creationflags, close_fds=True)
+        except OSError:
+            self.close_shm()
+            raise
+
+    def running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def configure(self, exe_name: str, window_name: str, window_class: str, crash_window_name: str, crash_window_class: str):
+        """
+        Tells the daemon what to watch. Takes effect on its next scan.
+        """
+        if self.shm is None:
+            return
+        seqlock_write(self.shm.buf, CONFIG_SEQ_OFFSET, CONFIG, CONFIG_OFFSET,
+                      [encode_text(text) for text in (exe_name, window_name, window_class, crash_window_name, crash_window_class)])
+
+    def read(self) -> MonitorStatus:
+        """
+        Returns: the daemon's latest status, or None before its first scan.
+        """
+        if self.shm is None:
+            return None
+        values = seqlock_read(self.shm.buf, STATUS_SEQ_OFFSET, STATUS, STATUS_OFFSET)
+        if values is None or values[4] == 0:
+            return None
+        status = MonitorStatus(*values)
+        return status._replace(status=STATUSES[status.status] if status.status < len(STATUSES) else "",
+                               running=bool(status.running), crash_dialog=bool(status.crash_dialog), main_window=bool(status.main_window))
+
+    def age(self) -> float:
+        """
+        Returns: seconds since the daemon last published, None if it never has.
+        """
+        status = self.read()
+        return None if status is None else time.time() - status.updated_at
+
+    def stop(self, timeout: float = 2.0):
+        if self.shm is not None:
+            HEADER.pack_into(self.shm.buf, 0, MAGIC, VERSION, STOP)
+        if self.process is not None:
+            try:
+                self.process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+        self.close_shm()
+
+    def close_shm(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+
+def scan(config: dict, index, backend) -> tuple:
+    """
+    One pass over the game's process and windows.
+
+    Returns: the status values, less daemon_pid, updated_at, scans and scan_seconds.
+    """
+    backend.invalidate()
+    snapshot = backend.snapshot()
+    index.refresh()
+    game_pid, create_time, running, status = 0, 0.0, 0, 0
+    pids = index.find_exact(config["exe_name"]) if config["exe_name"] else []
+    #the most recently started match; pids get reused (and wrap), so the highest one can be a stale or unrelated copy
+    proc = None
+    for pid in sorted(pids, key=lambda pid: index.create_time(pid) or 0.0, reverse=True):
+        proc = index.process(pid)
+        if proc is not None:
+            break
+    if proc is not None:
+        try:
+            with proc.oneshot():
+                create_time = proc.create_time()
+                state = proc.status()
+            game_pid, running = proc.pid, 1
+            status = STATUSES.index(state) if state in STATUSES else 0
+        except PROCESS_ERRORS:
+            proc = None
+    if config["window_name"] or config["window_class"]:
+        main_hwnd = snapshot.find(config["window_class"] or None, config["window_name"] or None)
+    else:
+        #nothing to match on yet, the game's top window is what the script's discovery would pick
+        windows = snapshot.windows_of(game_pid) if game_pid else []
+        main_hwnd = windows[-1].hwnd if windows else 0
+    crash_hwnd = snapshot.find(config["crash_window_class"] or None, config["crash_window_name"] or None) if config["crash_window_name"] or config["crash_window_class"] else 0
+    window_count = snapshot.count(game_pid) if game_pid else 0
+    return game_pid, create_time, running, status, int(crash_hwnd != 0), int(main_hwnd != 0), min(window_count, 0xFFFF), main_hwnd
+
+def run_daemon(shm_name: str, parent_pid: int, interval: float) -> int:
+    shm = attach(shm_name)
+    buf = shm.buf
+    try:
+        magic, version, _ = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != VERSION:
+            print("monitor daemon: {} isn't a version {} status block".format(shm_name, VERSION), file=sys.stderr)
+            return 1
+        index = ProcessIndex()
+        backend = get_default_backend()
+        config = dict.fromkeys(CONFIG_FIELDS, "")
+        scans = 0
+        next_at = time.monotonic()
+        while HEADER.unpack_from(buf, 0)[2] == RUN:
+            #OBS went away without stopping us
+            if not psutil.pid_exists(parent_pid):
+                break
+            values = seqlock_read(buf, CONFIG_SEQ_OFFSET, CONFIG, CONFIG_OFFSET)
+            if values is not None:
+                config = dict(zip(CONFIG_FIELDS, (decode_text(value) for value in values)))
+            start = time.perf_counter()
+            game_pid, create_time, running, status, crash_dialog, main_window, window_count, main_hwnd = scan(config, index, backend)
+            scans += 1
+            seqlock_write(buf, STATUS_SEQ_OFFSET, STATUS, STATUS_OFFSET,
+                          (os.getpid(), game_pid, create_time, time.time(), scans, running, status, crash_dialog, main_window,
+                           window_count, main_hwnd, time.perf_counter() - start))
+            next_at += interval
+            delay = next_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_at = time.monotonic()
+        return 0
+    finally:
+        del buf
+        shm.close()
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Monitor a game process and its windows into shared memory for the OBS script.")
+    parser.add_argument("--shm", required=True, help="name of the shared memory block MonitorDaemon created")
+    parser.add_argument("--parent", type=int, required=True, help="pid to exit with")
+    parser.add_argument("--interval", type=float, default=0.2)
+    args = parser.parse_args(argv)
+    return run_daemon(args.shm, args.parent, args.interval)
+
+if __name__ == "__main__":
+    sys.exit(main())
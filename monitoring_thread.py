@@ -1,15 +1,24 @@
 import threading
 
 class MonitoringThread(threading.Thread):
-    
-    def __init__(self, target, args=(), kwargs=None):
+    '''
+    Runs a state machine on its own thread. With an `events` queue, the machine's callback and state changes are published to it
+    instead of being called on this thread, so it runs wherever the queue gets drained (OBS's main thread).
+    The handlers go to the machine like any other argument, e.g. `kwargs={"callback": on_done, "on_state_change": on_state}`.
+    '''
+    def __init__(self, target, args=(), kwargs=None, events=None):
         super().__init__()
         self.target = target
         self.args = args
         self.kwargs = kwargs if kwargs is not None else {}
+        self.events = events
 
     def run(self):
         # Instantiate the target with given arguments
         fsm = self.target(*self.args, **self.kwargs)
+        if self.events is not None:
+            if fsm.callback is not None:
+                fsm.callback = self.events.wrap(id(fsm), fsm.callback)
+            if fsm.on_state_change is not None:
+                fsm.on_state_change = self.events.wrap(id(fsm), fsm.on_state_change)
         fsm.run()
-
@@ -0,0 +1,172 @@
+import sys
+import obspython as obs
+
+class RefTracker:
+    '''
+    RefTracker is the debug leak detector behind the `ObsRef` wrappers. While `enabled` it remembers, for every reference a wrapper
+    took ownership of, what it was and the line of script code that acquired it, and forgets it again when the wrapper releases it.
+    Whatever's left in `report()` at script_unload is a reference that was never released.
+
+    Disabled it only counts, so it can stay wired in for normal use.
+    '''
+    def __init__(self):
+        self.enabled = False
+        #wrapper -> (description, "file:line in function")
+        self.held = {}
+        self.acquired = 0
+        self.released = 0
+
+    @staticmethod
+    def call_site() -> str:
+        #the first frame that isn't this module is whoever acquired the reference
+        frame = sys._getframe(1)
+        while frame is not None and frame.f_code.co_filename == __file__:
+            frame = frame.f_back
+        if frame is None:
+            return "unknown"
+        return "{file}:{line} in {function}".format(file=frame.f_code.co_filename, line=frame.f_lineno, function=frame.f_code.co_name)
+
+    def acquire(self, wrapper):
+        self.acquired += 1
+        if self.enabled:
+            self.held[wrapper] = (wrapper.describe(), RefTracker.call_site())
+
+    def release(self, wrapper):
+        self.released += 1
+        self.held.pop(wrapper, None)
+
+    def clear(self):
+        self.held.clear()
+        self.acquired = 0
+        self.released = 0
+
+    def report(self) -> list:
+        '''
+        Returns: a line per reference acquired while enabled and not released yet, with where it was acquired
+        '''
+        return ["{description} acquired at {site}".format(description=description, site=site) for description, site in self.held.values()]
+
+    def metrics(self) -> dict:
+        return {
+            "acquired": self.acquired,
+            "released": self.released,
+            "outstanding": self.acquired - self.released,
+        }
+
+class ObsRef:
+    '''
+    ObsRef owns one obs reference that **requires release**, and releases it when its `with` block ends:
+
+        with SourceRef(obs.obs_get_source_by_name(name)) as source_ref:
+            ...
+
+    The block gets the raw reference (None when the call failed, which is fine to release). `release()` can be called early, and
+    releasing twice only releases once. Subclasses name the release function for their kind of reference.
+    '''
+    #shared by every script, they all run in OBS' one interpreter
+    tracker = RefTracker()
+    kind = "reference"
+
+    def __init__(self, ref):
+        self.ref = ref
+        if ref is not None:
+            ObsRef.tracker.acquire(self)
+
+    def release_ref(self, ref):
+        raise NotImplementedError
+
+    def describe(self) -> str:
+        return self.kind
+
+    def release(self):
+        if self.ref is None:
+            return
+        ref = self.ref
+        self.ref = None
+        ObsRef.tracker.release(self)
+        self.release_ref(ref)
+
+    def __enter__(self):
+        return self.ref
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.release()
+        return False
+
+class SourceRef(ObsRef):
+    '''
+    Owns an obs_source_t*, e.g. from obs_get_source_by_name, obs_frontend_get_current_scene or obs_source_create.
+    '''
+    kind = "obs_source_t"
+
+    def release_ref(self, ref):
+        obs.obs_source_release(ref)
+
+    def describe(self) -> str:
+        return "{kind} '{name}'".format(kind=self.kind, name=obs.obs_source_get_name(self.ref))
+
+class SceneRef(ObsRef):
+    '''
+    Owns an obs_scene_t*, e.g. from obs_scene_get_ref or obs_scene_create.
+    '''
+    kind = "obs_scene_t"
+
+    def release_ref(self, ref):
+        obs.obs_scene_release(ref)
+
+    def describe(self) -> str:
+        return "{kind} '{name}'".format(kind=self.kind, name=obs.obs_source_get_name(obs.obs_scene_get_source(self.ref)))
+
+class SceneItemRef(ObsRef):
+    '''
+    Owns an obs_sceneitem_t*, e.g. from obs_scene_sceneitem_from_source.
+    '''
+    kind = "obs_sceneitem_t"
+
+    def release_ref(self, ref):
+        obs.obs_sceneitem_release(ref)
+
+    def describe(self) -> str:
+        return "{kind} of '{name}'".format(kind=self.kind, name=obs.obs_source_get_name(obs.obs_sceneitem_get_source(self.ref)))
+
+class DataRef(ObsRef):
+    '''
+    Owns an obs_data_t*, e.g. from obs_data_create, obs_source_get_settings or obs_data_get_defaults.
+    '''
+    kind = "obs_data_t"
+
+    def release_ref(self, ref):
+        obs.obs_data_release(ref)
+
+class DataArrayRef(ObsRef):
+    '''
+    Owns an obs_data_array_t*, e.g. from obs_save_sources.
+    '''
+    kind = "obs_data_array_t"
+
+    def release_ref(self, ref):
+        obs.obs_data_array_release(ref)
+
+class SourceList(ObsRef):
+    '''
+    Owns a list of obs_source_t*, e.g. from obs_frontend_get_scenes. The sources in it are only valid inside the `with` block.
+    '''
+    kind = "source list"
+
+    def release_ref(self, ref):
+        obs.source_list_release(ref)
+
+    def describe(self) -> str:
+        return "{kind} of {count}".format(kind=self.kind, count=len(self.ref))
+
+class SceneItemList(ObsRef):
+    '''
+    Owns a list of obs_sceneitem_t*, from obs_scene_enum_items. The items in it are only valid inside the `with` block.
+    '''
+    kind = "scene item list"
+
+    def release_ref(self, ref):
+        obs.sceneitem_list_release(ref)
+
+    def describe(self) -> str:
+        return "{kind} of {count}".format(kind=self.kind, count=len(self.ref))
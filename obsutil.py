@@ -1,5 +1,8 @@
 import obspython as obs
 from enum import Enum
+from scene_index import SceneIndex
+from source_settings import SourceSettings
+from obs_refs import DataRef, SourceRef, SceneRef, SceneItemList
 
 class obsutil:
     '''
@@ -22,6 +25,17 @@ class obsutil:
         "OBS_PROPERTY_GROUP",
     ]
 
+    scene_index = None
+
+    @staticmethod
+    def get_scene_index() -> SceneIndex:
+        """
+        Returns the shared `SceneIndex`, built on first use and kept current by OBS signals after that.
+        """
+        if obsutil.scene_index is None:
+            obsutil.scene_index = SceneIndex()
+        return obsutil.scene_index
+
     @staticmethod
     def find_scene(scene_name : str):
         """
@@ -30,23 +44,37 @@ class obsutil:
         Returns: obs_scene_t*, does **not require release**
 
         ##### obs API responsibilities
-        * Uses [obs_frontend_get_scenes](https://docs.obsproject.com/reference-frontend-api#c.obs_frontend_get_scenes) which **requires release** through [source_list_release](https://docs.obsproject.com/scripting#source_list_release).
-
-        * Uses [obs_source_get_name](https://docs.obsproject.com/reference-sources#c.obs_source_get_name) which doesn't increase the ref count.
+        * Uses `SceneIndex.find_scene_source`, which doesn't increase the ref count.
 
         * Uses [obs_scene_from_source](https://docs.obsproject.com/reference-scenes#c.obs_scene_from_source) which doesn't increase ref count.
         """
-        scene_ref = None
-        scene = None
-        scenes = obs.obs_frontend_get_scenes()
-        for iscene in scenes:
-            name = obs.obs_source_get_name(iscene)
-            if name == scene_name:
-                scene_ref = iscene
-                break
-        scene = obs.obs_scene_from_source(scene_ref)
-        obs.source_list_release(scenes)
-        return scene
+        scene_source_ref = obsutil.get_scene_index().find_scene_source(scene_name)
+        if scene_source_ref is None:
+            return None
+        return obs.obs_scene_from_source(scene_source_ref)
+
+    source_settings = None
+
+    @staticmethod
+    def get_source_settings() -> SourceSettings:
+        """
+        Returns the shared `SourceSettings`, which skips updates that wouldn't change anything.
+        """
+        if obsutil.source_settings is None:
+            obsutil.source_settings = SourceSettings()
+        return obsutil.source_settings
+
+    @staticmethod
+    def apply_source_settings(source_ref, values: dict) -> bool:
+        """
+        Sets the given settings on the source, with one obs_source_update of the values that differ from its current ones, or none.
+
+        Returns: bool, whether the source was updated
+
+        ##### obs API responsibilities
+        * Uses `SourceSettings.apply`, which releases what it takes and doesn't change the ref count of `source_ref`.
+        """
+        return obsutil.get_source_settings().apply(source_ref, values)
 
     @staticmethod
     def find_or_create_scene(scene_name: str):
@@ -58,55 +86,51 @@ class obsutil:
         ##### obs API responsibilities
         * Uses `find_scene`, doesn't require release.
 
-        * Uses [obs_scene_create](https://docs.obsproject.com/reference-scenes#c.obs_scene_create), which doesn't require release.
+        * Uses [obs_scene_create](https://docs.obsproject.com/reference-scenes#c.obs_scene_create), which **requires release**. The frontend
+        keeps its own reference to the new scene, so ours is released here.
         """
         scene_ref = obsutil.find_scene(scene_name)
         if scene_ref is None:
             obs.script_log(obs.LOG_INFO, "Scene does not exist. Will create.")
             scene_ref = obs.obs_scene_create(scene_name)
+            SceneRef(scene_ref).release()
         return scene_ref
 
     @staticmethod
     def print_source_info(source_ref):
-        settings = obs.obs_source_get_settings(source_ref)
-        psettings = obs.obs_source_get_private_settings(source_ref)
-        dsettings = obs.obs_data_get_defaults(settings)
-        pdsettings = obs.obs_data_get_defaults(psettings)
-        print("[---------- settings ----------")
-        print(obs.obs_data_get_json(settings))
-        print("---------- private_settings ----------")
-        print(obs.obs_data_get_json(psettings))
-        print("---------- default settings for this source type ----------")
-        print(obs.obs_data_get_json(dsettings))
-        print("---------- default private settings for this source type ----------")
-        print(obs.obs_data_get_json(pdsettings))
+        with DataRef(obs.obs_source_get_settings(source_ref)) as settings, DataRef(obs.obs_source_get_private_settings(source_ref)) as psettings:
+            with DataRef(obs.obs_data_get_defaults(settings)) as dsettings, DataRef(obs.obs_data_get_defaults(psettings)) as pdsettings:
+                print("[---------- settings ----------")
+                print(obs.obs_data_get_json(settings))
+                print("---------- private_settings ----------")
+                print(obs.obs_data_get_json(psettings))
+                print("---------- default settings for this source type ----------")
+                print(obs.obs_data_get_json(dsettings))
+                print("---------- default private settings for this source type ----------")
+                print(obs.obs_data_get_json(pdsettings))
 
     @staticmethod
     def print_scene_info(scene_name: str):
         scene_ref = obsutil.find_scene(scene_name)
         if scene_ref is None:
             print('Scene does not exist')
-        scene_ref = obs.obs_scene_get_ref(scene_ref)
-        source_ref = obs.obs_scene_get_source(scene_ref)
-        obsutil.print_source_info(source_ref)
-        obs.obs_scene_release(scene_ref)
+            return
+        #find_scene doesn't give us a reference, and obs_scene_get_source doesn't take one
+        obsutil.print_source_info(obs.obs_scene_get_source(scene_ref))
 
     @staticmethod
     def walk_scene_items_in_current_source():
-        current_scene_as_source = obs.obs_frontend_get_current_scene()
-        if not current_scene_as_source:
-            return
-
-        current_scene = obs.obs_scene_from_source(current_scene_as_source)
-        items = obs.obs_scene_enum_items(current_scene)
-        for s, i in enumerate(items):
-            source = obs.obs_sceneitem_get_source(i)
-            if source is None:
-                continue
-            print("SourceItem:"+obs.obs_source_get_name(source))
-
-        obs.sceneitem_list_release(items)
-        obs.obs_source_release(current_scene_as_source)
+        with SourceRef(obs.obs_frontend_get_current_scene()) as current_scene_as_source:
+            if not current_scene_as_source:
+                return
+
+            current_scene = obs.obs_scene_from_source(current_scene_as_source)
+            with SceneItemList(obs.obs_scene_enum_items(current_scene)) as items:
+                for s, i in enumerate(items):
+                    source = obs.obs_sceneitem_get_source(i)
+                    if source is None:
+                        continue
+                    print("SourceItem:"+obs.obs_source_get_name(source))
 
     @staticmethod
     def print_property_info(property, settings):
@@ -142,69 +166,58 @@ class obsutil:
         if(scene_ref is None):
             print('scene var is None')
             return
-        scene_items = obs.obs_scene_enum_items(scene_ref)
-        for s, i in enumerate(scene_items):
-            source_ref = obs.obs_sceneitem_get_source(i)
-            if source_ref is None:
-                continue
-            # print("SourceItem:"+obs.obs_source_get_name(source))
-            source_name = obs.obs_source_get_name(source_ref)
-            print("\tSource Name:" + source_name)
-            # source_type = obs.obs_source_get_type(source_ref)
-            # print("\tSource Type:" + str(source_type))
-            # source_properties = obs.obs_source_properties(source_ref)
-            source_settings = obs.obs_source_get_settings(source_ref)
-            # source_property = obs.obs_properties_first(source_properties)
-            # print_property_info(source_property, source_settings)
-            # source_property = obs.obs_properties_get(source_properties, "mode")
-            # print_property_info(source_property, source_settings)
-            # source_property = obs.obs_properties_get(source_properties, "window")
-            # print_property_info(source_property, source_settings)
-
-            json = obs.obs_data_get_json_pretty_with_defaults(source_settings)
-            print(json+"\n\n")
-
-            # source_property_pp  = ffi.new("struct obs_property_t *[1]")
-            # source_property_pp[0] = source_property
-            # while(obs.obs_property_next(source_property_pp)):
-            #     source_property = ffi.new("struct obs_property_t *", source_property_pp[0])
-            #     print_property_info(source_property)
-            #     source_property_pp  = ffi.new("struct obs_property_t *[1]")
-            #     source_property_pp[0] = source_property
-
-            #obs.obs_properties_destroy(source_properties)
-            obs.obs_data_release(source_settings)
-
-        obs.sceneitem_list_release(scene_items)
-        obs.obs_scene_release(scene_ref)
+        with SceneItemList(obs.obs_scene_enum_items(scene_ref)) as scene_items:
+            for s, i in enumerate(scene_items):
+                source_ref = obs.obs_sceneitem_get_source(i)
+                if source_ref is None:
+                    continue
+                # print("SourceItem:"+obs.obs_source_get_name(source))
+                source_name = obs.obs_source_get_name(source_ref)
+                print("\tSource Name:" + source_name)
+                # source_type = obs.obs_source_get_type(source_ref)
+                # print("\tSource Type:" + str(source_type))
+                # source_properties = obs.obs_source_properties(source_ref)
+                source_settings = DataRef(obs.obs_source_get_settings(source_ref))
+                # source_property = obs.obs_properties_first(source_properties)
+                # print_property_info(source_property, source_settings)
+                # source_property = obs.obs_properties_get(source_properties, "mode")
+                # print_property_info(source_property, source_settings)
+                # source_property = obs.obs_properties_get(source_properties, "window")
+                # print_property_info(source_property, source_settings)
+
+                json = obs.obs_data_get_json_pretty_with_defaults(source_settings.ref)
+                print(json+"\n\n")
+
+                # source_property_pp  = ffi.new("struct obs_property_t *[1]")
+                # source_property_pp[0] = source_property
+                # while(obs.obs_property_next(source_property_pp)):
+                #     source_property = ffi.new("struct obs_property_t *", source_property_pp[0])
+                #     print_property_info(source_property)
+                #     source_property_pp  = ffi.new("struct obs_property_t *[1]")
+                #     source_property_pp[0] = source_property
+
+                #obs.obs_properties_destroy(source_properties)
+                source_settings.release()
+        #no obs_scene_release, find_scene doesn't give us a reference
 
     @staticmethod
     def find_scene_item(scene_ref, source_name: str):
         """
-        Tries to find the scene with the same name, but if it doesn't, autocreates it.
+        Finds the scene item showing the named source within the scene.
 
         Returns: obs_sceneitem_t*, does **not require release**.
 
         ##### obs API responsibilities
-        * Uses [obs_scene_enum_items](https://docs.obsproject.com/scripting#obs_scene_enum_items), which **requires release** through [sceneitem_list_release](https://docs.obsproject.com/scripting#sceneitem_list_release).
-
-        * Uses [obs_sceneitem_get_source](https://docs.obsproject.com/reference-scenes#c.obs_sceneitem_get_source, which does not increment ref count.
+        * Uses [obs_scene_get_source](https://docs.obsproject.com/reference-scenes#c.obs_scene_get_source), which does not increment ref count.
 
         * Uses [obs_source_get_name](https://docs.obsproject.com/reference-sources#c.obs_source_get_name) which doesn't increase the ref count.
+
+        * Uses `SceneIndex.find_scene_item`, which doesn't increase the ref count.
         """
-        scene_item = None
-        scene_items = obs.obs_scene_enum_items(scene_ref)
-        for s, i in enumerate(scene_items):
-            source_ref = obs.obs_sceneitem_get_source(i)
-            if source_ref is None:
-                continue
-            # print("SourceItem:"+obs.obs_source_get_name(source))
-            scene_item_name = obs.obs_source_get_name(source_ref)
-            if scene_item_name == source_name:
-                scene_item = i
-                break
-        obs.sceneitem_list_release(scene_items)
-        return scene_item
+        if scene_ref is None:
+            return None
+        scene_name = obs.obs_source_get_name(obs.obs_scene_get_source(scene_ref))
+        return obsutil.get_scene_index().find_scene_item(scene_name, source_name)
 
     @staticmethod
     def find_scene_item_by_names(scene_name: str, source_name: str):
@@ -215,13 +228,22 @@ class obsutil:
 
         ##### obs API responsibilities
 
-        * Uses `find_scene`, which doesn't increment the ref count
+        * Uses `SceneIndex.find_scene_item`, which doesn't increment the ref count
+        """
+        return obsutil.get_scene_index().find_scene_item(scene_name, source_name)
+
+    @staticmethod
+    def find_scene_items_by_source(source_name: str) -> list:
+        """
+        Finds every scene item showing the named source, in any scene.
+
+        Returns: list of obs_sceneitem_t*, does **not require release**
+
+        ##### obs API responsibilities
 
-        * Uses `find_scene_item(scene_ref, source_name: str)`, which doesn't increment the ref count
+        * Uses `SceneIndex.find_source_items`, which doesn't increment the ref count
         """
-        scene_ref = obsutil.find_scene(scene_name)
-        scene_item = obsutil.find_scene_item(scene_ref, source_name)
-        return scene_item
+        return obsutil.get_scene_index().find_source_items(source_name)
 
     class HookRate(Enum):
         HOOK_RATE_SLOW = 0.5
@@ -262,9 +284,66 @@ class obsutil:
         return "{{{posx},{posy}}}".format(posx=vec.x, posy=vec.y)
     
     @staticmethod
-    def reset_transform_and_crop(scene_item_ref, width = -1, height = -1):
+    def transform_equal(a, b) -> bool:
+        if (a.pos.x, a.pos.y, a.scale.x, a.scale.y, a.bounds.x, a.bounds.y) != (b.pos.x, b.pos.y, b.scale.x, b.scale.y, b.bounds.x, b.bounds.y):
+            return False
+        if (a.rot, a.alignment, a.bounds_type, a.bounds_alignment) != (b.rot, b.alignment, b.bounds_type, b.bounds_alignment):
+            return False
+        #crop_to_bounds only exists from OBS 30 on
+        return getattr(a, "crop_to_bounds", None) == getattr(b, "crop_to_bounds", None)
+
+    @staticmethod
+    def crop_equal(a, b) -> bool:
+        return (a.left, a.top, a.right, a.bottom) == (b.left, b.top, b.right, b.bottom)
+
+    @staticmethod
+    def apply_transforms(targets) -> int:
+        '''
+        Applies many (scene_item_ref, transform_info, crop) targets at once. Either of transform_info and crop can be None to leave it be.
+
+        Items whose transform and crop already match are skipped. The rest are set scene by scene, each scene's items all inside
+        one deferred-update section, so libobs recalculates each of them once rather than once per set call.
+
+        Returns: how many items were changed
         '''
-        Resets both the transform and the crop to required levels
+        #scene source name -> [(item, transform_info or None, crop or None)] of the items that need changing
+        by_scene = {}
+        for scene_item_ref, transform_info, crop in targets:
+            if scene_item_ref is None:
+                continue
+            if transform_info is not None:
+                current_info = obs.obs_transform_info()
+                obs.obs_sceneitem_get_info(scene_item_ref, current_info)
+                if obsutil.transform_equal(current_info, transform_info):
+                    transform_info = None
+            if crop is not None:
+                current_crop = obs.obs_sceneitem_crop()
+                obs.obs_sceneitem_get_crop(scene_item_ref, current_crop)
+                if obsutil.crop_equal(current_crop, crop):
+                    crop = None
+            if transform_info is None and crop is None:
+                continue
+            scene_name = obs.obs_source_get_name(obs.obs_scene_get_source(obs.obs_sceneitem_get_scene(scene_item_ref)))
+            by_scene.setdefault(scene_name, []).append((scene_item_ref, transform_info, crop))
+
+        changed = 0
+        for scene_name, scene_targets in by_scene.items():
+            for scene_item_ref, _, _ in scene_targets:
+                obs.obs_sceneitem_defer_update_begin(scene_item_ref)
+            for scene_item_ref, transform_info, crop in scene_targets:
+                if transform_info is not None:
+                    obs.obs_sceneitem_set_info(scene_item_ref, transform_info)
+                if crop is not None:
+                    obs.obs_sceneitem_set_crop(scene_item_ref, crop)
+            for scene_item_ref, _, _ in scene_targets:
+                obs.obs_sceneitem_defer_update_end(scene_item_ref)
+            changed += len(scene_targets)
+        return changed
+
+    @staticmethod
+    def reset_transforms_and_crops(scene_item_refs, width = -1, height = -1) -> int:
+        '''
+        Resets both the transform and the crop of every item to required levels, as one `apply_transforms` batch
         
         ---
         
@@ -278,49 +357,49 @@ class obsutil:
         Bitwise ORs:\n
         LEFT | TOP = 5\n
         TOP | CENTER = 4
+
+        Returns: how many items were changed
         '''
-        obs.script_log(obs.LOG_DEBUG, "reset_transform_and_crop")
-        transform_info = obs.obs_transform_info()
-        obs.obs_sceneitem_get_info(scene_item_ref, transform_info)
-        obs.vec2_set(transform_info.pos, 0.0, 0.0)
-        transform_info.rot = 0.0
-        transform_info.alignment = obsutil.Alignment.ALIGN_LEFT | obsutil.Alignment.ALIGN_TOP
-        if width > -1 and height > -1:
-            transform_info.scale.x  = 1.0
-            transform_info.scale.y  = 1.0
-
-        #bounds_type
-        transform_info.bounds_type = obs.OBS_BOUNDS_SCALE_INNER
-        #print("bounds type: ", str(int(transform_info.bounds_type)))
-        #bounds_alignment
-        #print("bounds alignment: ", str(transform_info.bounds_alignment))
-        transform_info.bounds_alignment = obsutil.Alignment.ALIGN_CENTER.value
-        #bounds
-        if width > -1 and height > -1:
-            transform_info.bounds.x = width
-            transform_info.bounds.y = height
-        print("bounds: ", obsutil.strvec2(transform_info.bounds))
-            
+        targets = []
+        for scene_item_ref in scene_item_refs:
+            if scene_item_ref is None:
+                continue
+            #starts from the item's own transform, so what we don't reset stays as it is
+            transform_info = obs.obs_transform_info()
+            obs.obs_sceneitem_get_info(scene_item_ref, transform_info)
+            obs.vec2_set(transform_info.pos, 0.0, 0.0)
+            transform_info.rot = 0.0
+            transform_info.alignment = obsutil.Alignment.ALIGN_LEFT | obsutil.Alignment.ALIGN_TOP
+            if width > -1 and height > -1:
+                transform_info.scale.x  = 1.0
+                transform_info.scale.y  = 1.0
+
+            #bounds_type
+            transform_info.bounds_type = obs.OBS_BOUNDS_SCALE_INNER
+            #bounds_alignment
+            transform_info.bounds_alignment = obsutil.Alignment.ALIGN_CENTER.value
+            #bounds
+            if width > -1 and height > -1:
+                transform_info.bounds.x = width
+                transform_info.bounds.y = height
+
+            crop_info = obs.obs_sceneitem_crop()
+            crop_info.left = 0
+            crop_info.right = 0
+            crop_info.top = 0
+            crop_info.bottom = 0
+            targets.append((scene_item_ref, transform_info, crop_info))
+        return obsutil.apply_transforms(targets)
+
+    @staticmethod
+    def reset_transform_and_crop(scene_item_ref, width = -1, height = -1) -> bool:
+        '''
+        Resets both the transform and the crop of one item to required levels, see `reset_transforms_and_crops`.
 
-        obs.obs_sceneitem_set_info(scene_item_ref, transform_info)
-        #print("transform.pos: ", strvec2(transform_info.pos))
-        #print("transform.rot: ", str(transform_info.rot))
-        #print("transform.alignment: ", str(transform_info.alignment))
-        print("transform_info set")
-
-        crop_info = obs.obs_sceneitem_crop()
-        obs.obs_sceneitem_get_crop(scene_item_ref, crop_info)
-        crop_info.left = 0
-        crop_info.right = 0
-        crop_info.top = 0
-        crop_info.bottom = 0
-        obs.obs_sceneitem_set_crop(scene_item_ref, crop_info)
-        print("crop_info set")
-
-        #print("crop.left: ", str(crop_info.left))
-        #print("crop.right: ", str(crop_info.right))
-        #print("crop.top: ", str(crop_info.top))
-        #print("crop.bottom: ", str(crop_info.bottom))
+        Returns: whether anything changed
+        '''
+        obs.script_log(obs.LOG_DEBUG, "reset_transform_and_crop")
+        return obsutil.reset_transforms_and_crops([scene_item_ref], width, height) > 0
 
     @staticmethod
     def config_set_base_resolution(width: int = 0, height: int = 0):
@@ -414,28 +493,82 @@ class obsutil:
         resolution = str(width)+"x"+str(height)
         obs.config_set_string(config, "AdvOut", "RecRescaleRes", resolution)
 
+    #seconds without changes before a save
+    save_delay = 2.0
+    save_pending = False
+    saves_requested = 0
+    saves = 0
+
+    @staticmethod
+    def mark_sources_dirty():
+        '''
+        Asks for the scene collection to be saved. Saving serializes every source in the collection, so rather than saving
+        on each change we save once, when there haven't been any for `save_delay` seconds (or at `flush_sources`).
+
+        ---
+
+        ##### obs API responsibilities
+
+        * Uses [timer_add](https://docs.obsproject.com/scripting#timer_add), the timer removes itself once it fires.
+        '''
+        obsutil.saves_requested += 1
+        if obsutil.save_pending:
+            #start the quiet period over
+            obs.timer_remove(obsutil.flush_sources)
+        obsutil.save_pending = True
+        obs.timer_add(obsutil.flush_sources, int(obsutil.save_delay * 1000))
+
+    @staticmethod
+    def flush_sources():
+        '''
+        Saves the scene collection now if there are unsaved changes. Called by the save timer, and should be at script_unload and on exit.
+
+        ---
+
+        ##### obs API responsibilities
+
+        * Uses [obs_frontend_save](https://docs.obsproject.com/reference-frontend-api#c.obs_frontend_save), which doesn't require release.
+        '''
+        obs.timer_remove(obsutil.flush_sources)
+        if not obsutil.save_pending:
+            return
+        obsutil.save_pending = False
+        obsutil.saves += 1
+        obs.obs_frontend_save()
+
+    @staticmethod
+    def save_metrics() -> dict:
+        return {
+            "requested": obsutil.saves_requested,
+            "saves": obsutil.saves,
+            "avoided": obsutil.saves_requested - obsutil.saves - (1 if obsutil.save_pending else 0),
+            "pending": obsutil.save_pending,
+        }
+
     @staticmethod
     def create_game_capture_source(scene_ref, source_name: str, window_name: str):
         """
         Creates a game capture style source that targets a specific application through its window's name.
 
-        Returns: obs_source_t*, does **require release**
+        Returns: obs_source_t*, does **require release**, e.g. in a `SourceRef`
 
         ---
 
         ##### obs API responsibilities
 
         * Uses [obs_source_create](https://docs.obsproject.com/reference-sources#c.obs_source_create), which **requires release**
+
+        * Uses [obs_data_create](https://docs.obsproject.com/reference-settings#c.obs_data_create), released by its `DataRef`
         """
-        settings = obs.obs_data_create()
-        obs.obs_data_set_string(settings, "capture_mode", "window")
-        obs.obs_data_set_string(settings, "window", window_name)
-        obs.obs_data_set_double(settings, "hook_rate", obsutil.HookRate.HOOK_RATE_FASTEST.value)
-
-        #Size (w, h) of the window
-        #Positional Alignment = Top Left
-        # BB Size = 1,1
-        new_source = obs.obs_source_create("game_capture", source_name, settings, None)
+        with DataRef(obs.obs_data_create()) as settings:
+            obs.obs_data_set_string(settings, "capture_mode", "window")
+            obs.obs_data_set_string(settings, "window", window_name)
+            obs.obs_data_set_double(settings, "hook_rate", obsutil.HookRate.HOOK_RATE_FASTEST.value)
+
+            #Size (w, h) of the window
+            #Positional Alignment = Top Left
+            # BB Size = 1,1
+            new_source = obs.obs_source_create("game_capture", source_name, settings, None)
         obs.obs_scene_add(scene_ref, new_source)
 
         #source_properties = obs.obs_source_properties(new_source)
@@ -445,7 +578,7 @@ class obsutil:
         #    new_source = obs.obs_source_create(None, oldskies_scene_source_name, #settings, None)
         #    obs.obs_save_sources()
         #obs.obs_properties_destroy(source_properties)
-        obs.obs_save_sources()
+        obsutil.mark_sources_dirty()
         return new_source
 
     @staticmethod
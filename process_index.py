@@ -0,0 +1,313 @@
+import itertools, time
+
+try:
+    import psutil
+except ImportError: #FakeProcessSource doesn't need it
+    psutil = None
+
+#what looking up a process that went away can raise
+PROCESS_ERRORS = (LookupError,) if psutil is None else (LookupError, psutil.Error)
+
+class ProcessSource:
+    '''
+    ProcessSource is what ProcessIndex reads processes from: `PsutilProcessSource` for the real system, `FakeProcessSource` for tests and benchmarks.
+    '''
+    def pids(self) -> list[int]:
+        raise NotImplementedError
+
+    def info(self, pid: int):
+        """
+        Returns: (name, create_time, ppid) of the process, or None if it's gone or we can't query it.
+        """
+        raise NotImplementedError
+
+    def process(self, pid: int):
+        """
+        Returns: a psutil.Process-like handle for the pid.
+        """
+        raise NotImplementedError
+
+
+class PsutilProcessSource(ProcessSource):
+    def pids(self) -> list[int]:
+        return psutil.pids()
+
+    def info(self, pid: int):
+        try:
+            proc = psutil.Process(pid)
+            with proc.oneshot():
+                return proc.name(), proc.create_time(), proc.ppid()
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return None
+
+    def process(self, pid: int):
+        return psutil.Process(pid)
+
+
+class FakeProcess:
+    def __init__(self, pid: int, name: str, create_time: float, source: "FakeProcessSource", ppid: int = 0):
+        self.pid = pid
+        self._name = name
+        self._create_time = create_time
+        self._ppid = ppid
+        self.source = source
+
+    def name(self) -> str:
+        self.source.charge()
+        return self._name
+
+    def create_time(self) -> float:
+        return self._create_time
+
+    def ppid(self) -> int:
+        return self._ppid
+
+    def children(self, recursive: bool = False) -> list:
+        '''
+        Mirrors psutil.Process.children: walks the whole process table, like psutil does.
+        '''
+        found = []
+        parents = {self.pid}
+        for proc in self.source.process_iter():
+            self.source.charge()
+            if proc._ppid in parents and proc._create_time >= self._create_time:
+                found.append(proc)
+                if recursive:
+                    parents.add(proc.pid)
+        return found
+
+    def is_running(self) -> bool:
+        proc = self.source.procs.get(self.pid)
+        return proc is not None and proc._create_time == self._create_time
+
+
+class FakeProcessSource(ProcessSource):
+    '''
+    In-memory process table. `query_cost` is spent (busy-waiting) on every per-process query,
+    standing in for the syscalls psutil makes, so benchmarks can compare strategies by how many queries they do.
+    '''
+    def __init__(self, query_cost: float = 0.0):
+        self.procs = {}
+        self.query_cost = query_cost
+        self.queries = 0
+        self.next_pid = itertools.count(1000, 4)
+        self.clock = itertools.count(1)
+
+    def charge(self):
+        self.queries += 1
+        if self.query_cost:
+            deadline = time.perf_counter() + self.query_cost
+            while time.perf_counter() < deadline:
+                pass
+
+    def spawn(self, name: str, pid: int = None, ppid: int = 0) -> FakeProcess:
+        if pid is None:
+            pid = next(self.next_pid)
+        proc = FakeProcess(pid, name, float(next(self.clock)), self, ppid)
+        self.procs[pid] = proc
+        return proc
+
+    def kill(self, pid: int):
+        self.procs.pop(pid, None)
+
+    def pids(self) -> list[int]:
+        return sorted(self.procs)
+
+    def info(self, pid: int):
+        proc = self.procs.get(pid)
+        if proc is None:
+            return None
+        self.charge()
+        return proc._name, proc._create_time, proc._ppid
+
+    def process(self, pid: int):
+        return self.procs.get(pid)
+
+    def process_iter(self):
+        '''
+        Mirrors psutil.process_iter, for comparing against the full scan.
+        '''
+        return [self.procs[pid] for pid in self.pids()]
+
+
+class ProcessIndex:
+    '''
+    ProcessIndex caches pid -> (name, create_time, ppid) for every process on the system.
+    A refresh lists the pids (one cheap call), queries only the ones that appeared since the previous snapshot and drops the ones that vanished,
+    so a lookup no longer means calling name() on every process.
+    '''
+    def __init__(self, source: ProcessSource = None):
+        self.source = source if source is not None else PsutilProcessSource()
+        #pid -> (name, create_time, ppid), (None, None, None) for processes we aren't allowed to query
+        self.procs = {}
+        #casefolded name -> set of pids
+        self.by_name = {}
+        #ppid -> set of child pids, the parent may be long gone (see ProcessTree)
+        self.children = {}
+        #pid -> (create_time, ppid) of exited processes kept as links because descendants of theirs still run
+        self.exited = {}
+        self.refreshes = 0
+
+    def refresh(self):
+        """
+        Brings the index up to date with the current process list.
+
+        Returns:
+            (added, removed): the sets of pids that appeared and vanished since the last refresh.
+        """
+        pids = set(self.source.pids())
+        known = self.procs.keys()
+        added = pids - known
+        removed = known - pids
+        #new children first, so a parent that exited in the meantime is kept as their link
+        for pid in added:
+            self.remember(pid, self.source.info(pid))
+        for pid in removed:
+            self.forget(pid)
+        self.refreshes += 1
+        return added, removed
+
+    def remember(self, pid: int, info):
+        if info is None:
+            self.procs[pid] = (None, None, None)
+            return
+        self.procs[pid] = info
+        self.by_name.setdefault(info[0].casefold(), set()).add(pid)
+        self.children.setdefault(info[2], set()).add(pid)
+
+    def forget(self, pid: int):
+        name, create_time, ppid = self.procs.pop(pid)
+        if name is None:
+            return
+        pids = self.by_name.get(name.casefold())
+        if pids is not None:
+            pids.discard(pid)
+            if not pids:
+                del self.by_name[name.casefold()]
+        if self.children.get(pid):
+            #its children still run, keep it as the link between them and its own parent
+            self.exited[pid] = (create_time, ppid)
+        else:
+            self.unlink(pid, ppid)
+
+    def unlink(self, pid: int, ppid: int):
+        """
+        Drops pid from its parent's children, and the parent too if it's an exited link that has no children left.
+        """
+        while True:
+            siblings = self.children.get(ppid)
+            if siblings is None:
+                return
+            siblings.discard(pid)
+            if siblings:
+                return
+            del self.children[ppid]
+            if ppid not in self.exited or ppid in self.procs:
+                return
+            pid, (_, ppid) = ppid, self.exited.pop(ppid)
+
+    def name(self, pid: int) -> str:
+        info = self.procs.get(pid)
+        return info[0] if info is not None else None
+
+    def create_time(self, pid: int) -> float:
+        info = self.procs.get(pid)
+        return info[1] if info is not None else None
+
+    def ppid(self, pid: int) -> int:
+        info = self.procs.get(pid)
+        return info[2] if info is not None else None
+
+    def find_exact(self, name: str) -> list[int]:
+        """
+        Returns: pids whose process name equals `name`, case-insensitively, in ascending order.
+        """
+        return sorted(self.by_name.get(name.casefold(), ()))
+
+    def find_substring(self, name: str) -> list[int]:
+        """
+        Returns: pids whose process name contains `name`, case-insensitively, in ascending order.
+        """
+        needle = name.casefold()
+        return sorted(pid for key, pids in self.by_name.items() if needle in key for pid in pids)
+
+    def process(self, pid: int):
+        """
+        Returns a process handle for an indexed pid, after checking its create time so a reused pid isn't mistaken for the one we indexed.
+        A mismatch re-queries the pid and returns None.
+        """
+        if pid not in self.procs:
+            return None
+        try:
+            proc = self.source.process(pid)
+            if proc is None:
+                raise LookupError(pid)
+            create_time = proc.create_time()
+        except PROCESS_ERRORS:
+            self.forget(pid)
+            return None
+        if self.procs[pid][1] is not None and create_time != self.procs[pid][1]:
+            self.forget(pid)
+            self.remember(pid, self.source.info(pid))
+            return None
+        return proc
+
+
+class ProcessTree:
+    '''
+    ProcessTree follows the processes descended from the ones we launched (or the Steam client that launches for us), on top of a ProcessIndex.
+    The index keeps a ppid -> children map up to date on every refresh, so a query walks only the tree, not the process table.
+    Parents that exited stay links in the tree as long as their children live, so a launcher that hands off to the game and quits
+    doesn't lose us the game, and `newest_descendant` picks up a game that relaunched itself.
+    A child only counts if it started after its parent, so a reused pid can't adopt somebody else's children.
+    '''
+    def __init__(self, index: ProcessIndex, roots: list[int] = ()):
+        self.index = index
+        #root pid -> its create time, None if it was already gone when we added it
+        self.roots = {}
+        for pid in roots:
+            self.add_root(pid)
+
+    def add_root(self, pid: int):
+        self.roots[pid] = self.index.create_time(pid)
+
+    def remove_root(self, pid: int):
+        self.roots.pop(pid, None)
+
+    def descendants(self, pid: int = None) -> list[int]:
+        """
+        Returns: the live descendants of `pid` (every root if None), oldest first. Uses the index as of its last refresh.
+        """
+        starts = self.roots.items() if pid is None else [(pid, self.roots.get(pid, self.index.create_time(pid)))]
+        #(pid, its create time, create time of whoever reused the pid since): children have to start after the first
+        #and before the second, so the new owner of a reused pid doesn't pass its children off as ours
+        stack = [self.node(root, created) for root, created in starts]
+        found = []
+        seen = set()
+        while stack:
+            parent, after, before = stack.pop()
+            for child in self.index.children.get(parent, ()):
+                exited = self.index.exited.get(child)
+                created = exited[0] if exited is not None and exited[1] == parent else self.index.create_time(child)
+                if created is not None and ((after is not None and created < after) or (before is not None and created >= before)):
+                    continue
+                if child in seen:
+                    continue
+                seen.add(child)
+                if exited is None or exited[1] != parent:
+                    found.append((created or 0.0, child))
+                stack.append(self.node(child, created))
+        found.sort()
+        return [child for _, child in found]
+
+    def node(self, pid: int, created: float):
+        current = self.index.create_time(pid)
+        return pid, created, current if created is not None and current is not None and current != created else None
+
+    def newest_descendant(self, name: str, pid: int = None) -> int:
+        """
+        Returns: the most recently started live descendant whose process name equals `name` (case-insensitively), or None.
+        """
+        name = name.casefold()
+        matches = [child for child in self.descendants(pid) if (self.index.name(child) or "").casefold() == name]
+        return matches[-1] if matches else None
@@ -1,66 +1,175 @@
-import win32gui, win32process
 import psutil, subprocess
+import threading
 import time
 import os
+from window_backend import WindowBackend, get_default_backend
+
+class PollSchedule:
+    '''
+    PollSchedule decides how long a ProcessStateMachine waits between checks in each state.
+    `intervals` maps a state to (fastest, slowest) seconds. Each state starts at its fastest interval,
+    and after `quiet_checks` uneventful checks in a row at the current interval it backs off by `backoff`, up to the slowest.
+    An anomaly (or a state change) snaps it back to the fastest interval straight away.
+    '''
+    DEFAULT_INTERVALS = {
+        'INITIALIZING': (0.0, 0.0),
+        #we want the main window the moment it shows up
+        'STARTING': (0.1, 0.1),
+        #a game that's been fine for a while only needs checking every couple of seconds, its exit still wakes us immediately
+        'RUNNING': (0.2, 2.0),
+    }
+
+    def __init__(self, intervals: dict = None, backoff: float = 1.5, quiet_checks: int = 5, default: float = 0.2):
+        self.intervals = dict(PollSchedule.DEFAULT_INTERVALS)
+        if intervals:
+            self.intervals.update(intervals)
+        self.backoff = backoff
+        self.quiet_checks = quiet_checks
+        self.default = default
+        self.state = None
+        self.current = default
+        self.quiet = 0
+
+    def bounds(self, state: str):
+        return self.intervals.get(state, (self.default, self.default))
+
+    def interval(self, state: str) -> float:
+        if state != self.state:
+            self.reset(state)
+        return self.current
+
+    def reset(self, state: str):
+        self.state = state
+        self.current = self.bounds(state)[0]
+        self.quiet = 0
+
+    def record(self, state: str, anomaly: bool = False):
+        """
+        Records the outcome of one check in `state`.
+        """
+        if anomaly or state != self.state:
+            self.reset(state)
+            return
+        self.quiet += 1
+        if self.quiet >= self.quiet_checks:
+            self.current = min(self.bounds(state)[1], self.current * self.backoff)
+            self.quiet = 0
+
 
 class ProcessStateMachine:
+    #where window state comes from, window_backend's shared default unless set
+    window_backend = None
+
     @staticmethod
-    def get_window_count(pid):
-        hwnds = 0
-
-        def callback(hwnd, extra):
-            if win32gui.IsWindowVisible(hwnd) and win32gui.IsWindowEnabled(hwnd):
-                _, found_pid = win32process.GetWindowThreadProcessId(hwnd)
-                if found_pid == pid:
-                    nonlocal hwnds
-                    hwnds = hwnds+1
-            return True
+    def get_window_backend() -> WindowBackend:
+        if ProcessStateMachine.window_backend is None:
+            return get_default_backend()
+        return ProcessStateMachine.window_backend
 
-        win32gui.EnumWindows(callback, None)
-        return hwnds
+    @staticmethod
+    def get_window_count(pid):
+        return ProcessStateMachine.get_window_backend().snapshot().count(pid)
 
     @staticmethod
     def get_main_window(pid, process_name):
-        def callback(hwnd, hwnds):
-            if win32gui.IsWindowVisible(hwnd) and win32gui.IsWindowEnabled(hwnd):
-                _, found_pid = win32process.GetWindowThreadProcessId(hwnd)
-                if found_pid == pid:
-                    hwnds.append(hwnd)
-            return True
-
-        hwnds = []
-        win32gui.EnumWindows(callback, hwnds)
-
-        for hwnd in hwnds:
-            window_name = win32gui.GetWindowText(hwnd)
+        snapshot = ProcessStateMachine.get_window_backend().snapshot()
+        for window in snapshot.windows_of(pid, visible=True, enabled=True):
+            window_name = window.title
             print(window_name)
             norm_window_name = window_name.lower().replace(" ","")
             norm_proc_name = process_name.lower().replace(" ","")
             if norm_window_name in norm_proc_name:
-                return hwnd
+                return window.hwnd
 
         return None
     
-    def __init__(self, filepath, callback = None):
+    def __init__(self, filepath, callback = None, schedule: PollSchedule = None, on_state_change = None):
         self.target = filepath
         self.process = None
         self.process_name = ""
         self.main_win_hwnd = None
         self.state = 'INITIALIZING'
         self.callback = callback
+        #called with the new state on every transition, from whatever thread steps the machine
+        self.on_state_change = on_state_change
+        #window checks still poll, on this schedule; process exit wakes us up through the exited event
+        self.schedule = schedule if schedule is not None else PollSchedule()
+        #how many checks (steps) actually ran
+        self.checks_run = 0
+        #set by a check that saw something change, so the schedule snaps back to fast polling
+        self.anomaly = False
+        self.window_count = None
+        #how long a vanished main window gets to turn into an exit before we call it a crash
+        self.crash_grace = 0.5
+        self.exited = threading.Event()
+        self.exit_time = None
+        #False when something else (e.g. ProcessSupervisor) reports the exit through on_exit()
+        self.watch_exits = True
+        #when the main window disappeared while the process lived on, None if it hasn't
+        self.window_lost_at = None
+        #how checks ask whether the process still exists, ProcessSupervisor answers it from one pid listing per tick
+        self.pid_exists = psutil.pid_exists
 
     def run(self):
-        while True:
-            if self.process and self.process.poll() is not None:
-                self.state = 'TERMINATED'
-            if (self.state == 'TERMINATED'
-            or self.state == 'ABORTED'
-            or self.state == 'CRASHED'):
-                break
-            self.state_machine()
-            time.sleep(0.2)
-        if self.callback:
-            self.callback(self.state)
+        while not self.step():
+            self.exited.wait(self.wait_time())
+
+    def step(self) -> bool:
+        """
+        Runs one check of the state machine without blocking, firing the callback once it reaches a final state.
+
+        Returns:
+            bool: True once the machine is done and shouldn't be stepped again.
+        """
+        if self.exited.is_set():
+            self.state = 'TERMINATED'
+        if (self.state == 'TERMINATED'
+        or self.state == 'ABORTED'
+        or self.state == 'CRASHED'):
+            if self.callback:
+                self.callback(self.state)
+            return True
+        state = self.state
+        self.anomaly = False
+        self.checks_run += 1
+        self.state_machine()
+        self.schedule.record(state, self.anomaly or self.state != state)
+        if self.state != state and self.on_state_change:
+            self.on_state_change(self.state)
+        return False
+
+    def wait_time(self) -> float:
+        """
+        Returns: seconds until the next step is due, cut short while a crash grace period runs out.
+        """
+        interval = self.schedule.interval(self.state)
+        if self.window_lost_at is not None:
+            return max(0.0, min(interval, self.window_lost_at + self.crash_grace - time.monotonic()))
+        return interval
+
+    def on_exit(self):
+        self.exit_time = time.monotonic()
+        self.exited.set()
+
+    def watch_exit(self):
+        """
+        Blocks a helper thread on the child (waitpid on POSIX, WaitForSingleObject on the process handle on Windows)
+        so the state machine hears about the exit as it happens instead of on its next poll.
+        """
+        def wait():
+            self.process.wait()
+            self.on_exit()
+        threading.Thread(target=wait, name="ProcessExitWatcher", daemon=True).start()
+
+    def launch(self) -> subprocess.Popen:
+        if(os.name == "nt"):
+            DETACHED_PROCESS = 0x00000008
+            CREATE_NEW_PROCESS_GROUP = 0x00000200
+            return subprocess.Popen([self.target]
+                                        , creationflags=DETACHED_PROCESS | CREATE_NEW_PROCESS_GROUP
+                                        , close_fds=True)
+        else:
+            return subprocess.Popen([self.target], preexec_fn=os.setsid)
 
     def state_machine(self):
         if self.state == 'INITIALIZING':
@@ -80,15 +189,14 @@ class ProcessStateMachine:
         if self.target is None:
             self.state = 'ABORTED'
             return
-        if(os.name == "nt"):
-            DETACHED_PROCESS = 0x00000008
-            CREATE_NEW_PROCESS_GROUP = 0x00000200
-            self.process = subprocess.Popen([self.target]
-                                        , creationflags=DETACHED_PROCESS | CREATE_NEW_PROCESS_GROUP
-                                        , close_fds=True)
-        else:
-            self.process = subprocess.Popen([self.target], preexec_fn=os.setsid)
-        self.process_name = psutil.Process(self.process.pid).name()
+        self.process = self.launch()
+        if self.watch_exits:
+            self.watch_exit()
+        try:
+            self.process_name = psutil.Process(self.process.pid).name()
+        except psutil.Error:
+            #already gone, step() will see the exit event
+            self.process_name = os.path.basename(self.target)
         self.state = 'STARTING'
 
     def starting(self):
@@ -97,10 +205,21 @@ class ProcessStateMachine:
             self.state = 'RUNNING'
 
     def running(self):
-        if not win32gui.IsWindow(self.main_win_hwnd) and psutil.pid_exists(self.process.pid):
-            time.sleep(0.5)
+        if self.window_lost_at is None:
+            snapshot = ProcessStateMachine.get_window_backend().snapshot()
+            window_count = snapshot.count(self.process.pid)
+            if self.window_count is not None and window_count != self.window_count:
+                #a dialog popping up or a window going away is when crashes happen, look closer for a while
+                self.anomaly = True
+            self.window_count = window_count
+            if not snapshot.exists(self.main_win_hwnd) and self.pid_exists(self.process.pid):
+                #give it crash_grace to exit on its own, step() turns an exit in the meantime into TERMINATED
+                self.window_lost_at = time.monotonic()
+                self.anomaly = True
+            return
+        if time.monotonic() - self.window_lost_at >= self.crash_grace:
             window_count = ProcessStateMachine.get_window_count(self.process.pid)
-            if psutil.pid_exists(self.process.pid) and window_count > 0:
+            if self.pid_exists(self.process.pid) and window_count > 0:
                 self.state = 'CRASHED'
             else:
                 self.state = 'TERMINATED'
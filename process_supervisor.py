@@ -0,0 +1,203 @@
+import asyncio, concurrent.futures, os, subprocess, threading, time
+import psutil
+from process_state_machine import ProcessStateMachine
+
+class ProcessSupervisor:
+    '''
+    ProcessSupervisor monitors many ProcessStateMachines from one thread running one asyncio loop, instead of a MonitoringThread per machine.
+    Every machine is a task stepped on a shared tick (as fast as the fastest PollSchedule interval, machines that backed off skip ticks): the window snapshot is invalidated once per tick and shared by every check in it,
+    and so is the one pid listing their pid_exists() checks are answered from.
+    A process exit wakes its task straight away: a pidfd on Linux, otherwise a waiter thread blocked on the process handle (WaitForSingleObject on Windows),
+    like ProcessStateMachine's own exit watcher. Only a process with neither falls back to a poll() per tick.
+    The machines go through the same states and fire the same callbacks as they do under MonitoringThread, only on the supervisor's thread.
+    '''
+
+    #exit_fd markers for processes without an fd: a waiter thread is blocked on it, or it gets polled every tick
+    WAITED = -2
+    POLLED = -1
+
+    class Monitored:
+        def __init__(self, fsm: ProcessStateMachine):
+            self.fsm = fsm
+            self.wake = asyncio.Event()
+            #monotonic time the next step is due
+            self.due = 0.0
+            self.exit_fd = None
+
+    def __init__(self, tick_interval: float = 0.1):
+        self.tick_interval = tick_interval
+        self.loop = None
+        self.thread = None
+        self.ready = threading.Event()
+        self.monitored = {}
+        #pids alive as of this tick, listed on the first check that asks
+        self.pids = None
+        #how many times the loop thread woke up (ticks and exit notifications), how many steps it ran, and how many times it listed pids
+        self.wakeups = 0
+        self.steps = 0
+        self.pid_listings = 0
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.ready.clear()
+        self.thread = threading.Thread(target=self.run, name="ProcessSupervisor", daemon=True)
+        self.thread.start()
+        self.ready.wait()
+
+    def stop(self):
+        """
+        Stops the loop, abandoning any machine still being monitored (its future gets cancelled).
+        """
+        if self.thread is None:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.thread = None
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.create_task(self.tick_loop())
+        self.loop.call_soon(self.ready.set)
+        try:
+            self.loop.run_forever()
+        finally:
+            pending = asyncio.all_tasks(self.loop)
+            for task in pending:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self.loop.close()
+
+    def add(self, fsm: ProcessStateMachine) -> concurrent.futures.Future:
+        """
+        Starts monitoring `fsm`, can be called from any thread.
+
+        Returns:
+            concurrent.futures.Future: resolves to the machine's final state, after its callback ran.
+        """
+        return asyncio.run_coroutine_threadsafe(self.monitor(fsm), self.loop)
+
+    def exit_fd(self, process):
+        """
+        Returns: an fd that turns readable when `process` exits, which the supervisor closes when it's done with it,
+        or None to wait on the process from a thread instead.
+        """
+        if isinstance(process, subprocess.Popen) and hasattr(os, "pidfd_open"):
+            try:
+                return os.pidfd_open(process.pid)
+            except OSError: #gone already, or a kernel without pidfds
+                return None
+        return None
+
+    async def monitor(self, fsm: ProcessStateMachine) -> str:
+        #we report exits through on_exit(), no waiter thread per process
+        fsm.watch_exits = False
+        fsm.pid_exists = self.pid_exists
+        monitored = ProcessSupervisor.Monitored(fsm)
+        self.monitored[fsm] = monitored
+        try:
+            while True:
+                self.steps += 1
+                if fsm.step():
+                    return fsm.state
+                if monitored.exit_fd is None and fsm.process is not None:
+                    self.watch_exit(monitored)
+                monitored.due = time.monotonic() + fsm.wait_time()
+                monitored.wake.clear()
+                await monitored.wake.wait()
+        finally:
+            del self.monitored[fsm]
+            self.unwatch_exit(monitored)
+
+    def watch_exit(self, monitored: "ProcessSupervisor.Monitored"):
+        fd = self.exit_fd(monitored.fsm.process)
+        if fd is None:
+            self.wait_exit(monitored)
+            return
+
+        def exited():
+            self.wakeups += 1
+            self.loop.remove_reader(fd)
+            monitored.fsm.on_exit()
+            monitored.wake.set()
+        monitored.exit_fd = fd
+        self.loop.add_reader(fd, exited)
+
+    def wait_exit(self, monitored: "ProcessSupervisor.Monitored"):
+        """
+        Blocks a daemon thread in `process.wait()` and hands the exit back to the loop, for processes without an exit fd.
+        Not an executor: its threads are joined at interpreter exit, which would hang OBS on a game that's still running.
+        """
+        process = monitored.fsm.process
+        if not hasattr(process, "wait"):
+            monitored.exit_fd = ProcessSupervisor.POLLED
+            return
+
+        def exited():
+            #the machine may have finished, or been handed a new process, while we waited
+            if monitored.exit_fd != ProcessSupervisor.WAITED or monitored.fsm.process is not process:
+                return
+            self.wakeups += 1
+            monitored.fsm.on_exit()
+            monitored.wake.set()
+
+        def wait():
+            try:
+                process.wait()
+            except (OSError, psutil.Error):
+                pass
+            try:
+                self.loop.call_soon_threadsafe(exited)
+            except RuntimeError: #the supervisor stopped while we waited
+                pass
+        monitored.exit_fd = ProcessSupervisor.WAITED
+        threading.Thread(target=wait, name="ProcessExitWatcher", daemon=True).start()
+
+    def unwatch_exit(self, monitored: "ProcessSupervisor.Monitored"):
+        if monitored.exit_fd is not None and monitored.exit_fd >= 0:
+            self.loop.remove_reader(monitored.exit_fd)
+            os.close(monitored.exit_fd)
+        monitored.exit_fd = None
+
+    def pid_exists(self, pid: int) -> bool:
+        """
+        psutil.pid_exists for the machines we step, answered from one pid listing per tick however many of them ask.
+        """
+        if self.pids is None:
+            self.pid_listings += 1
+            self.pids = set(psutil.pids())
+        return pid in self.pids
+
+    def poll_exit(self, process) -> bool:
+        """
+        The last resort for a process we can neither wait on nor get an exit fd for.
+
+        Returns: whether it exited, from its poll() if it has one, else from this tick's pid listing.
+        """
+        poll = getattr(process, "poll", None)
+        if poll is not None:
+            return poll() is not None
+        return not self.pid_exists(process.pid)
+
+    async def tick_loop(self):
+        while True:
+            await asyncio.sleep(self.tick_interval)
+            self.wakeups += 1
+            #one window walk per tick, shared by every machine stepped in it
+            ProcessStateMachine.get_window_backend().invalidate()
+            self.pids = None
+            now = time.monotonic()
+            for monitored in self.monitored.values():
+                fsm = monitored.fsm
+                try:
+                    exited = monitored.exit_fd == ProcessSupervisor.POLLED and not fsm.exited.is_set() and self.poll_exit(fsm.process)
+                except Exception as e: #one bad process mustn't stop the ticks of every other machine
+                    print(f"Error checking {fsm.target}: {e}")
+                    exited = False
+                if exited:
+                    fsm.on_exit()
+                    monitored.wake.set()
+                #steps land a little after the tick that woke them, so half a tick of slack keeps them on the tick they asked for
+                elif monitored.due <= now + self.tick_interval / 2:
+                    monitored.wake.set()
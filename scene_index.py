@@ -0,0 +1,294 @@
+import obspython as obs
+from obs_refs import SourceList, SceneItemList
+
+class SceneIndex:
+    '''
+    SceneIndex maps scene names to scenes, and a scene's source names to its scene items, so `obsutil.find_scene` and
+    `obsutil.find_scene_item` are dictionary lookups rather than walks over `obs_frontend_get_scenes()` and `obs_scene_enum_items()`.
+
+    It's built once with `build()` and kept current from libobs' global `source_create`, `source_remove`, `source_destroy` and
+    `source_rename` signals and each scene's `item_add` / `item_remove`. Loading a scene collection adds items without signalling,
+    so the frontend's collection events have to `invalidate()` it; the next lookup rebuilds. Duplicating a scene doesn't signal its items
+    either, so a scene created after the build has its items enumerated once, on the first lookup in it.
+
+    It holds no references: a scene is dropped when it's removed, an item when it's removed from its scene.
+    With `debug` on, every lookup is checked against a linear scan and mismatches are logged; `verify()` checks the whole index.
+    '''
+    def __init__(self):
+        #scene name -> the scene's obs_source_t*
+        self.scenes = {}
+        #scene name -> source name -> {item id: obs_sceneitem_t*}, in the order they were added
+        self.items = {}
+        #scenes created since the build, whose items we haven't enumerated yet
+        self.unscanned = set()
+        self.built = False
+        self.attached = False
+        self.debug = False
+        self.builds = 0
+        self.hits = 0
+        self.misses = 0
+        self.mismatches = 0
+        #obspython matches callbacks by identity when disconnecting, and every `self.method` access is a new bound method
+        self.source_created_callback = self.on_source_created
+        self.source_removed_callback = self.on_source_removed
+        self.source_renamed_callback = self.on_source_renamed
+        self.item_added_callback = self.on_item_added
+        self.item_removed_callback = self.on_item_removed
+
+    @staticmethod
+    def is_scene(source_ref) -> bool:
+        #groups are scene-type sources as well, but obs_scene_from_source doesn't take them
+        return source_ref is not None and obs.obs_source_get_type(source_ref) == obs.OBS_SOURCE_TYPE_SCENE and obs.obs_source_get_id(source_ref) == "scene"
+
+    @staticmethod
+    def item_key(scene_item_ref):
+        """
+        Returns: (scene name, source name, item id) of the scene item.
+        """
+        scene_source_ref = obs.obs_scene_get_source(obs.obs_sceneitem_get_scene(scene_item_ref))
+        source_ref = obs.obs_sceneitem_get_source(scene_item_ref)
+        return obs.obs_source_get_name(scene_source_ref), obs.obs_source_get_name(source_ref), obs.obs_sceneitem_get_id(scene_item_ref)
+
+    def attach(self):
+        """
+        Connects the global source signals. The per-scene item signals are connected as scenes get indexed.
+        """
+        if self.attached:
+            return
+        gsh = obs.obs_get_signal_handler()
+        obs.signal_handler_connect(gsh, "source_create", self.source_created_callback)
+        obs.signal_handler_connect(gsh, "source_remove", self.source_removed_callback)
+        obs.signal_handler_connect(gsh, "source_destroy", self.source_removed_callback)
+        obs.signal_handler_connect(gsh, "source_rename", self.source_renamed_callback)
+        self.attached = True
+
+    def detach(self):
+        if self.attached:
+            gsh = obs.obs_get_signal_handler()
+            obs.signal_handler_disconnect(gsh, "source_create", self.source_created_callback)
+            obs.signal_handler_disconnect(gsh, "source_remove", self.source_removed_callback)
+            obs.signal_handler_disconnect(gsh, "source_destroy", self.source_removed_callback)
+            obs.signal_handler_disconnect(gsh, "source_rename", self.source_renamed_callback)
+            self.attached = False
+        self.clear()
+
+    def clear(self):
+        for scene_source_ref in self.scenes.values():
+            self.disconnect_scene(scene_source_ref)
+        self.scenes.clear()
+        self.items.clear()
+        self.unscanned.clear()
+        self.built = False
+
+    def invalidate(self):
+        """
+        Drops everything; the next lookup rebuilds from the frontend's scene list.
+        """
+        self.clear()
+
+    def build(self):
+        '''
+        Indexes every scene of the current collection and their items, one walk.
+        '''
+        self.clear()
+        self.attach()
+        with SourceList(obs.obs_frontend_get_scenes()) as scenes:
+            for scene_source_ref in scenes:
+                self.add_scene(scene_source_ref)
+                with SceneItemList(obs.obs_scene_enum_items(obs.obs_scene_from_source(scene_source_ref))) as scene_items:
+                    for scene_item_ref in scene_items:
+                        self.add_item(scene_item_ref)
+        self.built = True
+        self.builds += 1
+
+    def ensure_built(self):
+        if not self.built:
+            self.build()
+
+    def add_scene(self, scene_source_ref):
+        name = obs.obs_source_get_name(scene_source_ref)
+        if name in self.scenes:
+            return
+        self.scenes[name] = scene_source_ref
+        self.items.setdefault(name, {})
+        sh = obs.obs_source_get_signal_handler(scene_source_ref)
+        obs.signal_handler_connect(sh, "item_add", self.item_added_callback)
+        obs.signal_handler_connect(sh, "item_remove", self.item_removed_callback)
+
+    def scan_scene(self, scene_name: str):
+        self.unscanned.discard(scene_name)
+        by_source = self.items[scene_name] = {}
+        with SceneItemList(obs.obs_scene_enum_items(obs.obs_scene_from_source(self.scenes[scene_name]))) as scene_items:
+            for scene_item_ref in scene_items:
+                source_name = obs.obs_source_get_name(obs.obs_sceneitem_get_source(scene_item_ref))
+                by_source.setdefault(source_name, {})[obs.obs_sceneitem_get_id(scene_item_ref)] = scene_item_ref
+
+    def disconnect_scene(self, scene_source_ref):
+        sh = obs.obs_source_get_signal_handler(scene_source_ref)
+        obs.signal_handler_disconnect(sh, "item_add", self.item_added_callback)
+        obs.signal_handler_disconnect(sh, "item_remove", self.item_removed_callback)
+
+    def add_item(self, scene_item_ref):
+        scene_name, source_name, item_id = SceneIndex.item_key(scene_item_ref)
+        self.items.setdefault(scene_name, {}).setdefault(source_name, {})[item_id] = scene_item_ref
+
+    def remove_item(self, scene_item_ref):
+        scene_name, source_name, item_id = SceneIndex.item_key(scene_item_ref)
+        by_source = self.items.get(scene_name)
+        if by_source is None or source_name not in by_source:
+            return
+        by_source[source_name].pop(item_id, None)
+        if not by_source[source_name]:
+            del by_source[source_name]
+
+    def on_source_created(self, calldata):
+        source_ref = obs.calldata_source(calldata, "source")
+        if self.built and SceneIndex.is_scene(source_ref):
+            self.add_scene(source_ref)
+            self.unscanned.add(obs.obs_source_get_name(source_ref))
+
+    def on_source_removed(self, calldata):
+        source_ref = obs.calldata_source(calldata, "source")
+        if not self.built or not SceneIndex.is_scene(source_ref):
+            return
+        name = obs.obs_source_get_name(source_ref)
+        #the scene by that name may already be a new one, if this is the old one's destroy
+        if name in self.scenes and self.scenes[name] == source_ref:
+            self.disconnect_scene(self.scenes.pop(name))
+            self.items.pop(name, None)
+            self.unscanned.discard(name)
+
+    def on_source_renamed(self, calldata):
+        if not self.built:
+            return
+        prev_name = obs.calldata_string(calldata, "prev_name")
+        new_name = obs.calldata_string(calldata, "new_name")
+        if prev_name in self.scenes:
+            self.scenes[new_name] = self.scenes.pop(prev_name)
+            self.items[new_name] = self.items.pop(prev_name, {})
+            if prev_name in self.unscanned:
+                self.unscanned.discard(prev_name)
+                self.unscanned.add(new_name)
+        #names are unique across sources, so any item named prev_name is an item of this source
+        for by_source in self.items.values():
+            if prev_name in by_source:
+                by_source[new_name] = by_source.pop(prev_name)
+
+    def on_item_added(self, calldata):
+        if self.built:
+            self.add_item(obs.calldata_sceneitem(calldata, "item"))
+
+    def on_item_removed(self, calldata):
+        if self.built:
+            self.remove_item(obs.calldata_sceneitem(calldata, "item"))
+
+    def find_scene_source(self, scene_name: str):
+        """
+        Returns: obs_source_t* of the scene, does **not require release**. None if there's no such scene.
+        """
+        self.ensure_built()
+        scene_source_ref = self.scenes.get(scene_name)
+        if scene_source_ref is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        if self.debug:
+            self.check_scene(scene_name, scene_source_ref)
+        return scene_source_ref
+
+    def find_scene_item(self, scene_name: str, source_name: str):
+        """
+        Returns: obs_sceneitem_t* of the first item in the scene showing the named source, does **not require release**. None if there isn't one.
+        """
+        self.ensure_built()
+        if scene_name in self.unscanned:
+            self.scan_scene(scene_name)
+        by_id = self.items.get(scene_name, {}).get(source_name)
+        scene_item_ref = next(iter(by_id.values())) if by_id else None
+        if scene_item_ref is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        if self.debug:
+            self.check_scene_item(scene_name, source_name, scene_item_ref)
+        return scene_item_ref
+
+    def find_source_items(self, source_name: str) -> list:
+        """
+        Returns: obs_sceneitem_t* of every item showing the named source, across all scenes, does **not require release**.
+        """
+        self.ensure_built()
+        for scene_name in list(self.unscanned):
+            self.scan_scene(scene_name)
+        found = []
+        for by_source in self.items.values():
+            found.extend(by_source.get(source_name, {}).values())
+        return found
+
+    @staticmethod
+    def scan() -> dict:
+        '''
+        Walks the frontend's scenes and their items the slow way, what the index is checked against.
+
+        Returns: scene name -> source name -> sorted item ids
+        '''
+        found = {}
+        with SourceList(obs.obs_frontend_get_scenes()) as scenes:
+            for scene_source_ref in scenes:
+                by_source = found.setdefault(obs.obs_source_get_name(scene_source_ref), {})
+                with SceneItemList(obs.obs_scene_enum_items(obs.obs_scene_from_source(scene_source_ref))) as scene_items:
+                    for scene_item_ref in scene_items:
+                        source_name = obs.obs_source_get_name(obs.obs_sceneitem_get_source(scene_item_ref))
+                        by_source.setdefault(source_name, []).append(obs.obs_sceneitem_get_id(scene_item_ref))
+        for by_source in found.values():
+            for ids in by_source.values():
+                ids.sort()
+        return found
+
+    def verify(self) -> list[str]:
+        '''
+        Compares the whole index against a linear scan. Meant for debug mode; it's as slow as the lookups the index replaces.
+
+        Returns: a description of every difference, empty if the index is consistent.
+        '''
+        self.ensure_built()
+        for scene_name in list(self.unscanned):
+            self.scan_scene(scene_name)
+        problems = []
+        found = SceneIndex.scan()
+        for scene_name in found.keys() - self.scenes.keys():
+            problems.append("scene {} isn't indexed".format(scene_name))
+        for scene_name in self.scenes.keys() - found.keys():
+            problems.append("scene {} is indexed but doesn't exist".format(scene_name))
+        for scene_name in found.keys() & self.scenes.keys():
+            indexed = {source_name: sorted(by_id) for source_name, by_id in self.items.get(scene_name, {}).items()}
+            for source_name in found[scene_name].keys() | indexed.keys():
+                if found[scene_name].get(source_name) != indexed.get(source_name):
+                    problems.append("scene {} source {}: items {} indexed as {}".format(scene_name, source_name, found[scene_name].get(source_name), indexed.get(source_name)))
+        return problems
+
+    def check_scene(self, scene_name: str, scene_source_ref):
+        exists = scene_name in SceneIndex.scan()
+        if exists != (scene_source_ref is not None):
+            self.mismatch("scene {} {} but the index says otherwise".format(scene_name, "exists" if exists else "doesn't exist"))
+
+    def check_scene_item(self, scene_name: str, source_name: str, scene_item_ref):
+        ids = SceneIndex.scan().get(scene_name, {}).get(source_name, [])
+        if scene_item_ref is None and ids:
+            self.mismatch("scene {} has {} but the index missed it".format(scene_name, source_name))
+        elif scene_item_ref is not None and obs.obs_sceneitem_get_id(scene_item_ref) not in ids:
+            self.mismatch("scene {} has no {} item {}, the index is stale".format(scene_name, source_name, obs.obs_sceneitem_get_id(scene_item_ref)))
+
+    def mismatch(self, msg: str):
+        self.mismatches += 1
+        obs.script_log(obs.LOG_WARNING, "scene index: " + msg)
+
+    def metrics(self) -> dict:
+        return {
+            "scenes": len(self.scenes),
+            "items": sum(len(by_id) for by_source in self.items.values() for by_id in by_source.values()),
+            "builds": self.builds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "mismatches": self.mismatches,
+        }
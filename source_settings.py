@@ -0,0 +1,112 @@
+import obspython as obs
+from obs_refs import DataRef
+
+class SourceSettings:
+    '''
+    SourceSettings applies settings to sources only when they'd change something. Every obs_source_update makes the source reload,
+    which for a game capture can mean unhooking and rehooking the game, so `apply()` compares the values it's given against a cache
+    of the source's current ones and sends one obs_source_update with just the keys that differ, or nothing at all.
+
+    The cache is filled from obs_source_get_settings the first time a key is asked about, and a source's entry is dropped whenever
+    libobs' global `source_update` signal says it was updated (by us, by the properties dialog or by another script), renamed or destroyed.
+    '''
+    def __init__(self):
+        #source name -> {key: value}, of the keys we've been asked to apply
+        self.cache = {}
+        self.attached = False
+        self.applied = 0
+        self.skipped = 0
+        self.keys_written = 0
+        self.reads = 0
+        #obspython matches callbacks by identity when disconnecting
+        self.source_changed_callback = self.on_source_changed
+
+    def attach(self):
+        if self.attached:
+            return
+        gsh = obs.obs_get_signal_handler()
+        obs.signal_handler_connect(gsh, "source_update", self.source_changed_callback)
+        obs.signal_handler_connect(gsh, "source_rename", self.source_changed_callback)
+        obs.signal_handler_connect(gsh, "source_destroy", self.source_changed_callback)
+        self.attached = True
+
+    def detach(self):
+        if self.attached:
+            gsh = obs.obs_get_signal_handler()
+            obs.signal_handler_disconnect(gsh, "source_update", self.source_changed_callback)
+            obs.signal_handler_disconnect(gsh, "source_rename", self.source_changed_callback)
+            obs.signal_handler_disconnect(gsh, "source_destroy", self.source_changed_callback)
+            self.attached = False
+        self.cache.clear()
+
+    def on_source_changed(self, calldata):
+        source_ref = obs.calldata_source(calldata, "source")
+        #renames have the source under its new name already
+        self.cache.pop(obs.calldata_string(calldata, "prev_name") or obs.obs_source_get_name(source_ref), None)
+
+    @staticmethod
+    def get_value(settings, key: str, like):
+        #bool before int, a bool is an int too
+        if isinstance(like, bool):
+            return obs.obs_data_get_bool(settings, key)
+        if isinstance(like, int):
+            return obs.obs_data_get_int(settings, key)
+        if isinstance(like, float):
+            return obs.obs_data_get_double(settings, key)
+        return obs.obs_data_get_string(settings, key)
+
+    @staticmethod
+    def set_value(settings, key: str, value):
+        if isinstance(value, bool):
+            obs.obs_data_set_bool(settings, key, value)
+        elif isinstance(value, int):
+            obs.obs_data_set_int(settings, key, value)
+        elif isinstance(value, float):
+            obs.obs_data_set_double(settings, key, value)
+        else:
+            obs.obs_data_set_string(settings, key, value)
+
+    def current(self, source_ref, name: str, values: dict) -> dict:
+        """
+        Returns: the cached current values of the source, read from it for any of `values`' keys that aren't cached yet.
+        """
+        current = self.cache.setdefault(name, {})
+        missing = [key for key in values if key not in current]
+        if missing:
+            self.reads += 1
+            with DataRef(obs.obs_source_get_settings(source_ref)) as settings:
+                for key in missing:
+                    current[key] = SourceSettings.get_value(settings, key, values[key])
+        return current
+
+    def apply(self, source_ref, values: dict) -> bool:
+        '''
+        Sets the values (str, int, float or bool, by key) on the source, in a single obs_source_update of the ones that differ.
+
+        Returns: whether the source was updated
+        '''
+        if source_ref is None:
+            return False
+        self.attach()
+        name = obs.obs_source_get_name(source_ref)
+        changed = {key: value for key, value in values.items() if self.current(source_ref, name, values).get(key) != value}
+        if not changed:
+            self.skipped += 1
+            return False
+        with DataRef(obs.obs_data_create()) as settings:
+            for key, value in changed.items():
+                SourceSettings.set_value(settings, key, value)
+            obs.obs_source_update(source_ref, settings)
+        self.applied += 1
+        self.keys_written += len(changed)
+        #the update's source_update may already have dropped the entry, it's these values either way
+        self.cache.setdefault(name, {}).update(changed)
+        return True
+
+    def metrics(self) -> dict:
+        return {
+            "applied": self.applied,
+            "skipped": self.skipped,
+            "keys_written": self.keys_written,
+            "reads": self.reads,
+        }
@@ -1,10 +1,150 @@
-import os, re, winreg
+import os, re, sys, json, mmap, struct, argparse, threading
+from collections import deque
+
+try:
+    import winreg
+except ImportError: #not on Windows, registry lookups will just fail
+    winreg = None
+
+
+class vdf:
+    '''
+    vdf is a namespace for a tokenizing parser of Valve's text KeyValues format (`.vdf`, `.acf`).
+    It handles quoted and bare strings, escape sequences, `//` comments, `[$CONDITION]` tags and nested blocks.
+    '''
+
+    token_re = re.compile(r'''
+          "([^"\\]*(?:\\.[^"\\]*)*)"      # 1: quoted string
+        | ([{}])                          # 2: block open/close
+        | //[^\n]* | \[[^\]\n]*\]        # comment or conditional tag, skipped
+        | ([^\s{}"\[\]]+)                 # 3: bare string
+        | (\S)                            # 4: anything else is an error
+        ''', re.VERBOSE | re.DOTALL)
+
+    STRING, OPEN, CLOSE = 1, 2, 3
+
+    escapes = {"n": "\n", "t": "\t", "\\": "\\", "\"": "\""}
+    escape_re = re.compile(r'\\(.)', re.DOTALL)
+
+    @staticmethod
+    def unescape(value: str) -> str:
+        if "\\" not in value:
+            return value
+        return vdf.escape_re.sub(lambda m: vdf.escapes.get(m.group(1), m.group(0)), value)
+
+    @staticmethod
+    def tokenize(text: str):
+        """
+        Yields (kind, value) tokens of `text`, kind being `vdf.STRING`, `vdf.OPEN` or `vdf.CLOSE`.
+        Raises ValueError on input that can't be tokenized, e.g. an unterminated quote.
+        """
+        for m in vdf.token_re.finditer(text):
+            group = m.lastindex
+            if group == 1:
+                yield vdf.STRING, vdf.unescape(m.group(1))
+            elif group == 3:
+                yield vdf.STRING, m.group(3)
+            elif group == 2:
+                yield (vdf.OPEN, "{") if m.group(2) == "{" else (vdf.CLOSE, "}")
+            elif group == 4:
+                raise ValueError(f"Invalid VDF token at offset {m.start()}")
+
+    @staticmethod
+    def loads(text: str) -> dict:
+        """
+        Parses a whole VDF document.
+
+        Returns:
+            dict: nested dicts for blocks, strings for values. A repeated key keeps its last value.
+        """
+        root = {}
+        stack = [root]
+        key = None
+        for kind, token in vdf.tokenize(text):
+            if kind == vdf.OPEN:
+                if key is None:
+                    raise ValueError("VDF block without a key")
+                block = {}
+                stack[-1][key] = block
+                stack.append(block)
+                key = None
+            elif kind == vdf.CLOSE:
+                if key is not None or len(stack) == 1:
+                    raise ValueError("Unbalanced VDF block")
+                stack.pop()
+            elif key is None:
+                key = token
+            else:
+                stack[-1][key] = token
+                key = None
+        if key is not None or len(stack) != 1:
+            raise ValueError("Unexpected end of VDF document")
+        return root
+
+    @staticmethod
+    def read_text(path: str) -> str:
+        with open(path, 'r', encoding='utf-8', errors='replace') as file:
+            return file.read()
+
+    @staticmethod
+    def load(path: str) -> dict:
+        return vdf.loads(vdf.read_text(path))
+
+    @staticmethod
+    def find_keys(text: str, keys, depth: int = 1) -> dict:
+        """
+        Lazily scans `text` for the string values of `keys` at the given block depth
+        (1 being the children of the root block, e.g. `"AppState" { "name" ... }`), and stops tokenizing as soon as all of them were found.
+
+        Returns:
+            dict: key -> value for the keys that were found.
+        """
+        wanted = set(keys)
+        found = {}
+        level = 0
+        key = None
+        #inlined tokenizer, this is the hot path when indexing thousands of manifests
+        for m in vdf.token_re.finditer(text):
+            group = m.lastindex
+            if group == 1 or group == 3:
+                value = vdf.unescape(m.group(1)) if group == 1 else m.group(3)
+                if key is None:
+                    key = value
+                    continue
+                if level == depth and key in wanted and key not in found:
+                    found[key] = value
+                    if len(found) == len(wanted):
+                        break
+                key = None
+            elif group == 2:
+                level += 1 if m.group(2) == "{" else -1
+                key = None
+            elif group == 4:
+                raise ValueError(f"Invalid VDF token at offset {m.start()}")
+        return found
+
+    @staticmethod
+    def read_keys(path: str, keys, depth: int = 1) -> dict:
+        return vdf.find_keys(vdf.read_text(path), keys, depth)
+
 
 class steamutil:
     '''
     steamutil has helper functions that give us info for installed games, either based on name or steamGameID
     '''
 
+    registry = None
+
+    @staticmethod
+    def get_registry():
+        """
+        Returns the `RegistryBackend` steamutil reads from: `WinRegBackend` on Windows, an empty `MemoryRegistryBackend` elsewhere,
+        unless one was assigned to `steamutil.registry`.
+        """
+        if steamutil.registry is None:
+            steamutil.registry = WinRegBackend() if winreg is not None else MemoryRegistryBackend()
+        return steamutil.registry
+
     @staticmethod
     def get_steam_install_path()->str:
         """
@@ -14,34 +154,26 @@ class steamutil:
             string: Steam's install path
         """
         try:
-            key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, r'Software\Valve\Steam')
-            steam_path, _ = winreg.QueryValueEx(key, 'SteamPath')
-            winreg.CloseKey(key)
-            return steam_path
-        except Exception as e:
+            return steamutil.get_registry().get_steam_path()
+        except OSError as e:
             print(f"Error accessing registry: {e}")
             return None
-        
+
+    app_name_index = None
+
     @staticmethod
     def get_app_id_by_name(game_name):
-        steam_apps_key = r'Software\Valve\Steam\Apps'
-        
+        """
+        Resolves a game's name, case-insensitively, to its app_id through the cached `AppNameIndex`.
+
+        Returns:
+            string: the app_id or None
+        """
+        registry = steamutil.get_registry()
+        if steamutil.app_name_index is None or steamutil.app_name_index.registry is not registry:
+            steamutil.app_name_index = AppNameIndex(registry)
         try:
-            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, steam_apps_key) as key:
-                subkey_count = winreg.QueryInfoKey(key)[0]
-                index = 0
-                for index in range(subkey_count):
-                    try:
-                        subkey_name = winreg.EnumKey(key, index)
-                        subkey_path = f"{steam_apps_key}\\{subkey_name}"
-                        
-                        with winreg.OpenKey(winreg.HKEY_CURRENT_USER, subkey_path) as subkey:
-                            value_name, _ = winreg.QueryValueEx(subkey, 'Name')
-                            if value_name.lower() == game_name.lower():
-                                return subkey_name  # The subkey name is the app_id
-                            
-                    except OSError:
-                        continue
+            return steamutil.app_name_index.get(game_name)
         except OSError as e:
             print(f"Error accessing registry: {e}")
             return None
@@ -63,11 +195,25 @@ class steamutil:
         library_paths = [os.path.normpath(steam_path).lower()]
 
         if os.path.exists(library_folders_file):
-            with open(library_folders_file, 'r') as file:
-                content = file.read()
-                matches = re.findall(r'^\s*"path"\s*"(.+)"', content, re.MULTILINE)
-                for match in matches:
-                    norm_path = os.path.normpath(match).lower()
+            try:
+                folders = vdf.load(library_folders_file)
+            except (OSError, ValueError) as e:
+                print(f"Error reading {library_folders_file}: {e}")
+                folders = {}
+            for root in folders.values():
+                if not isinstance(root, dict):
+                    continue
+                for key, folder in root.items():
+                    #current format is "0" { "path" "..." }, older Steam versions wrote "1" "path"
+                    if isinstance(folder, dict):
+                        path = folder.get("path")
+                    elif key.isdigit():
+                        path = folder
+                    else:
+                        continue
+                    if not path:
+                        continue
+                    norm_path = os.path.normpath(path).lower()
                     if norm_path not in library_paths:
                         library_paths.append(norm_path)
         return library_paths
@@ -75,49 +221,38 @@ class steamutil:
     @staticmethod
     def get_game_install_dir_by_appid(app_id: str)->str:
         """
-        Searches for app_manifests in the paths Steam uses to install games in(`{install_prefixes}`) and looks for the one whose app_id matches the parameter.
+        Looks up the game with the given app_id in the library index (see `SteamLibraryIndex`).
         The manifest contains the name of its install folder within the `{install_prefix}/common/`
 
         Returns: 
             string: returns the path the game with the given app_id is installed in.
         """
-        steam_path = steamutil.get_steam_install_path()
-        install_prefixes = steamutil.get_all_game_install_prefix_dirs(steam_path)
-        
-        for lib_path in install_prefixes:
-            lib_path = os.path.join(lib_path, 'steamapps')
-            potential_app_manifest = os.path.join(lib_path, "appmanifest_{id}.acf".format(id=app_id))
-            if os.path.exists(potential_app_manifest):
-                content = ""
-                with open(potential_app_manifest, 'r') as file:
-                    content = file.read()
-                if(content == ""):
-                    return None
-                installdir_match = re.search(r'"installdir"\s*"(.*?)"', content)
-                if installdir_match:
-                    game_sub_dir = installdir_match.group(1)
-                    game_install_dir = os.path.join(lib_path, 'common', game_sub_dir)
-                    return game_install_dir
-        return None
+        info = steamutil.get_library_index().get_by_appid(app_id)
+        if info is None:
+            return None
+        return info["install_dir"]
     
+    manifest_keys = ("name", "installdir", "buildid", "StateFlags")
+
     @staticmethod
-    def get_install_dir(potential_app_manifest):
+    def read_manifest(app_manifest: str) -> dict:
+        """
+        Reads an `appmanifest_*.acf` once, stopping as soon as all of `steamutil.manifest_keys` were found.
+
+        Returns:
+            dict: the subset of `steamutil.manifest_keys` present in the manifest, empty if it can't be read.
+        """
         try:
-            game_name = ""
-            install_dir = ""
-            with open(potential_app_manifest, 'r') as file:
-                for line in file:
-                    if line.strip():  # Check if the line is not empty
-                        if game_name is not None:
-                            name_match = re.search(r'"name"\s*"(.*?)"', line)
-                            if(name_match):
-                                game_name = name_match.group(1)
-                        installdir_match = re.search(r'"installdir"\s*"(.*?)"', line)
-                        if installdir_match:
-                            return [game_name, installdir_match.group(1)]
-                return ["", ""]
-        except FileNotFoundError:
+            return vdf.read_keys(app_manifest, steamutil.manifest_keys)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def get_install_dir(potential_app_manifest):
+        manifest = steamutil.read_manifest(potential_app_manifest)
+        if "installdir" not in manifest:
             return ["", ""]
+        return [manifest.get("name", ""), manifest["installdir"]]
     
     @staticmethod
     def get_game_install_dir_by_name_fast(name: str)->str:
@@ -139,58 +274,1012 @@ class steamutil:
         return None
 
     @staticmethod
-    def get_game_install_dir_by_name(name:str)->str:
-        steam_path = steamutil.get_steam_install_path()
-        install_prefixes = steamutil.get_all_game_install_prefix_dirs(steam_path)
+    def get_game_install_dir_by_name(name:str, parallel: bool = False)->str:
+        info = steamutil.get_game_info_by_name(name, parallel)
+        if info is None:
+            return None
+        return info["install_dir"]
 
-        for lib_path in install_prefixes:
-            lib_path = os.path.join(lib_path, 'steamapps')
-
-            for dentry in os.listdir(lib_path):
-                if dentry.endswith(".acf"): #listdir gives back filenames, not filepaths, so we can't use os.path.isfile
-                    #app_id = dentry.replace("appmanifest_","").replace(".acf","")
-                    inst_dir = steamutil.get_install_dir(os.path.join(lib_path, dentry))
-                    if(inst_dir[0] == name):
-                        inst_dir[1] = os.path.join(lib_path, 'common', inst_dir[1])
-                        return inst_dir[1]
-                        #return [app_id, inst_dir]
-        return None
+    @staticmethod
+    def get_game_info_by_name(name:str, parallel: bool = False)->dict:
+        """
+        Looks up the game by its exact name in the library index. With `parallel`, a miss is resolved with an early-exit
+        `ManifestScanner` walk of the libraries instead of revalidating the whole index.
+
+        Returns:
+            dict: {"app_id", "name", "install_dir"} or None
+        """
+        index = steamutil.get_library_index()
+        if not parallel:
+            return index.get_by_name(name)
+        info = index.get_by_name(name, refresh_on_miss=False)
+        if info is None:
+            info = steamutil.scan_game_info_by_name(name, index.library_paths)
+        return info
 
     @staticmethod
-    def get_game_info_by_name(name:str)->str:
-        steam_path = steamutil.get_steam_install_path()
-        install_prefixes = steamutil.get_all_game_install_prefix_dirs(steam_path)
+    def resolve_games(queries: list, with_executable: bool = False) -> dict:
+        """
+        Resolves many games at once, each query being an app_id (int or digit string) or an exact game name.
+        A digit string is looked up as a name first, so games with numeric titles resolve too, and as an app_id when no game has that name.
+        The library index is revalidated at most once for the whole batch, instead of a full walk per title.
 
-        for lib_path in install_prefixes:
-            lib_path = os.path.join(lib_path, 'steamapps')
-
-            for dentry in os.listdir(lib_path):
-                if dentry.endswith(".acf"): #listdir gives back filenames, not filepaths, so we can't use os.path.isfile
-                    app_id = dentry.replace("appmanifest_","").replace(".acf","")
-                    inst_dir = steamutil.get_install_dir(os.path.join(lib_path, dentry))
-                    if(inst_dir[0] == name):
-                        inst_dir[1] = os.path.join(lib_path, 'common', inst_dir[1])
-                        return {
-                            "app_id" : app_id, 
-                            "name" : inst_dir[0], 
-                            "install_dir": inst_dir[1]
-                        }
-        return None
+        Returns:
+            dict: query (as a string) -> {"app_id", "name", "install_dir"[, "executable"]}, or None for a miss.
+        """
+        index = steamutil.get_library_index()
+        #ints can only be app ids
+        app_ids = {str(query) for query in queries if isinstance(query, int)}
+
+        def lookup(query):
+            info = None
+            if query not in app_ids:
+                info = index.get_by_name(query, refresh_on_miss=False)
+            if info is None and query.isdigit():
+                info = index.get_by_appid(query, refresh_on_miss=False)
+            return info
+
+        results = {}
+        for query in queries:
+            query = str(query)
+            results[query] = lookup(query)
+
+        misses = [query for query, info in results.items() if info is None]
+        if misses and index.refresh():
+            for query in misses:
+                results[query] = lookup(query)
+
+        if with_executable:
+            for info in results.values():
+                if info is not None:
+                    info["executable"] = steamutil.get_launch_executable(info["app_id"])
+        return results
+
+    scanner = None
+
+    @staticmethod
+    def get_scanner():
+        """
+        Returns: the shared `ManifestScanner` used for opt-in parallel scans.
+        """
+        if steamutil.scanner is None:
+            steamutil.scanner = ManifestScanner()
+        return steamutil.scanner
+
+    @staticmethod
+    def scan_game_info_by_name(name: str, install_prefixes: list[str] = None, scanner = None) -> dict:
+        """
+        Scans the manifests of all libraries concurrently (see `ManifestScanner`) and returns as soon as one matches `name`,
+        cancelling the reads that are still queued.
+
+        Returns:
+            dict: {"app_id", "name", "install_dir"} or None
+        """
+        if install_prefixes is None:
+            install_prefixes = steamutil.get_all_game_install_prefix_dirs(steamutil.get_steam_install_path())
+        if scanner is None:
+            scanner = steamutil.get_scanner()
+
+        steamapps_dirs = [os.path.join(lib_path, 'steamapps') for lib_path in install_prefixes]
+        found = scanner.find_first(steamapps_dirs, lambda path, manifest: manifest.get("name") == name)
+        if found is None:
+            return None
+        path, manifest = found
+        return {
+            "app_id" : os.path.basename(path).replace("appmanifest_","").replace(".acf",""),
+            "name" : manifest["name"],
+            "install_dir": os.path.join(os.path.dirname(path), 'common', manifest.get("installdir", "")),
+        }
     
     @staticmethod
-    def get_game_info_by_appid(app_id:str)->str:
+    def get_game_info_by_appid(app_id:str)->dict:
+        return steamutil.get_library_index().get_by_appid(app_id)
+
+    library_index = None
+
+    @staticmethod
+    def set_parallel_scanning(enabled: bool, max_workers: int = 8, per_root: int = 2):
+        """
+        Opts the shared library index in (or out) of parsing changed manifests over a `ManifestScanner`.
+        Worth it when libraries sit on spinning or network drives where each open() is slow.
+        """
+        steamutil.scanner = ManifestScanner(max_workers, per_root) if enabled else None
+        if steamutil.library_index is not None:
+            steamutil.library_index.scanner = steamutil.scanner
+
+    @staticmethod
+    def get_library_index():
+        """
+        Returns the shared `SteamLibraryIndex`, loading it from disk and revalidating it on first use.
+
+        Returns:
+            SteamLibraryIndex
+        """
+        if steamutil.library_index is None:
+            steam_path = steamutil.get_steam_install_path()
+            steamutil.library_index = SteamLibraryIndex.load(steam_path)
+            steamutil.library_index.scanner = steamutil.scanner
+            steamutil.library_index.refresh()
+        return steamutil.library_index
+
+    appinfo = None
+
+    @staticmethod
+    def get_appinfo():
+        """
+        Returns the shared `AppInfoReader` over `{steam_path}/appcache/appinfo.vdf`, **closed**: use it in a `with` block, which maps the file
+        for just that long. Windows won't let Steam truncate or replace a file something has mapped, so the mapping mustn't outlive a lookup.
+        The reader keeps its index and decoded apps between lookups, and drops them when it gets reopened on a file Steam rewrote.
+
+        Returns:
+            AppInfoReader or None if there's no readable app cache
+        """
         steam_path = steamutil.get_steam_install_path()
-        install_prefixes = steamutil.get_all_game_install_prefix_dirs(steam_path)
+        if not steam_path:
+            return None
+        path = os.path.join(steam_path, 'appcache', 'appinfo.vdf')
+        if steamutil.appinfo is not None and steamutil.appinfo.path != path:
+            steamutil.appinfo = None
+        if steamutil.appinfo is None and os.path.isfile(path):
+            try:
+                with AppInfoReader(path) as appinfo:
+                    steamutil.appinfo = appinfo
+            except (OSError, ValueError) as e:
+                print(f"Error reading {path}: {e}")
+        return steamutil.appinfo
 
-        for lib_path in install_prefixes:
-            lib_path = os.path.join(lib_path, 'steamapps')
-            dentry = os.path.join(lib_path, "appmanifest_{}.acf".format(app_id))
-            if(os.path.exists(dentry)):
-                inst_dir = steamutil.get_install_dir(os.path.join(lib_path, dentry))
-                inst_dir[1] = os.path.join(lib_path, 'common', inst_dir[1])
-                return {
-                    "app_id" : app_id, 
-                    "name" : inst_dir[0], 
-                    "install_dir": inst_dir[1]
-                }
+    @staticmethod
+    def get_launch_executable(app_id: str, oslist: str = "windows") -> str:
+        """
+        Finds the executable Steam launches for the app, relative to its install dir, from the binary app cache.
+
+        Returns:
+            string: e.g. "OldSkies.exe", or None
+        """
+        appinfo = steamutil.get_appinfo()
+        if appinfo is None:
+            return None
+        try:
+            with appinfo:
+                return appinfo.get_launch_executable(app_id, oslist)
+        except (ValueError, struct.error) as e:
+            print(f"Error decoding appinfo for {app_id}: {e}")
+            return None
+        except OSError as e:
+            print(f"Error reading {appinfo.path}: {e}")
+            return None
+
+
+class SteamLibraryIndex:
+    '''
+    SteamLibraryIndex maps app_id -> name -> install dir for every game in every Steam library.
+    It is saved to disk and revalidated with the mtime/size of `libraryfolders.vdf` and of every
+    `appmanifest_*.acf`, so only the files that changed since the last run get parsed again.
+    '''
+    CACHE_VERSION = 2
+    CACHE_FILENAME = "steam_library_index.json"
+
+    def __init__(self, steam_path: str, cache_path: str = None):
+        self.steam_path = steam_path
+        self.cache_path = cache_path
+        self.library_folders_stamp = None
+        self.library_paths = []
+        #manifest path -> {"stamp", "app_id", "name", "installdir", "library"}
+        self.manifests = {}
+        self.by_appid = {}
+        self.by_name = {}
+        #optional ManifestScanner, changed manifests get parsed serially without one
+        self.scanner = None
+        #a SteamLibraryWatcher may apply changes from its own thread
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def default_cache_path() -> str:
+        return os.path.join(os.path.dirname(os.path.abspath(__file__)), SteamLibraryIndex.CACHE_FILENAME)
+
+    @staticmethod
+    def file_stamp(path: str):
+        """
+        Returns: [mtime_ns, size] of the file, or None if it doesn't exist.
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return [st.st_mtime_ns, st.st_size]
+
+    @classmethod
+    def load(cls, steam_path: str, cache_path: str = None):
+        """
+        Creates an index for `steam_path`, seeded from the on-disk cache when it was written for the same Steam install.
+        The result still needs a `refresh()` to pick up whatever changed while we weren't running.
+
+        Returns:
+            SteamLibraryIndex
+        """
+        if cache_path is None:
+            cache_path = cls.default_cache_path()
+        index = cls(steam_path, cache_path)
+        try:
+            with open(cache_path, 'r') as file:
+                data = json.load(file)
+            if data.get("version") == cls.CACHE_VERSION and data.get("steam_path") == steam_path:
+                index.library_folders_stamp = data["library_folders_stamp"]
+                index.library_paths = data["library_paths"]
+                index.manifests = data["manifests"]
+                index.rebuild_lookups()
+        except (OSError, ValueError, KeyError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"Discarding Steam library index cache: {e}")
+        return index
+
+    def save(self):
+        """
+        Writes the index next to the script, replacing the previous cache atomically.
+        """
+        if not self.cache_path:
+            return
+        data = {
+            "version": self.CACHE_VERSION,
+            "steam_path": self.steam_path,
+            "library_folders_stamp": self.library_folders_stamp,
+            "library_paths": self.library_paths,
+            "manifests": self.manifests,
+        }
+        tmp_path = self.cache_path + ".tmp"
+        try:
+            with open(tmp_path, 'w') as file:
+                json.dump(data, file)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"Error saving Steam library index: {e}")
+
+    def refresh(self) -> bool:
+        """
+        Revalidates the index against the filesystem. Library folders are re-read only if `libraryfolders.vdf` changed,
+        and manifests are parsed only if they are new or their mtime/size changed. Manifests that disappeared get dropped.
+
+        Returns:
+            bool: whether anything changed.
+        """
+        if not self.steam_path:
+            return False
+
+        with self.lock:
+            changed = self.refresh_library_folders()
+            seen = set()
+            stale = {}
+            for library in self.library_paths:
+                self.scan_library(library, seen, stale)
+            changed |= self.parse_stale(stale)
+
+            for path in [path for path in self.manifests if path not in seen]:
+                self.remove_manifest(path, save=False)
+                changed = True
+
+            if changed:
+                self.save()
+        return changed
+
+    def library_folders_file(self) -> str:
+        return os.path.join(self.steam_path, 'steamapps', 'libraryfolders.vdf')
+
+    def refresh_library_folders(self) -> bool:
+        """
+        Re-reads `libraryfolders.vdf` if its mtime/size changed, dropping the manifests of libraries that are gone.
+
+        Returns:
+            bool: whether the library paths changed.
+        """
+        with self.lock:
+            stamp = SteamLibraryIndex.file_stamp(self.library_folders_file())
+            if stamp == self.library_folders_stamp and self.library_paths:
+                return False
+            self.library_folders_stamp = stamp
+            self.library_paths = steamutil.get_all_game_install_prefix_dirs(self.steam_path)
+            for path in [path for path, manifest in self.manifests.items() if manifest["library"] not in self.library_paths]:
+                self.remove_manifest(path, save=False)
+            return True
+
+    def scan_library(self, library: str, seen: set, stale: dict):
+        """
+        Lists one library's `steamapps`, adding every manifest path to `seen` and the new or changed ones to `stale[library]`.
+        """
+        steamapps = os.path.join(library, 'steamapps')
+        try:
+            entries = list(os.scandir(steamapps))
+        except OSError:
+            return
+        for dentry in entries:
+            if not (dentry.name.startswith("appmanifest_") and dentry.name.endswith(".acf")):
+                continue
+            seen.add(dentry.path)
+            try:
+                st = dentry.stat()
+            except OSError:
+                continue
+            stamp = [st.st_mtime_ns, st.st_size]
+            cached = self.manifests.get(dentry.path)
+            if cached is not None and cached["stamp"] == stamp and cached["library"] == library:
+                continue
+            stale.setdefault(library, []).append((dentry.path, dentry.name, library, stamp))
+
+    def parse_stale(self, stale: dict) -> bool:
+        if not stale:
+            return False
+        if self.scanner is not None:
+            results = self.scanner.map(stale, lambda job: self.read_manifest(*job))
+        else:
+            results = [(job, self.read_manifest(*job)) for jobs in stale.values() for job in jobs]
+        for job, manifest in results:
+            self.add_manifest(job[0], manifest)
+        return True
+
+    def sync_library(self, library: str, save: bool = True) -> bool:
+        """
+        Revalidates a single library, for when a watcher saw its `steamapps` dir change.
+
+        Returns:
+            bool: whether anything changed.
+        """
+        with self.lock:
+            seen = set()
+            stale = {}
+            self.scan_library(library, seen, stale)
+            changed = self.parse_stale(stale)
+            for path in [path for path, manifest in self.manifests.items() if manifest["library"] == library and path not in seen]:
+                self.remove_manifest(path, save=False)
+                changed = True
+            if changed and save:
+                self.save()
+        return changed
+
+    def library_of(self, path: str) -> str:
+        steamapps = os.path.dirname(path)
+        for library in self.library_paths:
+            if os.path.normcase(os.path.join(library, 'steamapps')) == os.path.normcase(steamapps):
+                return library
         return None
+
+    def update_manifest(self, path: str, save: bool = True) -> bool:
+        """
+        Applies a change to one manifest: parses it if it's new or changed, drops it if it's gone.
+        This is one manifest parse at most, no directory walk.
+
+        Returns:
+            bool: whether the index changed.
+        """
+        with self.lock:
+            library = self.library_of(path)
+            stamp = SteamLibraryIndex.file_stamp(path)
+            if library is None or stamp is None:
+                return self.remove_manifest(path, save)
+            cached = self.manifests.get(path)
+            if cached is not None and cached["stamp"] == stamp:
+                return False
+            self.add_manifest(path, self.read_manifest(path, os.path.basename(path), library, stamp))
+            if save:
+                self.save()
+            return True
+
+    def add_manifest(self, path: str, manifest: dict):
+        with self.lock:
+            if path in self.manifests:
+                self.unindex(path)
+            self.manifests[path] = manifest
+            self.by_appid[manifest["app_id"]] = path
+            self.by_name.setdefault(manifest["name"], path)
+
+    def remove_manifest(self, path: str, save: bool = True) -> bool:
+        with self.lock:
+            if path not in self.manifests:
+                return False
+            self.unindex(path)
+            del self.manifests[path]
+            if save:
+                self.save()
+            return True
+
+    def unindex(self, path: str):
+        manifest = self.manifests[path]
+        if self.by_appid.get(manifest["app_id"]) == path:
+            del self.by_appid[manifest["app_id"]]
+        if self.by_name.get(manifest["name"]) == path:
+            del self.by_name[manifest["name"]]
+            #another library may have a game with the same name
+            for other_path, other in self.manifests.items():
+                if other_path != path and other["name"] == manifest["name"]:
+                    self.by_name[other["name"]] = other_path
+                    break
+
+    @staticmethod
+    def read_manifest(path: str, filename: str, library: str, stamp) -> dict:
+        app_id = filename.replace("appmanifest_","").replace(".acf","")
+        manifest = steamutil.read_manifest(path)
+        return {
+            "stamp": stamp,
+            "app_id": app_id,
+            "name": manifest.get("name", ""),
+            "installdir": manifest.get("installdir", ""),
+            "buildid": manifest.get("buildid", ""),
+            "state_flags": manifest.get("StateFlags", ""),
+            "library": library,
+        }
+
+    def rebuild_lookups(self):
+        self.by_appid = {}
+        self.by_name = {}
+        for path, manifest in self.manifests.items():
+            self.by_appid[manifest["app_id"]] = path
+            self.by_name.setdefault(manifest["name"], path)
+
+    def info(self, path: str) -> dict:
+        manifest = self.manifests.get(path)
+        if manifest is None:
+            return None
+        return {
+            "app_id" : manifest["app_id"],
+            "name" : manifest["name"],
+            "install_dir": os.path.join(manifest["library"], 'steamapps', 'common', manifest["installdir"]),
+        }
+
+    def revalidate_hit(self, path: str):
+        """
+        Re-stats what a lookup hit came from, `libraryfolders.vdf` and the game's own manifest, and re-reads whichever changed,
+        so a game uninstalled, moved or renamed since the last refresh isn't handed out from the cache. Two stats on a hit, no directory walk.
+        """
+        with self.lock:
+            if self.refresh_library_folders():
+                self.save()
+            if path in self.manifests:
+                self.update_manifest(path)
+
+    def lookup(self, lookup: str, key: str, refresh_on_miss: bool) -> dict:
+        """
+        Returns: info() for `key` in the `lookup` dict ("by_appid" or "by_name"), revalidating a hit, and the whole index once on a miss.
+        """
+        with self.lock:
+            path = getattr(self, lookup).get(key)
+            if path is not None:
+                self.revalidate_hit(path)
+                path = getattr(self, lookup).get(key)
+            if path is None and refresh_on_miss and self.refresh():
+                path = getattr(self, lookup).get(key)
+            return self.info(path) if path is not None else None
+
+    def get_by_appid(self, app_id: str, refresh_on_miss: bool = True) -> dict:
+        """
+        Returns: {"app_id", "name", "install_dir"} for the installed game with that app_id, or None.
+        A hit is revalidated against its manifest's mtime/size. On a miss the index gets revalidated once, in case the game was installed since the last refresh.
+        """
+        return self.lookup("by_appid", str(app_id), refresh_on_miss)
+
+    def get_by_name(self, name: str, refresh_on_miss: bool = True) -> dict:
+        """
+        Returns: {"app_id", "name", "install_dir"} for the installed game with that exact name, or None.
+        A hit is revalidated against its manifest's mtime/size. On a miss the index gets revalidated once, in case the game was installed since the last refresh.
+        """
+        return self.lookup("by_name", name, refresh_on_miss)
+
+
+class ManifestScanner:
+    '''
+    ManifestScanner reads app manifests over a bounded pool of worker threads, keeping one work queue per library root
+    and at most `per_root` reads in flight on each, so a single slow drive doesn't get hammered while the others sit idle.
+    '''
+
+    def __init__(self, max_workers: int = 8, per_root: int = 2, reader = None):
+        self.max_workers = max(1, max_workers)
+        self.per_root = max(1, per_root)
+        #reader(path) -> manifest dict, swappable so the benchmarks can inject latency
+        self.reader = reader if reader is not None else steamutil.read_manifest
+
+    class Run:
+        '''
+        State shared by the workers of a single `map`/`find_first` call.
+        '''
+        def __init__(self, jobs: dict, func, match, per_root: int):
+            self.roots = list(jobs.keys())
+            self.queues = {root: deque(items) for root, items in jobs.items()}
+            self.inflight = {root: 0 for root in self.roots}
+            self.func = func
+            self.match = match
+            self.per_root = per_root
+            self.cond = threading.Condition()
+            self.cancelled = False
+            self.results = []
+            self.found = None
+            self.next_root = 0
+
+        def add(self, root, items):
+            with self.cond:
+                self.queues[root].extend(items)
+                self.cond.notify_all()
+
+        def take(self):
+            """
+            Returns: (root, item) for the next root, round robin, that has work and a free slot. None once everything is done or cancelled.
+            """
+            with self.cond:
+                while not self.cancelled:
+                    pending = False
+                    count = len(self.roots)
+                    for offset in range(count):
+                        root = self.roots[(self.next_root + offset) % count]
+                        queue = self.queues[root]
+                        if queue:
+                            pending = True
+                            if self.inflight[root] < self.per_root:
+                                self.next_root = (self.next_root + offset + 1) % count
+                                self.inflight[root] += 1
+                                return root, queue.popleft()
+                    if not pending and not any(self.inflight.values()):
+                        return None
+                    self.cond.wait()
+                return None
+
+        def done(self, root, item, result):
+            with self.cond:
+                self.inflight[root] -= 1
+                if not self.cancelled and result is not None:
+                    self.results.append((item, result))
+                    if self.match is not None and self.match(item, result):
+                        self.found = (item, result)
+                        self.cancelled = True
+                self.cond.notify_all()
+
+        def worker(self):
+            while True:
+                job = self.take()
+                if job is None:
+                    return
+                root, item = job
+                result = None
+                try:
+                    result = self.func(self, root, item)
+                except Exception as e:
+                    print(f"Error scanning {item}: {e}")
+                finally:
+                    self.done(root, item, result)
+
+        def wait(self):
+            with self.cond:
+                while not self.cancelled and (any(self.queues.values()) or any(self.inflight.values())):
+                    self.cond.wait()
+                self.cancelled = True
+                self.cond.notify_all()
+
+    def start(self, jobs: dict, func, match = None):
+        run = ManifestScanner.Run(jobs, func, match, self.per_root)
+        #workers beyond what the queues can use just find nothing to take and exit
+        worker_count = min(self.max_workers, self.per_root * len(jobs))
+        for _ in range(max(1, worker_count)):
+            threading.Thread(target=run.worker, daemon=True).start()
+        return run
+
+    def map(self, jobs: dict, func) -> list:
+        """
+        Runs `func(item)` for every item of `jobs` (root -> list of items) and waits for all of them.
+
+        Returns:
+            list: (item, result) pairs, in completion order, skipping items whose `func` raised.
+        """
+        run = self.start(jobs, lambda run, root, item: func(item))
+        run.wait()
+        return run.results
+
+    def find_first(self, steamapps_dirs: list[str], match):
+        """
+        Lists every `steamapps` dir and reads its manifests concurrently until `match(path, manifest)` is true for one of them.
+        Outstanding reads are cancelled once that happens; reads already in flight finish but their results are dropped.
+
+        Returns:
+            (path, manifest) of the first match, or None
+        """
+        def scan(run, root, item):
+            kind, path = item
+            if kind == "list":
+                try:
+                    names = os.listdir(path)
+                except OSError:
+                    return None
+                run.add(root, [("read", os.path.join(path, name)) for name in names
+                               if name.startswith("appmanifest_") and name.endswith(".acf")])
+                return None
+            return self.reader(path)
+
+        jobs = {path: [("list", path)] for path in steamapps_dirs}
+        if not jobs:
+            return None
+        run = self.start(jobs, scan, lambda item, manifest: match(item[1], manifest))
+        run.wait()
+        if run.found is None:
+            return None
+        return run.found[0][1], run.found[1]
+
+
+class RegistryBackend:
+    '''
+    RegistryBackend is the registry access steamutil needs. `WinRegBackend` is the real thing, `MemoryRegistryBackend` is
+    the fake that lets the lookups run and be benchmarked off Windows. Methods raise OSError like winreg does.
+    '''
+    STEAM_KEY = r'Software\Valve\Steam'
+    APPS_KEY = r'Software\Valve\Steam\Apps'
+
+    def get_steam_path(self) -> str:
+        raise NotImplementedError
+
+    def apps_key_stamp(self):
+        """
+        Returns: (subkey_count, last_write_time) of the Apps key, which changes whenever an app subkey is added or removed.
+        """
+        raise NotImplementedError
+
+    def enum_apps(self):
+        """
+        Yields: (app_id, name) for every subkey of the Apps key that has a Name value.
+        """
+        raise NotImplementedError
+
+
+class WinRegBackend(RegistryBackend):
+    def __init__(self, root = None):
+        self.root = root if root is not None else winreg.HKEY_CURRENT_USER
+
+    def get_steam_path(self) -> str:
+        with winreg.OpenKey(self.root, self.STEAM_KEY) as key:
+            steam_path, _ = winreg.QueryValueEx(key, 'SteamPath')
+            return steam_path
+
+    def apps_key_stamp(self):
+        with winreg.OpenKey(self.root, self.APPS_KEY) as key:
+            subkey_count, _, last_write = winreg.QueryInfoKey(key)
+            return (subkey_count, last_write)
+
+    def enum_apps(self):
+        with winreg.OpenKey(self.root, self.APPS_KEY) as key:
+            subkey_count = winreg.QueryInfoKey(key)[0]
+            for index in range(subkey_count):
+                try:
+                    subkey_name = winreg.EnumKey(key, index)
+                    #open relative to the Apps key, saves re-resolving the full path for every app
+                    with winreg.OpenKey(key, subkey_name) as subkey:
+                        name, _ = winreg.QueryValueEx(subkey, 'Name')
+                except OSError:
+                    continue
+                yield subkey_name, name
+
+
+class MemoryRegistryBackend(RegistryBackend):
+    '''
+    In-memory stand-in for the Steam registry keys, optionally loaded from/saved to a JSON file:
+    `{"SteamPath": "...", "Apps": {"<app_id>": "<name>"}}`
+    '''
+    def __init__(self, steam_path: str = None, apps: dict = None):
+        self.steam_path = steam_path
+        self.apps = dict(apps) if apps else {}
+        self.last_write = 0
+        #how many times the Apps key was enumerated, for the benchmarks
+        self.enumerations = 0
+
+    @classmethod
+    def from_json(cls, path: str):
+        with open(path, 'r') as file:
+            data = json.load(file)
+        return cls(data.get("SteamPath"), data.get("Apps"))
+
+    def save_json(self, path: str):
+        with open(path, 'w') as file:
+            json.dump({"SteamPath": self.steam_path, "Apps": self.apps}, file, indent=4)
+
+    def set_app(self, app_id: str, name: str):
+        self.apps[str(app_id)] = name
+        self.last_write += 1
+
+    def remove_app(self, app_id: str):
+        if self.apps.pop(str(app_id), None) is not None:
+            self.last_write += 1
+
+    def get_steam_path(self) -> str:
+        if self.steam_path is None:
+            raise FileNotFoundError("SteamPath is not set")
+        return self.steam_path
+
+    def apps_key_stamp(self):
+        return (len(self.apps), self.last_write)
+
+    def enum_apps(self):
+        self.enumerations += 1
+        for app_id, name in list(self.apps.items()):
+            if name is not None:
+                yield app_id, name
+
+
+class AppNameIndex:
+    '''
+    AppNameIndex is a case-folded name -> app_id map of the registry's Apps key, built in a single enumeration.
+    It is rebuilt only when the Apps key's subkey count or last write time changes.
+    '''
+    def __init__(self, registry: RegistryBackend):
+        self.registry = registry
+        self.stamp = None
+        self.by_name = {}
+
+    def refresh(self) -> bool:
+        """
+        Returns: whether the index had to be rebuilt.
+        """
+        stamp = self.registry.apps_key_stamp()
+        if stamp == self.stamp:
+            return False
+        by_name = {}
+        for app_id, name in self.registry.enum_apps():
+            #first one wins, like the linear search did
+            by_name.setdefault(name.casefold(), app_id)
+        self.by_name = by_name
+        self.stamp = stamp
+        return True
+
+    def get(self, name: str) -> str:
+        self.refresh()
+        return self.by_name.get(name.casefold())
+
+
+class AppInfoReader:
+    '''
+    AppInfoReader reads Steam's binary app cache (`appcache/appinfo.vdf`) through a read-only mmap.
+    Opening it only hops over the record headers to build an app_id -> offset index; an app's binary KeyValues payload
+    is decoded when that app is asked for, so a lookup costs the same no matter how large the file is.
+    '''
+    MAGIC_V27 = 0x07564427
+    MAGIC_V28 = 0x07564428
+    MAGIC_V29 = 0x07564429
+
+    #binary KeyValues value types
+    TYPE_MAP = 0x00
+    TYPE_STRING = 0x01
+    TYPE_INT32 = 0x02
+    TYPE_FLOAT32 = 0x03
+    TYPE_POINTER = 0x04
+    TYPE_WSTRING = 0x05
+    TYPE_COLOR = 0x06
+    TYPE_UINT64 = 0x07
+    TYPE_END = 0x08
+    TYPE_INT64 = 0x0A
+    TYPE_END_ALT = 0x0B
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = None
+        self.mm = None
+        #[mtime_ns, size] of the file the header, index and cache were read from
+        self.stamp = None
+        self.index = None
+        self.strings = None
+        self.cache = {}
+        self.open()
+
+    def open(self):
+        """
+        Maps the file, again after a `close()`. What was indexed and decoded before is kept if the file is the same,
+        and dropped if it changed in the meantime.
+        """
+        if self.mm is not None:
+            return
+        self.file = open(self.path, 'rb')
+        try:
+            st = os.fstat(self.file.fileno())
+            self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: #empty file
+            self.close()
+            raise ValueError(f"{self.path} is empty")
+        stamp = [st.st_mtime_ns, st.st_size]
+        if stamp == self.stamp:
+            return
+        self.stamp = None
+        self.index = None
+        self.strings = None
+        self.cache = {}
+        self.magic, self.universe = struct.unpack_from("<II", self.mm, 0)
+        if self.magic not in (self.MAGIC_V27, self.MAGIC_V28, self.MAGIC_V29):
+            self.close()
+            raise ValueError(f"Unknown appinfo.vdf magic {self.magic:#x}")
+        self.first_entry = 8
+        self.string_table_offset = None
+        if self.magic == self.MAGIC_V29:
+            self.string_table_offset, = struct.unpack_from("<q", self.mm, 8)
+            self.first_entry = 16
+        #info_state, last_updated, pics_token, sha1, change_number [, binary sha1]
+        self.entry_header_size = 40 if self.magic == self.MAGIC_V27 else 60
+        self.stamp = stamp
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """
+        Unmaps the file, so Steam can rewrite it. `open()` (or a `with` block) maps it again.
+        """
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def build_index(self) -> dict:
+        """
+        Walks the record headers once.
+
+        Returns:
+            dict: app_id -> (payload offset, payload end)
+        """
+        index = {}
+        mm = self.mm
+        end = len(mm) if self.string_table_offset is None else self.string_table_offset
+        offset = self.first_entry
+        while offset + 8 <= end:
+            app_id, size = struct.unpack_from("<II", mm, offset)
+            if app_id == 0:
+                break
+            record_end = offset + 8 + size
+            if record_end > end:
+                raise ValueError(f"Truncated appinfo.vdf record for app {app_id}")
+            index[app_id] = (offset + 8 + self.entry_header_size, record_end)
+            offset = record_end
+        return index
+
+    def app_ids(self):
+        if self.index is None:
+            self.index = self.build_index()
+        return self.index.keys()
+
+    def load_strings(self) -> list:
+        if self.strings is None:
+            self.strings = []
+            if self.string_table_offset is not None:
+                count, = struct.unpack_from("<I", self.mm, self.string_table_offset)
+                offset = self.string_table_offset + 4
+                for _ in range(count):
+                    string, offset = self.read_cstring(offset)
+                    self.strings.append(string)
+        return self.strings
+
+    def read_cstring(self, offset: int):
+        end = self.mm.find(b"\0", offset)
+        if end < 0:
+            raise ValueError("Unterminated string in appinfo.vdf")
+        return self.mm[offset:end].decode('utf-8', 'replace'), end + 1
+
+    def decode_map(self, offset: int, end: int):
+        """
+        Decodes binary KeyValues from `offset` up to the matching end marker.
+
+        Returns:
+            (dict, offset after the end marker)
+        """
+        mm = self.mm
+        strings = self.load_strings() if self.string_table_offset is not None else None
+        result = {}
+        while offset < end:
+            value_type = mm[offset]
+            offset += 1
+            if value_type == self.TYPE_END or value_type == self.TYPE_END_ALT:
+                return result, offset
+            if strings is not None:
+                key_index, = struct.unpack_from("<I", mm, offset)
+                key = strings[key_index]
+                offset += 4
+            else:
+                key, offset = self.read_cstring(offset)
+
+            if value_type == self.TYPE_MAP:
+                value, offset = self.decode_map(offset, end)
+            elif value_type == self.TYPE_STRING:
+                value, offset = self.read_cstring(offset)
+            elif value_type in (self.TYPE_INT32, self.TYPE_POINTER, self.TYPE_COLOR):
+                value, = struct.unpack_from("<i", mm, offset)
+                offset += 4
+            elif value_type == self.TYPE_FLOAT32:
+                value, = struct.unpack_from("<f", mm, offset)
+                offset += 4
+            elif value_type == self.TYPE_UINT64:
+                value, = struct.unpack_from("<Q", mm, offset)
+                offset += 8
+            elif value_type == self.TYPE_INT64:
+                value, = struct.unpack_from("<q", mm, offset)
+                offset += 8
+            elif value_type == self.TYPE_WSTRING:
+                string_end = offset
+                while string_end + 2 <= end and mm[string_end:string_end + 2] != b"\0\0":
+                    string_end += 2
+                if string_end + 2 > end:
+                    raise ValueError(f"Unterminated wide string in binary KeyValues at offset {offset}")
+                value = mm[offset:string_end].decode('utf-16-le', 'replace')
+                offset = string_end + 2
+            else:
+                raise ValueError(f"Unknown binary KeyValues type {value_type:#x} at offset {offset - 1}")
+            result[key] = value
+        raise ValueError("Unexpected end of binary KeyValues")
+
+    def get_app(self, app_id) -> dict:
+        """
+        Decodes the KeyValues of one app, cached after the first time.
+
+        Returns:
+            dict: the app's tree, usually {"appinfo": {"appid", "common", "config", ...}}, or None if the app isn't in the cache.
+        """
+        app_id = int(app_id)
+        if app_id in self.cache:
+            return self.cache[app_id]
+        if self.index is None:
+            self.index = self.build_index()
+        entry = self.index.get(app_id)
+        if entry is None:
+            return None
+        app, _ = self.decode_map(*entry)
+        self.cache[app_id] = app
+        return app
+
+    def get_launch_options(self, app_id) -> list:
+        """
+        Returns: the app's `config/launch` entries in order, each a dict with "executable", "arguments", "type", "config"...
+        """
+        app = self.get_app(app_id)
+        if app is None:
+            return []
+        appinfo = app.get("appinfo", app)
+        launch = appinfo.get("config", {}).get("launch", {})
+        return [launch[key] for key in sorted(launch, key=lambda key: int(key) if key.isdigit() else key)
+                if isinstance(launch[key], dict)]
+
+    def get_launch_executable(self, app_id, oslist: str = "windows") -> str:
+        """
+        Returns: the executable of the first launch option for the given OS, preferring the "default" type, or None.
+        """
+        candidates = []
+        for option in self.get_launch_options(app_id):
+            if not option.get("executable"):
+                continue
+            option_oslist = option.get("config", {}).get("oslist", "")
+            if option_oslist and oslist not in option_oslist.split(","):
+                continue
+            candidates.append(option)
+        for option in candidates:
+            if option.get("type", "default") == "default":
+                return option["executable"]
+        return candidates[0]["executable"] if candidates else None
+
+    def get_name(self, app_id) -> str:
+        app = self.get_app(app_id)
+        if app is None:
+            return None
+        return app.get("appinfo", app).get("common", {}).get("name")
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Steam library lookups for the QA launcher scripts")
+    parser.add_argument("--registry-json", help="read the Steam registry keys from a JSON file (see MemoryRegistryBackend) instead of the registry")
+    commands = parser.add_subparsers(dest="command", required=True)
+    resolve = commands.add_parser("resolve", help="resolve game names and/or app ids in one pass, printing JSON")
+    resolve.add_argument("games", nargs="+", help="app ids or exact game names")
+    resolve.add_argument("--executable", action="store_true", help="also look up the launch executable in appinfo.vdf")
+    args = parser.parse_args(argv)
+
+    if args.registry_json:
+        steamutil.registry = MemoryRegistryBackend.from_json(args.registry_json)
+
+    if args.command == "resolve":
+        results = steamutil.resolve_games(args.games, args.executable)
+        misses = [query for query, info in results.items() if info is None]
+        json.dump({"resolved": {query: info for query, info in results.items() if info is not None}, "misses": misses}, sys.stdout, indent=4)
+        print()
+        return 1 if misses else 0
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(main())
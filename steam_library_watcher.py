@@ -0,0 +1,247 @@
+import os, sys, time, select, struct, threading
+import ctypes, ctypes.util
+from steam_info_lib import SteamLibraryIndex, steamutil
+
+class SteamLibraryWatcher:
+    '''
+    SteamLibraryWatcher keeps a `SteamLibraryIndex` live while OBS stays open, so lookups never pay for a rescan.
+    It watches `libraryfolders.vdf` and every library's `steamapps` dir, with inotify on Linux and a cheap directory-mtime poll elsewhere,
+    and applies each change as a delta: a changed manifest costs one manifest parse, not a re-walk.
+    Either way the whole index is revalidated every `full_check_every` poll intervals, and right away when inotify overflows,
+    so a change we missed only leaves it stale for a while.
+    '''
+
+    def __init__(self, index: SteamLibraryIndex, poll_interval: float = 2.0, use_inotify: bool = None, full_check_every: int = 30, log = print):
+        self.index = index
+        self.poll_interval = poll_interval
+        if use_inotify is None:
+            use_inotify = sys.platform.startswith("linux")
+        self.use_inotify = use_inotify
+        #polling only sees a manifest rewritten in place if the dir mtime moves too, and inotify can drop events,
+        #so every now and then we revalidate everything
+        self.full_check_every = full_check_every
+        #where errors go, e.g. a wrapper around obs.script_log when run from a script
+        self.log = log
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.dir_stamps = {}
+        #how many deltas got applied, for diagnostics
+        self.updates = 0
+
+    @staticmethod
+    def for_shared_index(**kwargs) -> "SteamLibraryWatcher":
+        """
+        Returns: a started watcher over `steamutil.get_library_index()`.
+        """
+        watcher = SteamLibraryWatcher(steamutil.get_library_index(), **kwargs)
+        watcher.start()
+        return watcher
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name="SteamLibraryWatcher", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        if self.use_inotify:
+            try:
+                inotify = Inotify()
+            except OSError as e:
+                self.log(f"inotify unavailable, polling the Steam libraries instead: {e}")
+            else:
+                try:
+                    self.run_inotify(inotify)
+                finally:
+                    inotify.close()
+                return
+        self.run_polling()
+
+    def steamapps_dirs(self) -> dict:
+        """
+        Returns: watched dir -> library path, None for the Steam install's own `steamapps` when it only matters for `libraryfolders.vdf`.
+        """
+        dirs = {os.path.join(library, 'steamapps'): library for library in self.index.library_paths}
+        dirs.setdefault(os.path.dirname(self.index.library_folders_file()), None)
+        return dirs
+
+    def on_library_folders_changed(self):
+        if self.index.refresh_library_folders():
+            for library in self.index.library_paths:
+                self.index.sync_library(library, save=False)
+            self.index.save()
+            self.updates += 1
+
+    def on_manifest_changed(self, path: str):
+        if self.index.update_manifest(path):
+            self.updates += 1
+
+    def revalidate(self):
+        if self.index.refresh():
+            self.updates += 1
+
+    ### polling
+
+    def run_polling(self):
+        polls = 0
+        while not self.stop_event.wait(self.poll_interval):
+            polls += 1
+            if self.full_check_every and polls % self.full_check_every == 0:
+                self.revalidate()
+                continue
+            self.poll_once()
+
+    def poll_once(self):
+        """
+        Stats `libraryfolders.vdf` and each watched dir, and only resyncs the libraries whose dir mtime moved.
+        """
+        if SteamLibraryIndex.file_stamp(self.index.library_folders_file()) != self.index.library_folders_stamp:
+            self.on_library_folders_changed()
+
+        changed = False
+        for steamapps, library in self.steamapps_dirs().items():
+            stamp = SteamLibraryIndex.file_stamp(steamapps)
+            previous = self.dir_stamps.get(steamapps)
+            self.dir_stamps[steamapps] = stamp
+            if previous is None or stamp == previous or library is None:
+                continue
+            if self.index.sync_library(library, save=False):
+                changed = True
+                self.updates += 1
+        if changed:
+            self.index.save()
+
+    ### inotify
+
+    def run_inotify(self, inotify: "Inotify"):
+        watches = {}
+
+        def rewatch():
+            wanted = set(self.steamapps_dirs())
+            for wd, path in list(watches.items()):
+                if path not in wanted:
+                    inotify.remove_watch(wd)
+                    del watches[wd]
+            for path in wanted - set(watches.values()):
+                try:
+                    watches[inotify.add_watch(path, Inotify.MANIFEST_EVENTS)] = path
+                except OSError as e:
+                    self.log(f"Can't watch {path}: {e}")
+
+        rewatch()
+        library_folders = os.path.basename(self.index.library_folders_file())
+        full_check_interval = self.poll_interval * self.full_check_every if self.full_check_every else None
+        next_full_check = time.monotonic() + full_check_interval if full_check_interval else None
+        while not self.stop_event.is_set():
+            events = inotify.read_events(timeout=0.5)
+            if next_full_check is not None and time.monotonic() >= next_full_check:
+                next_full_check = time.monotonic() + full_check_interval
+                self.revalidate()
+                rewatch()
+            if not events:
+                continue
+            if any(wd == -1 or mask & Inotify.IN_Q_OVERFLOW for wd, mask, _ in events):
+                #the kernel dropped events, we can't tell what changed
+                self.revalidate()
+                rewatch()
+                continue
+            changed_paths = set()
+            folders_changed = False
+            watch_lost = False
+            for wd, mask, name in events:
+                if mask & Inotify.IN_IGNORED:
+                    #a dir we still watch went away (rewatch() already forgot the ones it removed itself)
+                    watch_lost |= watches.pop(wd, None) is not None
+                    continue
+                directory = watches.get(wd)
+                if directory is None or not name:
+                    continue
+                if name == library_folders:
+                    folders_changed = True
+                elif name.startswith("appmanifest_") and name.endswith(".acf"):
+                    changed_paths.add(os.path.join(directory, name))
+            if watch_lost:
+                self.revalidate()
+                rewatch()
+                continue
+            if folders_changed:
+                self.on_library_folders_changed()
+                rewatch()
+            for path in changed_paths:
+                self.on_manifest_changed(path)
+
+
+class Inotify:
+    '''
+    Minimal ctypes binding of Linux's inotify, just what SteamLibraryWatcher needs.
+    '''
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    #Steam writes manifests in place or renames them over, either way we get one of these once the file is complete
+    MANIFEST_EVENTS = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.inotify_add_watch = libc.inotify_add_watch
+        self.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.inotify_rm_watch = libc.inotify_rm_watch
+        self.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+    def add_watch(self, path: str, mask: int) -> int:
+        wd = self.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), path)
+        return wd
+
+    def remove_watch(self, wd: int):
+        self.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self, timeout: float) -> list:
+        """
+        Waits up to `timeout` seconds for events.
+
+        Returns:
+            list: (wd, mask, name) tuples, empty on timeout.
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + self.EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
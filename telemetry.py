@@ -0,0 +1,147 @@
+import json, math, os, threading, time
+from array import array
+import psutil
+
+class ResourceSampler:
+    '''
+    ResourceSampler records a game's CPU%, RSS, IO counters, thread count and handle count (open fds off Windows) at `rate` Hz,
+    into fixed-size array-backed ring buffers, so a long session costs no allocations and the newest `capacity` samples are kept.
+    Each sample is a single `oneshot()` batch. The sampler measures its own CPU time, see `overhead()`.
+    '''
+    FIELDS = ("t", "cpu_percent", "rss", "read_bytes", "write_bytes", "read_count", "write_count", "threads", "handles")
+
+    def __init__(self, process: psutil.Process, rate: float = 10.0, capacity: int = 36000):
+        self.process = process
+        self.rate = rate
+        self.capacity = capacity
+        self.buffers = {field: array("d", bytes(8 * capacity)) for field in ResourceSampler.FIELDS}
+        #total samples taken, the ring holds the last min(count, capacity) of them
+        self.count = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.started_at = None
+        self.stopped_at = None
+        #CPU seconds the sampler thread spent, for the overhead budget
+        self.cpu_time = 0.0
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.stop_event.clear()
+        self.started_at = time.monotonic()
+        self.stopped_at = None
+        #the first cpu_percent() call only primes the counter
+        try:
+            self.process.cpu_percent(None)
+        except psutil.Error:
+            pass
+        self.thread = threading.Thread(target=self.run, name="ResourceSampler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.stopped_at = time.monotonic()
+
+    def run(self):
+        cpu_start = time.thread_time()
+        interval = 1.0 / self.rate
+        next_at = time.monotonic()
+        while True:
+            if not self.sample():
+                break
+            #fixed-rate schedule: a slow sample doesn't push every later one back
+            next_at += interval
+            if self.stop_event.wait(max(0.0, next_at - time.monotonic())):
+                break
+        self.cpu_time += time.thread_time() - cpu_start
+
+    def sample(self) -> bool:
+        """
+        Takes one sample into the ring.
+
+        Returns:
+            bool: False once the process is gone.
+        """
+        nan = math.nan
+        try:
+            with self.process.oneshot():
+                cpu = self.process.cpu_percent(None)
+                rss = self.process.memory_info().rss
+                try:
+                    io = self.process.io_counters()
+                except (AttributeError, psutil.AccessDenied): #not available on every platform
+                    io = None
+                threads = self.process.num_threads()
+                try:
+                    handles = self.process.num_handles() if hasattr(self.process, "num_handles") else self.process.num_fds()
+                except psutil.AccessDenied:
+                    handles = nan
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            return False
+        except psutil.AccessDenied:
+            cpu = rss = threads = handles = nan
+            io = None
+        slot = self.count % self.capacity
+        values = (time.monotonic(), cpu, rss,
+                  io.read_bytes if io else nan, io.write_bytes if io else nan,
+                  io.read_count if io else nan, io.write_count if io else nan,
+                  threads, handles)
+        for field, value in zip(ResourceSampler.FIELDS, values):
+            self.buffers[field][slot] = value
+        self.count += 1
+        return True
+
+    def samples(self, field: str) -> list:
+        """
+        Returns: the field's samples still in the ring, oldest first.
+        """
+        buffer = self.buffers[field]
+        if self.count <= self.capacity:
+            return buffer[:self.count].tolist()
+        slot = self.count % self.capacity
+        return (buffer[slot:] + buffer[:slot]).tolist()
+
+    def overhead(self) -> float:
+        """
+        Returns: the sampler's CPU time as a fraction of one core over the time it ran, e.g. 0.002 for 0.2%.
+        """
+        if self.started_at is None:
+            return 0.0
+        elapsed = (self.stopped_at or time.monotonic()) - self.started_at
+        return self.cpu_time / elapsed if elapsed > 0 else 0.0
+
+    @staticmethod
+    def sidecar_path(recording_path: str) -> str:
+        return os.path.splitext(recording_path)[0] + ".telemetry.json"
+
+    def write_sidecar(self, recording_path: str) -> str:
+        """
+        Writes the samples as columns next to the recording (`<recording>.telemetry.json`), with times relative to the sampler's start.
+
+        Returns: the sidecar's path
+        """
+        columns = {}
+        for field in ResourceSampler.FIELDS:
+            values = self.samples(field)
+            if field == "t":
+                values = [round(value - self.started_at, 3) for value in values]
+            elif field == "cpu_percent":
+                values = [None if math.isnan(value) else round(value, 1) for value in values]
+            else:
+                values = [None if math.isnan(value) else int(value) for value in values]
+            columns[field] = values
+        data = {
+            "pid": self.process.pid,
+            "rate": self.rate,
+            "samples": min(self.count, self.capacity),
+            "dropped": max(0, self.count - self.capacity),
+            "overhead": round(self.overhead(), 5),
+            "columns": columns,
+        }
+        path = ResourceSampler.sidecar_path(recording_path)
+        with open(path, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        return path
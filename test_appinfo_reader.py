@@ -0,0 +1,37 @@
+import os, shutil, struct, tempfile
+import pytest
+from steam_info_lib import AppInfoReader
+
+@pytest.fixture
+def directory():
+    path = tempfile.mkdtemp()
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+def write_appinfo(directory: str, payload: bytes, app_id: int = 7) -> str:
+    '''
+    Writes a v27 appinfo.vdf (inline keys) with one app whose binary KeyValues are `payload`, as is.
+    '''
+    header = struct.pack("<IIQ20sI", 2, 1700000000, 0, bytes(20), 1)
+    record = header + payload
+    path = os.path.join(directory, "appinfo.vdf")
+    with open(path, "wb") as file:
+        file.write(struct.pack("<II", AppInfoReader.MAGIC_V27, 1) + struct.pack("<II", app_id, len(record)) + record + struct.pack("<I", 0))
+    return path
+
+def wstring(key: str, value: bytes) -> bytes:
+    return bytes([AppInfoReader.TYPE_WSTRING]) + key.encode() + b"\0" + value
+
+def test_wide_string(directory):
+    payload = wstring("name", "Old Skies".encode("utf-16-le") + b"\0\0") + bytes([AppInfoReader.TYPE_END])
+    with AppInfoReader(write_appinfo(directory, payload)) as reader:
+        assert reader.get_app(7) == {"name": "Old Skies"}
+
+def test_truncated_wide_string_raises(directory):
+    #the record and the file end in the middle of the string, as if Steam's write had been cut short
+    payload = wstring("name", "Old Skies".encode("utf-16-le"))
+    path = write_appinfo(directory, payload)
+    os.truncate(path, os.path.getsize(path) - 4)
+    with AppInfoReader(path) as reader:
+        with pytest.raises(ValueError):
+            reader.get_app(7)
@@ -0,0 +1,67 @@
+import threading
+from event_queue import EventQueue
+from monitoring_thread import MonitoringThread
+from process_state_machine import ProcessStateMachine
+
+class ScriptedStateMachine(ProcessStateMachine):
+    '''
+    Goes through `states` one per step without launching anything or waiting between steps.
+    '''
+    def __init__(self, states, **kwargs):
+        super().__init__("game.exe", **kwargs)
+        self.script = list(states)
+
+    def wait_time(self) -> float:
+        return 0.0
+
+    def state_machine(self):
+        self.state = self.script.pop(0)
+
+def test_only_repeated_values_coalesce():
+    events = EventQueue()
+    handled = []
+    events.publish("gameA", "CRASHED", handled.append)
+    for state in ["STARTING", "RUNNING", "RUNNING", "TERMINATED"]:
+        events.publish("gameB", state, handled.append)
+    assert events.drain() == 4
+    assert handled == ["CRASHED", "STARTING", "RUNNING", "TERMINATED"]
+    assert events.metrics()["coalesced"] == 1
+
+def test_partial_drain_keeps_order():
+    events = EventQueue()
+    handled = []
+    on_a = lambda state: handled.append(("gameA", state))
+    on_b = lambda state: handled.append(("gameB", state))
+    events.publish("gameA", "STARTING", on_a)
+    events.publish("gameB", "STARTING", on_b)
+    events.publish("gameA", "RUNNING", on_a)
+    events.publish("gameB", "CRASHED", on_b)
+    assert events.drain(max_items=1) == 1
+    assert events.depth() == 3
+    assert events.drain() == 3
+    assert handled == [("gameA", "STARTING"), ("gameA", "RUNNING"), ("gameB", "STARTING"), ("gameB", "CRASHED")]
+
+def test_full_slot_keeps_the_newest_values():
+    events = EventQueue(max_per_slot=3)
+    handled = []
+    for state in ["STARTING", "RUNNING", "STARTING", "RUNNING", "CRASHED"]:
+        events.publish("gameA", state, handled.append)
+    assert events.depth() == 3
+    events.drain()
+    assert handled == ["STARTING", "RUNNING", "CRASHED"]
+
+def test_monitoring_thread_delivers_every_transition_on_draining_thread():
+    events = EventQueue()
+    changes, finals = [], []
+    on_state_change = lambda state: changes.append((state, threading.current_thread()))
+    callback = lambda state: finals.append((state, threading.current_thread()))
+    thread = MonitoringThread(ScriptedStateMachine, args=(["STARTING", "RUNNING", "CRASHED"],),
+                              kwargs={"callback": callback, "on_state_change": on_state_change}, events=events)
+    #nothing gets drained until the machine is done, every transition has to be waiting in the queue
+    thread.start()
+    thread.join(5.0)
+    assert not thread.is_alive()
+    events.drain()
+    main = threading.current_thread()
+    assert changes == [("STARTING", main), ("RUNNING", main), ("CRASHED", main)]
+    assert finals == [("CRASHED", main)]
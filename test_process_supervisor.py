@@ -0,0 +1,89 @@
+import os, subprocess, sys, threading
+import pytest
+from process_state_machine import ProcessStateMachine, PollSchedule
+from process_supervisor import ProcessSupervisor
+from window_backend import FakeWindowBackend
+
+class Handle:
+    '''
+    A process handle with only a pid, nothing to wait on or poll.
+    '''
+    def __init__(self, pid: int):
+        self.pid = pid
+
+class RunningHandle(Handle):
+    '''
+    A process that doesn't exit while the test runs.
+    '''
+    def wait(self, timeout=None):
+        threading.Event().wait(timeout)
+
+class BrokenHandle(Handle):
+    def poll(self):
+        raise RuntimeError("handle closed")
+
+class AttachedStateMachine(ProcessStateMachine):
+    '''
+    Takes over an already running process and its main window instead of launching anything.
+    '''
+    def __init__(self, process, hwnd, schedule: PollSchedule = None):
+        super().__init__("game.exe", lambda state: None, schedule)
+        self.attached = process
+        self.hwnd = hwnd
+        self.crash_grace = 0.05
+
+    def initializing(self):
+        self.process = self.attached
+        self.main_win_hwnd = self.hwnd
+        self.state = 'RUNNING'
+
+@pytest.fixture
+def backend():
+    backend = FakeWindowBackend()
+    ProcessStateMachine.window_backend = backend
+    yield backend
+    ProcessStateMachine.window_backend = None
+
+class CountingSupervisor(ProcessSupervisor):
+    def __init__(self, tick_interval: float):
+        super().__init__(tick_interval)
+        self.pid_checks = 0
+
+    def pid_exists(self, pid: int) -> bool:
+        self.pid_checks += 1
+        return super().pid_exists(pid)
+
+@pytest.fixture
+def supervisor():
+    supervisor = CountingSupervisor(tick_interval=0.02)
+    supervisor.start()
+    yield supervisor
+    supervisor.stop()
+
+def dead_pid() -> int:
+    child = subprocess.Popen([sys.executable, "-c", "pass"])
+    child.wait()
+    return child.pid
+
+def test_machines_share_one_pid_listing_per_tick(backend, supervisor):
+    pid = os.getpid()
+    hwnds = [backend.add_window(pid, "Old Skies {}".format(i), "UnityWndClass") for i in range(8)]
+    #the crash dialog left behind once the main windows go
+    backend.add_window(pid, "Old Skies", "#32770")
+    #checked every tick, so they all notice in the same few ticks
+    machines = [AttachedStateMachine(RunningHandle(pid), hwnd, PollSchedule({'RUNNING': (0.02, 0.02)})) for hwnd in hwnds]
+    futures = [supervisor.add(fsm) for fsm in machines]
+    for hwnd in hwnds:
+        backend.remove_window(hwnd)
+    assert [future.result(5.0) for future in futures] == ['CRASHED'] * len(machines)
+    #every machine checked the pid twice (window lost, then grace over), answered from a listing per tick
+    assert supervisor.pid_checks == 2 * len(machines)
+    assert supervisor.pid_listings < len(machines)
+
+def test_polled_handle_falls_back_to_pid_listing(backend, supervisor):
+    hwnd = backend.add_window(os.getpid(), "Old Skies", "UnityWndClass")
+    broken = AttachedStateMachine(BrokenHandle(os.getpid()), hwnd)
+    gone = AttachedStateMachine(Handle(dead_pid()), hwnd)
+    supervisor.add(broken)
+    #the broken handle raising on every tick doesn't keep the other machine from being checked
+    assert supervisor.add(gone).result(5.0) == 'TERMINATED'
@@ -0,0 +1,83 @@
+import os, shutil, tempfile
+import pytest
+from steam_info_lib import SteamLibraryIndex, steamutil
+
+MANIFEST = '''"AppState"
+{
+	"appid"		"%s"
+	"name"		"%s"
+	"installdir"		"%s"
+}
+'''
+
+LIBRARY_FOLDERS = '''"libraryfolders"
+{
+	"0"
+	{
+		"path"		"%s"
+	}
+	"1"
+	{
+		"path"		"%s"
+	}
+}
+'''
+
+@pytest.fixture
+def steam_path():
+    #steamutil lower-cases library paths, so the temp dir has to be lower case to begin with
+    path = os.path.normpath(tempfile.mkdtemp()).lower()
+    os.makedirs(os.path.join(path, "steamapps"))
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+def write_manifest(library: str, app_id: str, name: str) -> str:
+    path = os.path.join(library, "steamapps", "appmanifest_{}.acf".format(app_id))
+    with open(path, "w") as file:
+        file.write(MANIFEST % (app_id, name, name))
+    return path
+
+def test_hit_after_uninstall_is_a_miss(steam_path):
+    manifest = write_manifest(steam_path, "1234", "Old Skies")
+    index = SteamLibraryIndex(steam_path)
+    index.refresh()
+    assert index.get_by_appid("1234")["name"] == "Old Skies"
+    os.remove(manifest)
+    assert index.get_by_appid("1234", refresh_on_miss=False) is None
+    assert index.get_by_name("Old Skies", refresh_on_miss=False) is None
+
+def test_hit_after_rename_returns_the_new_name(steam_path):
+    manifest = write_manifest(steam_path, "1234", "Old Skies")
+    index = SteamLibraryIndex(steam_path)
+    index.refresh()
+    assert index.get_by_name("Old Skies")["app_id"] == "1234"
+    write_manifest(steam_path, "1234", "Old Skies Remastered")
+    #same size and mtime resolution can hide the rewrite, move the mtime on explicitly
+    stat = os.stat(manifest)
+    os.utime(manifest, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert index.get_by_name("Old Skies", refresh_on_miss=False) is None
+    assert index.get_by_appid("1234", refresh_on_miss=False)["name"] == "Old Skies Remastered"
+
+def test_hit_after_moving_library_returns_the_new_install_dir(steam_path):
+    other = os.path.join(steam_path, "otherlibrary")
+    os.makedirs(os.path.join(other, "steamapps"))
+    manifest = write_manifest(steam_path, "1234", "Old Skies")
+    index = SteamLibraryIndex(steam_path)
+    index.refresh()
+    assert index.get_by_appid("1234")["install_dir"].startswith(steam_path + os.sep + "steamapps")
+    with open(os.path.join(steam_path, "steamapps", "libraryfolders.vdf"), "w") as file:
+        file.write(LIBRARY_FOLDERS % (steam_path, other))
+    os.remove(manifest)
+    write_manifest(other, "1234", "Old Skies")
+    assert index.get_by_appid("1234")["install_dir"].startswith(other)
+
+def test_numeric_title_resolves_by_name(steam_path, monkeypatch):
+    write_manifest(steam_path, "5678", "1942")
+    write_manifest(steam_path, "1234", "Old Skies")
+    index = SteamLibraryIndex(steam_path)
+    index.refresh()
+    monkeypatch.setattr(steamutil, "library_index", index)
+    results = steamutil.resolve_games(["1942", "1234", 5678])
+    assert results["1942"]["app_id"] == "5678"
+    assert results["1234"]["name"] == "Old Skies"
+    assert results["5678"]["name"] == "1942"
@@ -0,0 +1,80 @@
+import os, sys, time, shutil, tempfile, threading
+import pytest
+from steam_info_lib import SteamLibraryIndex
+from steam_library_watcher import SteamLibraryWatcher, Inotify
+
+MANIFEST = '''"AppState"
+{
+	"appid"		"%s"
+	"name"		"Old Skies"
+	"installdir"		"Old Skies"
+}
+'''
+
+def wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+@pytest.fixture
+def library():
+    #steamutil lower-cases library paths, so the temp dir has to be lower case to begin with
+    steam_path = os.path.normpath(tempfile.mkdtemp()).lower()
+    os.makedirs(os.path.join(steam_path, "steamapps"))
+    index = SteamLibraryIndex(steam_path)
+    index.refresh()
+    yield steam_path, index
+    shutil.rmtree(steam_path, ignore_errors=True)
+
+def write_manifest(steam_path: str, app_id: str) -> str:
+    path = os.path.join(steam_path, "steamapps", "appmanifest_{}.acf".format(app_id))
+    with open(path, "w") as file:
+        file.write(MANIFEST % app_id)
+    return path
+
+MODES = [pytest.param(True, id="inotify", marks=pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux only")),
+         pytest.param(False, id="polling")]
+
+@pytest.mark.parametrize("use_inotify", MODES)
+def test_manifest_added_and_removed(library, use_inotify):
+    steam_path, index = library
+    watcher = SteamLibraryWatcher(index, poll_interval=0.05, use_inotify=use_inotify, full_check_every=0)
+    watcher.start()
+    try:
+        #polling takes its baseline of the dir on the first poll
+        time.sleep(0.2)
+        path = write_manifest(steam_path, "1234")
+        assert wait_for(lambda: index.get_by_appid("1234", refresh_on_miss=False) is not None)
+        assert index.get_by_name("Old Skies", refresh_on_miss=False)["app_id"] == "1234"
+        os.remove(path)
+        #look at the index directly, a lookup hit would notice the missing manifest by itself
+        assert wait_for(lambda: "1234" not in index.by_appid)
+        assert watcher.updates >= 2
+    finally:
+        watcher.stop()
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux only")
+def test_inotify_overflow_revalidates(library):
+    steam_path, index = library
+
+    class OverflowingInotify(Inotify):
+        #reports every batch as an overflow, as if the events themselves had been dropped
+        def read_events(self, timeout: float) -> list:
+            events = super().read_events(timeout)
+            return [(-1, Inotify.IN_Q_OVERFLOW, "")] if events else []
+
+    watcher = SteamLibraryWatcher(index, use_inotify=True, full_check_every=0)
+    inotify = OverflowingInotify()
+    thread = threading.Thread(target=watcher.run_inotify, args=(inotify,), daemon=True)
+    thread.start()
+    try:
+        time.sleep(0.1)
+        write_manifest(steam_path, "5678")
+        assert wait_for(lambda: index.get_by_appid("5678", refresh_on_miss=False) is not None)
+    finally:
+        watcher.stop_event.set()
+        thread.join()
+        inotify.close()
@@ -0,0 +1,26 @@
+from window_backend import FakeWindowBackend
+
+class ClosingWindowBackend(FakeWindowBackend):
+    '''
+    Destroys `closing` between listing the hwnds and looking it up, like a game window closing under EnumWindows.
+    '''
+    def __init__(self):
+        super().__init__()
+        self.closing = None
+
+    def window_handles(self) -> list:
+        hwnds = super().window_handles()
+        if self.closing is not None:
+            self.windows.pop(self.closing, None)
+        return hwnds
+
+def test_window_destroyed_mid_enumeration_is_skipped():
+    backend = ClosingWindowBackend()
+    launcher = backend.add_window(100, "Launcher", "LauncherClass")
+    game = backend.add_window(200, "Old Skies", "UnityWndClass")
+    backend.closing = game
+    snapshot = backend.snapshot()
+    assert not snapshot.exists(game)
+    assert snapshot.exists(launcher)
+    assert snapshot.count(200) == 0
+    assert snapshot.count(100) == 1
@@ -0,0 +1,196 @@
+import itertools, threading, time
+from collections import namedtuple
+
+try:
+    import pywintypes, win32gui, win32process
+except ImportError: #not on Windows, only the fake backend works
+    pywintypes = win32gui = win32process = None
+
+WindowInfo = namedtuple("WindowInfo", ["hwnd", "pid", "title", "class_name", "visible", "enabled"])
+
+class WindowSnapshot:
+    '''
+    WindowSnapshot is every top-level window at one point in time, indexed by pid and by hwnd.
+    The queries mirror the win32 calls they replace (EnumWindows callbacks, FindWindow, IsWindow) without going back to the window system.
+    '''
+    def __init__(self, windows: list[WindowInfo], taken_at: float):
+        self.windows = windows
+        self.taken_at = taken_at
+        self.by_hwnd = {}
+        self.by_pid = {}
+        for window in windows:
+            self.by_hwnd[window.hwnd] = window
+            self.by_pid.setdefault(window.pid, []).append(window)
+
+    def get(self, hwnd) -> WindowInfo:
+        return self.by_hwnd.get(hwnd)
+
+    def exists(self, hwnd) -> bool:
+        return hwnd is not None and hwnd in self.by_hwnd
+
+    def windows_of(self, pid: int, visible: bool = True, enabled: bool = False) -> list[WindowInfo]:
+        """
+        Returns: the pid's top-level windows in Z order, only the visible (and enabled) ones unless asked otherwise.
+        """
+        return [window for window in self.by_pid.get(pid, ())
+                if (not visible or window.visible) and (not enabled or window.enabled)]
+
+    def count(self, pid: int) -> int:
+        """
+        Returns: how many visible and enabled top-level windows the pid has.
+        """
+        return len(self.windows_of(pid, visible=True, enabled=True))
+
+    def find(self, class_name: str = None, title: str = None) -> int:
+        """
+        Like win32gui.FindWindow: the first top-level window whose class and title match, case-insensitively. None matches anything.
+
+        Returns:
+            int: the hwnd, or 0 if there's none
+        """
+        class_name = class_name.casefold() if class_name is not None else None
+        title = title.casefold() if title is not None else None
+        for window in self.windows:
+            if ((class_name is None or window.class_name.casefold() == class_name)
+            and (title is None or window.title.casefold() == title)):
+                return window.hwnd
+        return 0
+
+
+class WindowBackend:
+    '''
+    WindowBackend hands out window snapshots. Callers that run in the same tick share one snapshot,
+    so a tick costs one walk of the window list no matter how many checks it makes.
+    A snapshot is reused until it's `max_age` seconds old or `invalidate()` starts a new tick.
+    '''
+    def __init__(self, max_age: float = 0.05):
+        self.max_age = max_age
+        self.current = None
+        self.lock = threading.Lock()
+        #how many times we actually walked the window list
+        self.enumerations = 0
+
+    def window_handles(self) -> list:
+        """
+        Returns: every top-level hwnd, in Z order.
+        """
+        raise NotImplementedError
+
+    def window_info(self, hwnd) -> WindowInfo:
+        """
+        Returns: what `hwnd` is now, or None if it's gone (windows get destroyed while we walk the list, most of all when a game exits or crashes).
+        """
+        raise NotImplementedError
+
+    def enumerate(self) -> list[WindowInfo]:
+        windows = []
+        for hwnd in self.window_handles():
+            window = self.window_info(hwnd)
+            if window is not None:
+                windows.append(window)
+        return windows
+
+    def snapshot(self) -> WindowSnapshot:
+        with self.lock:
+            now = time.monotonic()
+            if self.current is None or now - self.current.taken_at > self.max_age:
+                self.enumerations += 1
+                self.current = WindowSnapshot(self.enumerate(), now)
+            return self.current
+
+    def invalidate(self):
+        with self.lock:
+            self.current = None
+
+    def describe(self, hwnd) -> WindowInfo:
+        """
+        Looks up one window without walking the whole list, for when something else (the monitor daemon) already found its hwnd.
+
+        Returns: the window as it is now, or None if there's no such window.
+        """
+        return self.snapshot().get(hwnd)
+
+
+class Win32WindowBackend(WindowBackend):
+    def window_handles(self) -> list:
+        hwnds = []
+
+        def callback(hwnd, extra):
+            hwnds.append(hwnd)
+            return True
+
+        win32gui.EnumWindows(callback, None)
+        return hwnds
+
+    def window_info(self, hwnd) -> WindowInfo:
+        try:
+            _, pid = win32process.GetWindowThreadProcessId(hwnd)
+            return WindowInfo(hwnd, pid, win32gui.GetWindowText(hwnd), win32gui.GetClassName(hwnd),
+                              bool(win32gui.IsWindowVisible(hwnd)), bool(win32gui.IsWindowEnabled(hwnd)))
+        except pywintypes.error: #destroyed since it was enumerated
+            return None
+
+    def describe(self, hwnd) -> WindowInfo:
+        if not hwnd or not win32gui.IsWindow(hwnd):
+            return None
+        return self.window_info(hwnd)
+
+
+class FakeWindowBackend(WindowBackend):
+    '''
+    In-memory window system for tests and benchmarks. `enum_cost` is spent (busy-waiting) per window on every enumeration.
+    '''
+    def __init__(self, max_age: float = 0.05, enum_cost: float = 0.0):
+        super().__init__(max_age)
+        self.enum_cost = enum_cost
+        self.windows = {}
+        self.hwnds = itertools.count(0x10010, 2)
+
+    def add_window(self, pid: int, title: str, class_name: str, visible: bool = True, enabled: bool = True) -> int:
+        hwnd = next(self.hwnds)
+        self.windows[hwnd] = WindowInfo(hwnd, pid, title, class_name, visible, enabled)
+        self.invalidate()
+        return hwnd
+
+    def remove_window(self, hwnd: int):
+        self.windows.pop(hwnd, None)
+        self.invalidate()
+
+    def remove_windows_of(self, pid: int):
+        for hwnd in [hwnd for hwnd, window in self.windows.items() if window.pid == pid]:
+            del self.windows[hwnd]
+        self.invalidate()
+
+    def set_window(self, hwnd: int, **changes):
+        self.windows[hwnd] = self.windows[hwnd]._replace(**changes)
+        self.invalidate()
+
+    def describe(self, hwnd) -> WindowInfo:
+        return self.window_info(hwnd)
+
+    def window_handles(self) -> list:
+        if self.enum_cost:
+            deadline = time.perf_counter() + self.enum_cost * len(self.windows)
+            while time.perf_counter() < deadline:
+                pass
+        #newest window on top, like a fresh window in the Z order
+        return list(reversed(self.windows))
+
+    def window_info(self, hwnd) -> WindowInfo:
+        return self.windows.get(hwnd)
+
+
+default = None
+
+def get_default_backend() -> WindowBackend:
+    '''
+    Returns: the shared backend, Win32 on Windows, an empty fake elsewhere.
+    '''
+    global default
+    if default is None:
+        default = Win32WindowBackend() if win32gui is not None else FakeWindowBackend()
+    return default
+
+def set_default_backend(backend: WindowBackend):
+    global default
+    default = backend